@@ -1,5 +1,6 @@
 from typing import List, Dict
 from pydantic import BaseModel, RootModel
+from functools import lru_cache
 import logging
 import asyncio
 
@@ -9,6 +10,7 @@ from fastapi import APIRouter, Depends
 from fastapi.responses import JSONResponse
 
 from config.config import get_config
+from core.opensearch_vectorstore import OpenSearchVectorDatabase
 from util.s3util import S3Util
 
 from flotorch_core.inferencer.inferencer_provider_factory import InferencerProviderFactory
@@ -91,6 +93,34 @@ def get_model_question_prices(file_path, model, input_tokens, output_tokens, reg
         return None
     
     
+@lru_cache(maxsize=1)
+def get_vector_database() -> OpenSearchVectorDatabase:
+    """OpenSearch client shared by the expert evaluation searches, created on first use."""
+    return OpenSearchVectorDatabase(
+        host=configs.opensearch_host,
+        is_serverless=configs.opensearch_serverless,
+        region=configs.aws_region,
+        username=configs.opensearch_username,
+        password=configs.opensearch_password
+    )
+
+def search_index(embedding, index_id: str, query: str, knn: int, hierarchical: bool) -> List[Dict]:
+    """
+    Search an experiment's OpenSearch index for the query the way the retriever does:
+    queries of int8 and binary indexes are quantized like their documents, and
+    hierarchical children come back with their parent's text, one result per parent.
+    """
+    query_vector = embedding.embed(Chunk(data=query)).embeddings
+    results = get_vector_database().search(index_id, query_vector, knn)
+    if hierarchical:
+        parent_ids, distinct = set(), []
+        for result in results:
+            if result.get('parent_id') not in parent_ids:
+                parent_ids.add(result.get('parent_id'))
+                distinct.append(result)
+        results = distinct
+    return results
+
 def get_experiment_db():
     return DynamoDB(config.get_experiment_table_name())
 
@@ -155,30 +185,34 @@ async def query_experiments(
             exp_config.get("n_shot_prompt_guide")
         )
 
+        # OpenSearch indexes are searched through OpenSearchVectorDatabase, which handles their
+        # quantized vectors and parent chunks; Bedrock knowledge bases through flotorch-core
         vector_storage = None
-        if knowledge_base:
+        embedding = None
+        if knowledge_base and bedrock_knowledge_base:
             vector_storage = VectorStorageFactory.create_vector_storage(
                 knowledge_base=knowledge_base,
                 use_bedrock_kb=bedrock_knowledge_base,
-                embedding=(
-                    embedding_registry.get_model(exp_config.get("embedding_model"))(
-                        exp_config.get("embedding_model"), aws_region, 
-                        int(exp_config.get("vector_dimension"))
-                    )
-                    if not bedrock_knowledge_base else None
-                ),
-                opensearch_host=config.get_opensearch_host(),
-                opensearch_port=config.get_opensearch_port(),
-                opensearch_username=config.get_opensearch_username(),
-                opensearch_password=config.get_opensearch_password(),
-                index_id=exp_config_data.get("index_id"),
+                embedding=None,
                 knowledge_base_id=exp_config.get("kb_data"),
                 aws_region=aws_region
             )
+        elif knowledge_base:
+            embedding = embedding_registry.get_model(exp_config.get("embedding_model"))(
+                exp_config.get("embedding_model"), aws_region,
+                int(exp_config.get("vector_dimension"))
+            )
 
         # Answer Generation
-        if vector_storage:
-            hierarchical = exp_config.get("chunking_strategy") == 'hierarchical'
+        hierarchical = exp_config.get("chunking_strategy") == 'hierarchical'
+        if embedding:
+            vector_response = await asyncio.to_thread(
+                search_index, embedding, exp_config_data.get("index_id"), query.query, int(exp_config['knn_num']), hierarchical
+            )
+            metadata, answer = await asyncio.to_thread(
+                inferencer.generate_text, query.query, vector_response
+            )
+        elif vector_storage:
             question_chunk = Chunk(data=query.query)
 
             vector_response = await asyncio.to_thread(
@@ -64,13 +64,16 @@ async def get_presigned_url_kb(
         
         prefix = f"{unique_id}/kb_data"
         
-        # Check and clean existing files
-        # TODO - optimize it by uploading only new files
-        response = s3.list_objects_v2(Bucket=S3_BUCKET, Prefix=prefix)
-        if 'Contents' in response:
-            objects_to_delete = [{'Key': obj['Key']} for obj in response['Contents']]
-            s3.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': objects_to_delete})
-            logger.info(f"Cleaned up existing files for KB upload: {prefix}")
+        # Remove only the files missing from the new upload; files uploaded again keep their
+        # ETag when unchanged, so indexing can skip them
+        kept_keys = {f"{prefix}/{file_name}" for file_name in files}
+        objects_to_delete = []
+        for page in s3.get_paginator('list_objects_v2').paginate(Bucket=S3_BUCKET, Prefix=prefix):
+            objects_to_delete.extend({'Key': obj['Key']} for obj in page.get('Contents', []) if obj['Key'] not in kept_keys)
+        for start in range(0, len(objects_to_delete), 1000):
+            s3.delete_objects(Bucket=S3_BUCKET, Delete={'Objects': objects_to_delete[start:start + 1000]})
+        if objects_to_delete:
+            logger.info(f"Removed {len(objects_to_delete)} files no longer in the KB upload: {prefix}")
             
         result = []
     
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Callable, Sequence, Tuple, Union
 from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import datetime
@@ -16,6 +16,7 @@ import random
 from dataclasses import dataclass, asdict
 from decimal import Decimal
 import botocore
+from concurrent.futures import ThreadPoolExecutor
 
 
 logger = logging.getLogger(__name__)
@@ -46,6 +47,15 @@ class VectorDatabase(ABC):
         """Perform a vector search on the specified index."""
         pass
 
+    @abstractmethod
+    def search_many(self, index_name: str, queries: Sequence[Any], k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Perform several searches on the specified index (a knowledge base id for knowledge
+        bases), returning the results of each query in order. Queries are what `search`
+        takes: vectors, or texts for knowledge bases.
+        """
+        pass
+
 class BaseInferencer(ABC):
     
     # Added a new parameter `role_arn` as part of the SageMaker integration. 
@@ -56,6 +66,8 @@ class BaseInferencer(ABC):
         self.region_name = region
         self.experiment_config = experiment_config
         self.role_arn = role_arn
+        # Optional core.inference.response_cache.ResponseCache, set for deterministic experiments
+        self.response_cache = None
         # self._initialize_client()
 
     @abstractmethod
@@ -72,6 +84,12 @@ class BaseInferencer(ABC):
         """Return the model ID."""
         return self.model_id
 
+    def _generate_cached(self, request: Dict[str, Any], generate: Callable[[], Any]) -> Any:
+        """Call `generate` for the model request `request`, through the response cache when one is set."""
+        if self.response_cache is None:
+            return generate()
+        return self.response_cache.generate(request, generate)
+
 
 class ExperimentQuestionMetrics(BaseModel):
     id : str = Field(default_factory=lambda: str(uuid.uuid4()), description="The unique identifier for the question")
@@ -326,6 +344,13 @@ class BaseHierarchicalChunker(ABC):
 class BaseEmbedder(ABC):
     """Abstract base class for all embedders."""
 
+    # Largest number of texts, and payload bytes (0 = unbounded), accepted in one request.
+    # Embedders without a native batch API keep a batch size of 1.
+    max_batch_size: int = 1
+    max_batch_bytes: int = 0
+    # Concurrent single-text calls used by the default `embed_batch`
+    batch_fallback_concurrency: int = 8
+
     def __init__(self, model_id: str) -> None:
         self.model_id = model_id
 
@@ -337,6 +362,21 @@ class BaseEmbedder(ABC):
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> List[float]:
         pass
 
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> List[Tuple[Dict[Any, Any], Sequence[float]]]:
+        """
+        Embed several texts, returning (metadata, embedding) pairs in input order. Embeddings
+        are lists of floats or float32 NumPy rows; `embed` always returns lists.
+
+        This default falls back to concurrent `embed` calls; embedders whose API accepts
+        many texts per request override it.
+        """
+        if len(texts) <= 1:
+            return [self.embed(text, dimensions=dimensions, normalize=normalize) for text in texts]
+        with ThreadPoolExecutor(max_workers=min(len(texts), self.batch_fallback_concurrency)) as executor:
+            return list(executor.map(
+                lambda text: self.embed(text, dimensions=dimensions, normalize=normalize), texts
+            ))
+
     def get_model_id(self) -> str:
         return self.model_id
     
@@ -26,6 +26,46 @@ class Config:
     bedrock_role_arn : str
     sagemaker_role_arn: str
     bedrock_limit_csv_path: str
+    indexing_memory_budget_mb: int
+    embedding_cache_enabled: bool
+    embedding_cache_dir: str
+    embedding_cache_max_mb: int
+    embedding_cache_s3_prefix: str
+    artifact_cache_enabled: bool
+    artifact_cache_s3_prefix: str
+    pdf_extraction_backend: str
+    pdf_extraction_workers: int
+    s3_download_concurrency: int
+    s3_multipart_chunk_mb: int
+    kb_stream_downloads: bool
+    hierarchical_parent_index: bool
+    opensearch_bulk_workers: int
+    opensearch_bulk_max_docs: int
+    opensearch_bulk_max_mb: int
+    opensearch_bulk_max_retries: int
+    opensearch_ingest_tuning: bool
+    opensearch_force_merge: bool
+    opensearch_knn_warmup: bool
+    embedding_artifact_enabled: bool
+    embedding_artifact_lease_minutes: int
+    incremental_indexing_enabled: bool
+    indexing_checkpoint_seconds: int
+    indexing_lambda_reserve_seconds: int
+    indexing_lambda_max_continuations: int
+    retrieval_max_concurrency: int
+    rerank_cache_enabled: bool
+    rerank_cache_dir: str
+    rerank_cache_max_mb: int
+    rerank_cache_s3_prefix: str
+    llm_response_cache_enabled: bool
+    llm_response_cache_dir: str
+    llm_response_cache_max_mb: int
+    llm_response_cache_s3_prefix: str
+    retrieval_store_enabled: bool
+    question_embedding_store_enabled: bool
+    retrieval_journal_enabled: bool
+    retrieval_journal_dir: str
+    retrieval_journal_upload_seconds: int
 
     @staticmethod
     def load_config() -> 'Config':
@@ -57,7 +97,48 @@ class Config:
             s3_bucket=os.getenv('s3_bucket', ''),
             bedrock_role_arn=os.getenv('bedrock_role_arn', ''),
             sagemaker_role_arn=os.getenv('sagemaker_role_arn', ''),
-            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', '')
+            bedrock_limit_csv_path=os.getenv('bedrock_limit_csv', ''),
+            indexing_memory_budget_mb=int(os.getenv('indexing_memory_budget_mb', '256')),
+            embedding_cache_enabled=os.getenv('embedding_cache_enabled', 'true').lower() == 'true',
+            embedding_cache_dir=os.getenv('embedding_cache_dir', '/tmp/embedding_cache'),
+            # Pushing to S3 needs about 3x the cache in the temp directory, which is 512 MB on Lambda
+            embedding_cache_max_mb=int(os.getenv('embedding_cache_max_mb', '64')),
+            embedding_cache_s3_prefix=os.getenv('embedding_cache_s3_prefix', 'embedding_cache'),
+            artifact_cache_enabled=os.getenv('artifact_cache_enabled', 'true').lower() == 'true',
+            artifact_cache_s3_prefix=os.getenv('artifact_cache_s3_prefix', 'artifact_cache'),
+            pdf_extraction_backend=os.getenv('pdf_extraction_backend', 'pymupdf').lower(),
+            pdf_extraction_workers=int(os.getenv('pdf_extraction_workers', '0')),
+            s3_download_concurrency=int(os.getenv('s3_download_concurrency', '16')),
+            s3_multipart_chunk_mb=int(os.getenv('s3_multipart_chunk_mb', '8')),
+            kb_stream_downloads=os.getenv('kb_stream_downloads', 'false').lower() == 'true',
+            hierarchical_parent_index=os.getenv('hierarchical_parent_index', 'true').lower() == 'true',
+            opensearch_bulk_workers=int(os.getenv('opensearch_bulk_workers', '4')),
+            opensearch_bulk_max_docs=int(os.getenv('opensearch_bulk_max_docs', '500')),
+            opensearch_bulk_max_mb=int(os.getenv('opensearch_bulk_max_mb', '10')),
+            opensearch_bulk_max_retries=int(os.getenv('opensearch_bulk_max_retries', '8')),
+            opensearch_ingest_tuning=os.getenv('opensearch_ingest_tuning', 'true').lower() == 'true',
+            opensearch_force_merge=os.getenv('opensearch_force_merge', 'false').lower() == 'true',
+            opensearch_knn_warmup=os.getenv('opensearch_knn_warmup', 'false').lower() == 'true',
+            embedding_artifact_enabled=os.getenv('embedding_artifact_enabled', 'true').lower() == 'true',
+            embedding_artifact_lease_minutes=int(os.getenv('embedding_artifact_lease_minutes', '30')),
+            incremental_indexing_enabled=os.getenv('incremental_indexing_enabled', 'true').lower() == 'true',
+            indexing_checkpoint_seconds=int(os.getenv('indexing_checkpoint_seconds', '300')),
+            indexing_lambda_reserve_seconds=int(os.getenv('indexing_lambda_reserve_seconds', '120')),
+            indexing_lambda_max_continuations=int(os.getenv('indexing_lambda_max_continuations', '50')),
+            retrieval_max_concurrency=int(os.getenv('retrieval_max_concurrency', '0')),
+            rerank_cache_enabled=os.getenv('rerank_cache_enabled', 'true').lower() == 'true',
+            rerank_cache_dir=os.getenv('rerank_cache_dir', '/tmp/rerank_cache'),
+            rerank_cache_max_mb=int(os.getenv('rerank_cache_max_mb', '64')),
+            rerank_cache_s3_prefix=os.getenv('rerank_cache_s3_prefix', 'rerank_cache'),
+            llm_response_cache_enabled=os.getenv('llm_response_cache_enabled', 'false').lower() == 'true',
+            llm_response_cache_dir=os.getenv('llm_response_cache_dir', '/tmp/llm_response_cache'),
+            llm_response_cache_max_mb=int(os.getenv('llm_response_cache_max_mb', '256')),
+            llm_response_cache_s3_prefix=os.getenv('llm_response_cache_s3_prefix', 'llm_response_cache'),
+            retrieval_store_enabled=os.getenv('retrieval_store_enabled', 'true').lower() == 'true',
+            question_embedding_store_enabled=os.getenv('question_embedding_store_enabled', 'true').lower() == 'true',
+            retrieval_journal_enabled=os.getenv('retrieval_journal_enabled', 'true').lower() == 'true',
+            retrieval_journal_dir=os.getenv('retrieval_journal_dir', '/tmp/retrieval_journal'),
+            retrieval_journal_upload_seconds=int(os.getenv('retrieval_journal_upload_seconds', '60'))
             )
 
 
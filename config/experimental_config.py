@@ -13,6 +13,8 @@ class ExperimentalConfig(BaseModel):
     chunking_strategy: str = Field(alias="chunking_strategy")
     chunk_size: Union[int, List] = Field(alias="chunk_size")
     chunk_overlap: Union[int, List] = Field(alias="chunk_overlap")
+    # Token counter enforcing chunk budgets: 'chars' (4 chars per token) or 'tiktoken[:<encoding>]'
+    chunk_tokenizer: str = Field(alias="chunk_tokenizer", default="chars")
     hierarchical_parent_chunk_size: int = Field(alias="hierarchical_parent_chunk_size")
     hierarchical_child_chunk_size: int = Field(alias="hierarchical_child_chunk_size")
     hierarchical_chunk_overlap_percentage: int = Field(alias="hierarchical_chunk_overlap_percentage")
@@ -1,2 +1,3 @@
 from .sagemaker_constants import SageMakerInstanceConstants
-from .app_constants import ErrorTypes, StatusCodes
\ No newline at end of file
+from .app_constants import ErrorTypes, StatusCodes
+from .model_constants import ModelInvocationConstants
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Microbenchmark of the span chunkers against the former LangChain `CharacterTextSplitter` path.
+
+The corpora are built from the bundled `dataset/` folders (every string in their JSON files),
+optionally repeated to reach a realistic size, or from a folder of PDFs:
+
+    python -m core.chunking.benchmark
+    python -m core.chunking.benchmark --repeat 50 --chunk-sizes 128 512
+    python -m core.chunking.benchmark --pdf-dir /path/to/kb
+"""
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+import argparse
+import json
+import os
+import time
+
+from langchain.text_splitter import CharacterTextSplitter
+
+from core.chunking import FixedChunker, HierarchicalChunker
+from core.chunking.span_chunker import create_token_counter
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "dataset")
+
+def _iter_strings(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
+
+def load_dataset_corpora(dataset_dir: str = DATASET_DIR) -> Dict[str, str]:
+    """One corpus per dataset folder: all strings of its JSON files joined by newlines."""
+    corpora = {}
+    for name in sorted(os.listdir(dataset_dir)):
+        folder = os.path.join(dataset_dir, name)
+        if not os.path.isdir(folder):
+            continue
+        strings = []
+        for file in sorted(os.listdir(folder)):
+            if file.endswith(".json"):
+                with open(os.path.join(folder, file)) as json_file:
+                    strings.extend(_iter_strings(json.load(json_file)))
+        corpora[name] = "\n".join(strings)
+    return corpora
+
+def load_pdf_corpus(pdf_dir: str) -> Dict[str, str]:
+    from util.pdf_utils import process_pdf_from_folder
+    return {os.path.basename(os.path.normpath(pdf_dir)): "\n".join(process_pdf_from_folder(pdf_dir))}
+
+def langchain_fixed(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """The former FixedChunker implementation."""
+    for sep in [' ', '\t', '\n', '\r', '\f', '\v']:
+        text = text.replace(sep, ' ')
+    chunk_size = 4 * chunk_size
+    splitter = CharacterTextSplitter(separator=" ", chunk_size=chunk_size,
+                                     chunk_overlap=int(chunk_overlap * chunk_size / 100),
+                                     length_function=len, is_separator_regex=False)
+    return splitter.split_text(text)
+
+def langchain_hierarchical(text: str, parent_chunk_size: int, child_chunk_size: int, chunk_overlap: int) -> List[Tuple[str, str]]:
+    """The former HierarchicalChunker implementation, without parent ids."""
+    for sep in [' ', '\t', '\n', '\r', '\f', '\v']:
+        text = text.replace(sep, ' ')
+    parent_splitter = CharacterTextSplitter(separator=" ", chunk_size=4 * parent_chunk_size, chunk_overlap=0,
+                                            length_function=len, is_separator_regex=False)
+    child_splitter = CharacterTextSplitter(separator=" ", chunk_size=4 * child_chunk_size,
+                                           chunk_overlap=int(chunk_overlap * 4 * child_chunk_size / 100),
+                                           length_function=len, is_separator_regex=False)
+    return [(parent, child) for parent in parent_splitter.split_text(text) for child in child_splitter.split_text(parent)]
+
+def _best_of(runs: int, function: Callable[[], Sequence]) -> Tuple[float, Sequence]:
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run(corpora: Dict[str, str], chunk_sizes: Sequence[int], overlap: int, runs: int, tokenizer: str) -> None:
+    counter = create_token_counter(tokenizer)
+    print(f"{'corpus':<28}{'chars':>11}  {'strategy':<22}{'langchain ms':>13}{'native ms':>11}{'speedup':>9}{'chunks':>9}  identical")
+    for name, text in corpora.items():
+        for chunk_size in chunk_sizes:
+            cases = [
+                (f"fixed {chunk_size}/{overlap}%",
+                 lambda: langchain_fixed(text, chunk_size, overlap),
+                 lambda: list(FixedChunker(chunk_size, overlap, token_counter=counter).chunk(text)),
+                 lambda chunks: chunks),
+                (f"hierarchical {4 * chunk_size}/{chunk_size}",
+                 lambda: langchain_hierarchical(text, 4 * chunk_size, chunk_size, overlap),
+                 lambda: list(HierarchicalChunker(4 * chunk_size, chunk_size, overlap, token_counter=counter).chunk(text)),
+                 lambda chunks: [(parent, child) for _, parent, child in chunks]),
+            ]
+            for label, reference, native, comparable in cases:
+                reference_seconds, reference_chunks = _best_of(runs, reference)
+                native_seconds, native_chunks = _best_of(runs, native)
+                # Only the 4 chars per token counter is expected to reproduce LangChain's chunks
+                identical = comparable(native_chunks) == reference_chunks if tokenizer == "chars" else "n/a"
+                print(f"{name:<28}{len(text):>11}  {label:<22}{reference_seconds * 1000:>13.1f}{native_seconds * 1000:>11.1f}"
+                      f"{reference_seconds / native_seconds:>8.1f}x{len(native_chunks):>9}  {identical}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR, help="folder of dataset corpora (default: bundled dataset/)")
+    parser.add_argument("--pdf-dir", help="benchmark on the text of a folder of PDFs instead")
+    parser.add_argument("--repeat", type=int, default=20, help="repeat each corpus this many times (default: 20)")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[128, 512], help="chunk sizes in tokens")
+    parser.add_argument("--overlap", type=int, default=10, help="chunk overlap percentage (default: 10)")
+    parser.add_argument("--runs", type=int, default=3, help="best of this many runs (default: 3)")
+    parser.add_argument("--tokenizer", default="chars", help="native token counter: chars or tiktoken[:<encoding>]")
+    args = parser.parse_args()
+
+    corpora = load_pdf_corpus(args.pdf_dir) if args.pdf_dir else load_dataset_corpora(args.dataset_dir)
+    corpora = {name: "\n".join([text] * args.repeat) for name, text in corpora.items()}
+    run(corpora, args.chunk_sizes, args.overlap, args.runs, args.tokenizer)
+
+if __name__ == "__main__":
+    main()
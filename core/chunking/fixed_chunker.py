@@ -1,34 +1,23 @@
-from typing import List
-from langchain.text_splitter import CharacterTextSplitter
+from typing import Optional, Sequence
 from baseclasses.base_classes import BaseChunker
+from core.chunking.span_chunker import CharTokenCounter, TokenCounter, chunk_spans
 
 
 class FixedChunker(BaseChunker):
-    """Fixed chunking strategy using LangChain’s CharacterTextSplitter."""
+    """Fixed chunking strategy: chunks of `chunk_size` tokens overlapping by `chunk_overlap` percent."""
 
-    def chunk(self, text : str) -> List[str]:
+    def __init__(self, chunk_size: int, chunk_overlap: int, token_counter: Optional[TokenCounter] = None) -> None:
+        super().__init__(chunk_size, chunk_overlap)
+        # Default to the general norm of 1 token = 4 chars
+        self.token_counter = token_counter or CharTokenCounter()
+
+    def chunk(self, text : str) -> Sequence[str]:
         if self.chunk_size <= 0:
             raise ValueError("chunk_size must be positive")
         if self.chunk_overlap >= self.chunk_size:
             raise ValueError("chunk_overlap must be less than chunk_size")
         if not text:
             raise ValueError("Input text cannot be empty or None")
-        
-        # TODO: Temporary fix, better to move to recursive
-        separators = [' ', '\t', '\n', '\r', '\f', '\v']
-        for sep in separators:
-            text = text.replace(sep, ' ')
 
-        # chunk size is in tokens, general norm : 1 token = 4 chars
-        chunk_size = 4 * self.chunk_size
-        # overlap is in percentage
-        chunk_overlap = int(self.chunk_overlap * chunk_size / 100)
-        self.text_splitter = CharacterTextSplitter(
-            separator=" ",
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            is_separator_regex=False
-        )
-        chunks = self.text_splitter.split_text(text)
-        return chunks
\ No newline at end of file
+        # Single pass over the text; chunk strings are sliced from one buffer on access
+        return chunk_spans(text, self.chunk_size, self.chunk_overlap, self.token_counter)
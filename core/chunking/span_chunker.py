@@ -0,0 +1,274 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, repeat
+from operator import add
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+import re
+import uuid
+
+# Same whitespace set the LangChain based chunkers normalized to a single space
+WORD_PATTERN = re.compile(r"[^ \t\n\r\f\v]+")
+# Characters str.split() also treats as whitespace; when a text has none, str.split() finds
+# the same words as WORD_PATTERN, several times faster
+OTHER_WHITESPACE_PATTERN = re.compile("[\x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]")
+
+Span = Tuple[int, int]
+
+class TokenCounter(ABC):
+    """Measures words in the units that chunk budgets are enforced in."""
+
+    # Cost of the separator between two words of a chunk
+    separator_cost: int = 0
+
+    @abstractmethod
+    def budget(self, tokens: int) -> int:
+        """Convert a budget in tokens to counter units."""
+        pass
+
+    @abstractmethod
+    def count(self, words: Sequence[str]) -> List[int]:
+        """Size of every word in counter units."""
+        pass
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
+
+class CharTokenCounter(TokenCounter):
+    """
+    Character based estimate of `chars_per_token` characters per token.
+
+    With the default of 4 the chunks are identical to the former LangChain
+    `CharacterTextSplitter` path.
+    """
+
+    separator_cost = 1
+
+    def __init__(self, chars_per_token: int = 4) -> None:
+        self.chars_per_token = chars_per_token
+
+    def budget(self, tokens: int) -> int:
+        return self.chars_per_token * tokens
+
+    def count(self, words: Sequence[str]) -> List[int]:
+        return list(map(len, words))
+
+    @property
+    def name(self) -> str:
+        return f"chars/{self.chars_per_token}"
+
+
+class TiktokenCounter(TokenCounter):
+    """
+    Exact BPE token counts from tiktoken (optional dependency).
+
+    Every word is counted with its leading space, which BPE vocabularies merge into the
+    word's first token, so the separator itself costs nothing.
+    """
+
+    separator_cost = 0
+
+    def __init__(self, encoding: str = "cl100k_base") -> None:
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError("TiktokenCounter requires the `tiktoken` package (pip install tiktoken)") from e
+        self.encoding_name = encoding
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def budget(self, tokens: int) -> int:
+        return tokens
+
+    def count(self, words: Sequence[str]) -> List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch([" " + word for word in words])]
+
+    @property
+    def name(self) -> str:
+        return f"tiktoken/{self.encoding_name}"
+
+
+def create_token_counter(name: Optional[str]) -> TokenCounter:
+    """Token counter by name: 'chars' (default) or 'tiktoken[:<encoding>]'."""
+    if not name or name == "chars":
+        return CharTokenCounter()
+    if name.startswith("tiktoken"):
+        _, _, encoding = name.partition(":")
+        return TiktokenCounter(encoding or "cl100k_base")
+    raise ValueError(f"Unknown chunk tokenizer: {name}")
+
+
+class ChunkSpans(Sequence[str]):
+    """
+    Chunks of one text as (start, end) offsets into a single buffer.
+
+    The buffer holds the text's words separated by single spaces; chunk strings are only
+    sliced out when an element is accessed.
+    """
+
+    def __init__(self, buffer: str, spans: List[Span]) -> None:
+        self.buffer = buffer
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            return [self.buffer[start:end] for start, end in self.spans[index]]
+        start, end = self.spans[index]
+        return self.buffer[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        buffer = self.buffer
+        for start, end in self.spans:
+            yield buffer[start:end]
+
+
+class HierarchicalChunkSpans(Sequence[Tuple[str, str, str]]):
+    """
+    Hierarchical chunks of one text as offsets into a single buffer.
+
+    Elements are (parent_id, parent_chunk, child_chunk) tuples, materialized on access;
+    when iterating, each parent string is sliced once and shared by all of its children.
+    """
+
+    def __init__(self, buffer: str, parents: List[Span], children: List[Tuple[int, Span]]) -> None:
+        self.buffer = buffer
+        self.parents = parents
+        # (parent index, child span) per child, in order
+        self.children = children
+        self.parent_ids = [str(uuid.uuid4()) for _ in parents]
+
+    def __len__(self) -> int:
+        return len(self.children)
+
+    def _materialize(self, index: int) -> Tuple[str, str, str]:
+        parent, (start, end) = self.children[index]
+        parent_start, parent_end = self.parents[parent]
+        return self.parent_ids[parent], self.buffer[parent_start:parent_end], self.buffer[start:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._materialize(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._materialize(index)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        buffer = self.buffer
+        current_parent, parent_chunk = -1, ""
+        for parent, (start, end) in self.children:
+            if parent != current_parent:
+                parent_start, parent_end = self.parents[parent]
+                current_parent, parent_chunk = parent, buffer[parent_start:parent_end]
+            yield self.parent_ids[parent], parent_chunk, buffer[start:end]
+
+
+def split_words(text: str) -> Tuple[str, List[str], List[int]]:
+    """
+    Scan the text once for its words.
+
+    Returns the buffer (words joined by single spaces), the words and the start offset
+    of every word in that buffer.
+    """
+    words = WORD_PATTERN.findall(text) if OTHER_WHITESPACE_PATTERN.search(text) else text.split()
+    starts = list(accumulate(chain((0,), map(add, map(len, words), repeat(1)))))
+    starts.pop()
+    return " ".join(words), words, starts
+
+
+def prefix_costs(sizes: Sequence[int], separator_cost: int) -> List[int]:
+    """prefix[k] = cost of words [0, k) each followed by a separator."""
+    return list(accumulate(chain((0,), map(add, sizes, repeat(separator_cost)))))
+
+
+def merge_words(prefix: Sequence[int], lo: int, hi: int, chunk_size: int, chunk_overlap: int,
+                separator_cost: int) -> List[Tuple[int, int]]:
+    """
+    Greedily merge words [lo, hi) into chunks of at most chunk_size units.
+
+    Consecutive chunks share up to chunk_overlap units of trailing words. The result is
+    the one of LangChain's `TextSplitter._merge_splits` (a single word larger than the
+    budget becomes its own chunk), so chunk boundaries match the former implementation;
+    but chunk ends and overlap starts are found by bisecting the prefix costs, so the work
+    is per chunk rather than per word.
+
+    Returns:
+        List[Tuple[int, int]]: (first word, last word + 1) index ranges of the chunks.
+    """
+    # cost(first, last) of words [first, last) = prefix[last] - prefix[first] - separator_cost
+    chunks = []
+    first = lo
+    while first < hi:
+        # First word that no longer fits after the window [first, end)
+        end = max(bisect_right(prefix, prefix[first] + separator_cost + chunk_size, first + 1, hi + 1) - 1, first + 1)
+        if end >= hi:
+            chunks.append((first, hi))
+            break
+        chunks.append((first, end))
+        # Drop leading words until the remainder fits the overlap and leaves room for word `end`
+        within_overlap = bisect_left(prefix, prefix[end] - separator_cost - chunk_overlap, first, end)
+        room_for_next = bisect_left(prefix, prefix[end + 1] - separator_cost - chunk_size, first, end)
+        first = max(first, within_overlap, room_for_next)
+    return chunks
+
+
+def _overlap_units(budget: int, overlap_percentage: float) -> int:
+    return int(overlap_percentage * budget / 100)
+
+
+def _trim(buffer: str, start: int, end: int) -> Span:
+    """Strip whitespace (e.g. non-breaking spaces inside words) from both ends of a span, like str.strip()."""
+    while start < end and buffer[start].isspace():
+        start += 1
+    while end > start and buffer[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _merge_spans(buffer: str, words: List[str], starts: List[int], prefix: Sequence[int], lo: int, hi: int,
+                 budget: int, overlap: int, separator_cost: int) -> List[Tuple[Span, int, int]]:
+    """Merge words [lo, hi) and return the trimmed, non-empty span of every chunk with its word range."""
+    spans = []
+    for first, last in merge_words(prefix, lo, hi, budget, overlap, separator_cost):
+        span = _trim(buffer, starts[first], starts[last - 1] + len(words[last - 1]))
+        if span[0] < span[1]:
+            spans.append((span, first, last))
+    return spans
+
+
+def chunk_spans(text: str, chunk_size: int, overlap_percentage: float, token_counter: TokenCounter) -> ChunkSpans:
+    """Chunks of at most chunk_size tokens, overlapping by overlap_percentage of the chunk size."""
+    buffer, words, starts = split_words(text)
+    prefix = prefix_costs(token_counter.count(words), token_counter.separator_cost)
+    budget = token_counter.budget(chunk_size)
+    spans = _merge_spans(buffer, words, starts, prefix, 0, len(words), budget,
+                         _overlap_units(budget, overlap_percentage), token_counter.separator_cost)
+    return ChunkSpans(buffer, [span for span, _, _ in spans])
+
+
+def hierarchical_chunk_spans(text: str, parent_chunk_size: int, child_chunk_size: int, overlap_percentage: float,
+                             token_counter: TokenCounter) -> HierarchicalChunkSpans:
+    """Parent chunks without overlap, each split into child chunks overlapping by overlap_percentage."""
+    buffer, words, starts = split_words(text)
+    separator_cost = token_counter.separator_cost
+    prefix = prefix_costs(token_counter.count(words), separator_cost)
+    child_budget = token_counter.budget(child_chunk_size)
+    child_overlap = _overlap_units(child_budget, overlap_percentage)
+
+    parents, children = [], []
+    for (parent_start, parent_end), first, last in _merge_spans(buffer, words, starts, prefix, 0, len(words),
+                                                                token_counter.budget(parent_chunk_size), 0, separator_cost):
+        parent = len(parents)
+        parents.append((parent_start, parent_end))
+        if (parent_start, parent_end) == (starts[first], starts[last - 1] + len(words[last - 1])):
+            child_spans = _merge_spans(buffer, words, starts, prefix, first, last, child_budget, child_overlap, separator_cost)
+        else:
+            # Children are split from the stripped parent, whose edge words were trimmed
+            _, parent_words, parent_starts = split_words(buffer[parent_start:parent_end])
+            parent_starts = [parent_start + offset for offset in parent_starts]
+            child_spans = _merge_spans(buffer, parent_words, parent_starts,
+                                       prefix_costs(token_counter.count(parent_words), separator_cost), 0, len(parent_words), child_budget, child_overlap, separator_cost)
+        children.extend((parent, span) for span, _, _ in child_spans)
+    return HierarchicalChunkSpans(buffer, parents, children)
@@ -1,12 +1,27 @@
 import boto3
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from botocore.exceptions import ClientError
+from concurrent.futures import Future, ThreadPoolExecutor
 from decimal import Decimal
 import json
+import queue
+import random
+import threading
 import time
 from datetime import datetime, timezone
 
+# Errors of a whole batch_write_item call that are worth retrying
+RETRYABLE_BATCH_WRITE_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException',
+                                'RequestLimitExceeded', 'InternalServerError', 'ServiceUnavailable')
+
+class BatchWriteError(Exception):
+    """Items a batch write could not store before its deadline."""
+
+    def __init__(self, message: str, items: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.items = items
+
 class DynamoDBOperations:
     """Class to handle DynamoDB operations."""
 
@@ -316,23 +331,30 @@ class DynamoDBOperations:
             self.logger.error(f"Unexpected error: {str(e)}")
             raise
 
-    def batch_write(self, items: List[Dict[str, Any]], max_retries: int = 3) -> None:
+    def batch_write(self, items: List[Dict[str, Any]], deadline_seconds: float = 300.0,
+                    base_delay: float = 0.1, max_delay: float = 10.0) -> None:
         """
-        Batch write items to DynamoDB with automatic retry and backoff.
+        Batch write items to DynamoDB, retrying unprocessed items and throttled calls with
+        jittered exponential backoff until `deadline_seconds` have passed.
         DynamoDB has a limit of 25 items per batch write operation.
 
         Args:
             items (List[Dict[str, Any]]): List of items to write (max 25 items)
-            max_retries (int): Maximum number of retries for failed items
+            deadline_seconds (float): Time allowed for the items to be written, retries included
+            base_delay (float): Backoff before the first retry, doubled on each retry
+            max_delay (float): Longest backoff between retries
+
+        Raises:
+            BatchWriteError: With the items still unprocessed at the deadline; items are never dropped
         """
-        try:
-            if len(items) > 25:
-                raise ValueError("DynamoDB batch_write_item operation can only process up to 25 items at a time")
-                
-            unprocessed_items = items
-            retry_count = 0
-            
-            while unprocessed_items and retry_count < max_retries:
+        if len(items) > 25:
+            raise ValueError("DynamoDB batch_write_item operation can only process up to 25 items at a time")
+
+        deadline = time.monotonic() + deadline_seconds
+        unprocessed_items = items
+        retry_count = 0
+        while True:
+            try:
                 # Prepare batch write request
                 request_items = {
                     self.table_name: [
@@ -344,34 +366,33 @@ class DynamoDBOperations:
                         for item in unprocessed_items
                     ]
                 }
-                
+
                 response = self.dynamodb_client.batch_write_item(
                     RequestItems=request_items
                 )
-                
+
                 # Handle unprocessed items
                 unprocessed_items = [
                     item['PutRequest']['Item']
                     for item in response.get('UnprocessedItems', {}).get(self.table_name, [])
                 ]
-                
-                if unprocessed_items:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        # Exponential backoff
-                        time.sleep(2 ** retry_count)
-            
-            if unprocessed_items:
-                self.logger.warning(f"{len(unprocessed_items)} items remained unprocessed after {max_retries} retries")
-            else:
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in RETRYABLE_BATCH_WRITE_ERRORS:
+                    self.logger.error(f"Error in batch write operation: {str(e)}")
+                    raise BatchWriteError(f"Batch write to {self.table_name} failed: {e}", unprocessed_items) from e
+
+            if not unprocessed_items:
                 self.logger.info(f"Successfully batch wrote {len(items)} items")
+                return
 
-        except ClientError as e:
-            self.logger.error(f"Error in batch write operation: {str(e)}")
-            raise
-        except Exception as e:
-            self.logger.error(f"Unexpected error: {str(e)}")
-            raise
+            # Full jitter keeps parallel writers from retrying in lockstep
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** retry_count))
+            if time.monotonic() + delay > deadline:
+                self.logger.error(f"{len(unprocessed_items)} items remained unprocessed after {retry_count + 1} attempts")
+                raise BatchWriteError(f"{len(unprocessed_items)} items could not be written to {self.table_name} "
+                                      f"within {deadline_seconds} seconds", unprocessed_items)
+            retry_count += 1
+            time.sleep(delay)
 
     def delete_item(self, key: Dict[str, Any], condition_expression: str = None) -> Dict:
         """
@@ -404,3 +425,108 @@ class DynamoDBOperations:
         except Exception as e:
             self.logger.error(f"Unexpected error: {str(e)}")
             raise
+
+
+class DynamoDBBatchWriter:
+    """
+    Write-behind of items to a DynamoDB table: `add` queues an item and returns, while a
+    background thread groups the items in batches of `batch_size` and writes up to
+    `max_workers` batches in parallel (see `DynamoDBOperations.batch_write`).
+
+    The queue holds at most `max_queued_items` items, so `add` only waits when DynamoDB
+    falls that far behind. `flush` waits for every item added so far to be written and
+    raises BatchWriteError, holding the items, if a batch could not be written by its
+    deadline; later `add` and `flush` calls raise it as well. `close` flushes and stops
+    the writer.
+    """
+
+    _FLUSH = object()
+    _CLOSE = object()
+
+    def __init__(self, dynamodb: DynamoDBOperations, batch_size: int = 25, max_workers: int = 4,
+                 max_queued_items: int = 1000, deadline_seconds: float = 300.0) -> None:
+        self.dynamodb = dynamodb
+        self.batch_size = batch_size
+        self.deadline_seconds = deadline_seconds
+        self.logger = logging.getLogger(__name__)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queued_items)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dynamodb-writer")
+        self._pending: List[Tuple[Future, List[Dict[str, Any]]]] = []
+        self._failed: List[Dict[str, Any]] = []
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="dynamodb-batcher", daemon=True)
+        self._thread.start()
+
+    def add(self, item: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("DynamoDBBatchWriter is closed")
+        self._raise_failure()
+        self._queue.put(item)
+
+    def flush(self) -> None:
+        if not self._closed:
+            done = threading.Event()
+            self._queue.put((self._FLUSH, done))
+            done.wait()
+        self._raise_failure()
+
+    def close(self) -> None:
+        if not self._closed:
+            done = threading.Event()
+            self._queue.put((self._CLOSE, done))
+            done.wait()
+            self._closed = True
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+        self._raise_failure()
+
+    def _raise_failure(self) -> None:
+        with self._lock:
+            if self._error is not None:
+                raise BatchWriteError(f"{len(self._failed)} items could not be written to {self.dynamodb.table_name}: "
+                                      f"{self._error}", list(self._failed)) from self._error
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        while True:
+            entry = self._queue.get()
+            if isinstance(entry, tuple) and entry and entry[0] in (self._FLUSH, self._CLOSE):
+                command, done = entry
+                if batch:
+                    self._submit(batch)
+                    batch = []
+                self._wait_pending()
+                done.set()
+                if command is self._CLOSE:
+                    return
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._submit(batch)
+                batch = []
+
+    def _submit(self, batch: List[Dict[str, Any]]) -> None:
+        future = self._executor.submit(self.dynamodb.batch_write, batch, self.deadline_seconds)
+        still_pending = []
+        for pending in self._pending:
+            if pending[0].done():
+                self._record(*pending)
+            else:
+                still_pending.append(pending)
+        self._pending = still_pending + [(future, batch)]
+
+    def _record(self, future: Future, batch: List[Dict[str, Any]]) -> None:
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Could not write {len(batch)} items to {self.dynamodb.table_name}: {error}")
+            with self._lock:
+                self._failed.extend(error.items if isinstance(error, BatchWriteError) else batch)
+                if self._error is None:
+                    self._error = error
+
+    def _wait_pending(self) -> None:
+        for future, batch in self._pending:
+            self._record(future, batch)
+        self._pending = []
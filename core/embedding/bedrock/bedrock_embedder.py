@@ -1,8 +1,11 @@
 import boto3
-from typing import Dict, List, Tuple, Any
+from botocore.config import Config as BotoConfig
+from typing import Dict, List, Sequence, Tuple, Any
 from baseclasses.base_classes import BaseEmbedder
 from util.boto3_utils import BedRockRetryHander
-import json
+from util import fast_json
+from util.vector_utils import iter_text_batches, normalize_rows, split_batch_metadata
+import numpy as np
 
 import logging
 
@@ -11,36 +14,79 @@ logger.setLevel(logging.INFO)
 
 # Bedrock Base Embedder
 class BedrockEmbedder(BaseEmbedder):
-    def __init__(self, model_id: str, region: str, role_arn: str = None) -> None:
+    # Models that do not normalize server-side get their vectors normalized here
+    normalize_client_side: bool = False
+
+    def __init__(self, model_id: str, region: str, role_arn: str = None, max_concurrency: int = 10) -> None:
         super().__init__(model_id)
-        self.client = boto3.client("bedrock-runtime", region_name=region)
+        # One pooled connection per concurrent caller
+        self.client = boto3.client("bedrock-runtime", region_name=region,
+                                   config=BotoConfig(max_pool_connections=max_concurrency))
 
     def prepare_payload(self, text: str, dimensions: int, normalize: bool) -> Dict:
         raise NotImplementedError("Subclasses must implement `prepare_payload`")
 
+    def prepare_batch_payload(self, texts: List[str], dimensions: int, normalize: bool) -> Dict:
+        raise NotImplementedError("Subclasses with a batch API must implement `prepare_batch_payload`")
+
     @BedRockRetryHander()
+    def _invoke(self, payload: Dict) -> Tuple[Dict[Any, Any], Dict]:
+        """Invoke the model and return (metadata, parsed model response)."""
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=fast_json.dumps(payload)
+        )
+        model_response = fast_json.loads(response["body"].read())
+        metadata = {}
+        if response and 'ResponseMetadata' in response and 'HTTPHeaders' in response['ResponseMetadata']:
+            input_tokens = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-input-token-count']
+            latency = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-invocation-latency']
+            metadata = {
+                'inputTokens': input_tokens,
+                'latencyMs': latency
+            }
+        return metadata, model_response
+
     def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[Any, Any], List[float]]:
         try:
             payload = self.prepare_payload(text, dimensions, normalize)
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(payload)
-            )
-            model_response = json.loads(response["body"].read())
-            metadata = {}
-            if response and 'ResponseMetadata' in response and 'HTTPHeaders' in response['ResponseMetadata']:
-                input_tokens = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-input-token-count']
-                latency = response['ResponseMetadata']['HTTPHeaders']['x-amzn-bedrock-invocation-latency']
-                metadata = {
-                    'inputTokens': input_tokens,
-                    'latencyMs': latency
-                }
-            return metadata, self.extract_embedding(model_response)
+            metadata, model_response = self._invoke(payload)
+            embedding = self.extract_embedding(model_response)
+            if normalize and self.normalize_client_side:
+                embedding = normalize_rows([embedding])[0].tolist()
+            return metadata, embedding
         except Exception as e:
             logger.error(f"Error during embedding: {e}")
             raise
 
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> List[Tuple[Dict[Any, Any], Sequence[float]]]:
+        """
+        Embed texts with one request per size/byte-bounded batch when the model supports it.
+
+        Batched embeddings are rows of one float32 matrix per request.
+        """
+        if self.max_batch_size <= 1:
+            return super().embed_batch(texts, dimensions=dimensions, normalize=normalize)
+        try:
+            results = []
+            for start, end in iter_text_batches(texts, self.max_batch_size, self.max_batch_bytes):
+                batch = texts[start:end]
+                metadata, model_response = self._invoke(self.prepare_batch_payload(batch, dimensions, normalize))
+                embeddings = np.asarray(self.extract_embeddings(model_response), dtype=np.float32)
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
+                if normalize and self.normalize_client_side:
+                    embeddings = normalize_rows(embeddings)
+                results.extend(zip(split_batch_metadata(metadata, batch), embeddings))
+            return results
+        except Exception as e:
+            logger.error(f"Error during batch embedding: {e}")
+            raise
+
     def extract_embedding(self, response: Dict) -> List[float]:
-        raise NotImplementedError("Subclasses must implement `extract_embedding`")
\ No newline at end of file
+        raise NotImplementedError("Subclasses must implement `extract_embedding`")
+
+    def extract_embeddings(self, response: Dict) -> List[List[float]]:
+        raise NotImplementedError("Subclasses with a batch API must implement `extract_embeddings`")
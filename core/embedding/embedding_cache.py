@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+from baseclasses.base_classes import BaseEmbedder
+from util.kv_store import DiskKVStore, RequestCoalescer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    Content-addressed cache in front of any embedder.
+
+    Vectors are keyed by hash(model_id, dimensions, normalize, text) and kept as float32
+    in a DiskKVStore (one file per model). Concurrent requests for the same text are
+    coalesced into a single call to the wrapped embedder. Cache hits, including coalesced
+    waits, report 0 input tokens so they are not billed as indexing embed tokens.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, cache_dir: str, max_bytes: int = 64 * 1024 * 1024,
+                 s3_bucket: Optional[str] = None, s3_prefix: Optional[str] = None) -> None:
+        super().__init__(embedder.model_id)
+        self.embedder = embedder
+        # Batching is decided by the wrapped embedder's API limits
+        self.max_batch_size = embedder.max_batch_size
+        self.max_batch_bytes = embedder.max_batch_bytes
+
+        file_name = re.sub(r'[^A-Za-z0-9._-]', '_', embedder.model_id) + ".sqlite"
+        self.store = DiskKVStore(os.path.join(cache_dir, file_name), max_bytes=max_bytes)
+        self.s3_bucket = s3_bucket
+        self.s3_key = f"{s3_prefix.strip('/')}/{file_name}" if s3_bucket and s3_prefix else None
+        self._coalescer = RequestCoalescer()
+
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def prepare_payload(self, text: str, dimensions: int, normalize: bool) -> Dict:
+        return self.embedder.prepare_payload(text, dimensions, normalize)
+
+    def cache_key(self, text: str, dimensions: int, normalize: bool) -> str:
+        content = "\x00".join([self.model_id, str(dimensions), str(bool(normalize)), text])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def embed(self, text: str, dimensions: int = 256, normalize: bool = True) -> Tuple[Dict[Any, Any], List[float]]:
+        metadata, embedding = self.embed_batch([text], dimensions=dimensions, normalize=normalize)[0]
+        return metadata, np.asarray(embedding, dtype=np.float32).tolist()
+
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> List[Tuple[Dict[Any, Any], Sequence[float]]]:
+        keys = [self.cache_key(text, dimensions, normalize) for text in texts]
+        # Cached vectors stay float32 arrays over the stored bytes
+        vectors = {key: np.frombuffer(value, dtype=np.float32)
+                   for key, value in self.store.get_many(keys).items()}
+        cache_hits = len(vectors)
+
+        owned, waiting = self._coalescer.claim(key for key in keys if key not in vectors)
+        owner_metadata = {}
+        if owned:
+            first_index = {}
+            for i, key in enumerate(keys):
+                first_index.setdefault(key, i)
+            try:
+                results = self.embedder.embed_batch([texts[first_index[key]] for key in owned],
+                                                    dimensions=dimensions, normalize=normalize)
+                for key, (metadata, embedding) in zip(owned, results):
+                    owner_metadata[key] = metadata
+                    vectors[key] = embedding
+                resolved = {key: vectors[key] for key in owned}
+            except BaseException as e:
+                self._coalescer.fail(owned, e)
+                raise
+            self._coalescer.resolve(resolved)
+            # The vectors are paid for either way, so a failed cache write only costs future hits
+            try:
+                self.store.put_many((key, np.asarray(vectors[key], dtype=np.float32).tobytes()) for key in owned)
+            except Exception as e:
+                logger.warning(f"Could not cache {len(owned)} embeddings: {e}")
+        for key, future in waiting.items():
+            vectors[key] = future.result()
+
+        with self._stats_lock:
+            self.misses += len(owned)
+            self.hits += cache_hits + len(waiting)
+
+        # Only the first occurrence of a freshly embedded text carries its billed tokens
+        embeddings = []
+        for key in keys:
+            metadata = owner_metadata.pop(key, None)
+            embeddings.append((metadata if metadata is not None else {'inputTokens': 0, 'latencyMs': '0'}, vectors[key]))
+        return embeddings
+
+    def pull(self) -> None:
+        """Merge the shared copy of the cache from S3, if S3 sync is configured."""
+        self.store.sync_pull(self.s3_bucket, self.s3_key)
+
+    def push(self) -> None:
+        """Publish the cache to S3 for later tasks, if S3 sync is configured."""
+        self.store.sync_push(self.s3_bucket, self.s3_key)
+
+    def close(self) -> None:
+        logger.info(f"Embedding cache for {self.model_id}: {self.hits} hits, {self.misses} misses")
+        self.push()
+        self.store.close()
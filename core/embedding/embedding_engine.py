@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+from baseclasses.base_classes import BaseEmbedder
+from util.vector_utils import iter_text_batches
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+@dataclass
+class EmbeddingThroughput:
+    """Cumulative throughput counters of an embedding engine."""
+    chunks: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.chunks} chunks, {self.tokens} tokens in {self.seconds:.2f}s "
+                f"({self.chunks_per_second:.2f} chunks/s, {self.tokens_per_second:.2f} tokens/s)")
+
+
+class ConcurrentEmbeddingEngine:
+    """
+    Thread-pool embedding engine that keeps up to `max_concurrency` embedder requests in flight.
+
+    Results are returned in the order of the input texts. boto3 clients are thread-safe,
+    and throttling is already retried with backoff by the embedders themselves.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, max_concurrency: int) -> None:
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be positive")
+        self.embedder = embedder
+        self.max_concurrency = max_concurrency
+        self.throughput = EmbeddingThroughput()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedder")
+
+    def embed(self, texts: List[str], dimensions: int, normalize: bool) -> List[Tuple[Dict[Any, Any], List[float]]]:
+        """Embed all texts concurrently and return (metadata, embedding) pairs in input order."""
+        if not texts:
+            return []
+
+        # One task per provider request: single texts for embedders without a batch API,
+        # size/byte-bounded batches for those with one
+        batches = [texts[start:end] for start, end in
+                   iter_text_batches(texts, self.embedder.max_batch_size, self.embedder.max_batch_bytes)]
+
+        start_time = time.time()
+        results = [result for batch_results in self._executor.map(
+            lambda batch: self.embedder.embed_batch(batch, dimensions=dimensions, normalize=normalize), batches
+        ) for result in batch_results]
+        elapsed = time.time() - start_time
+
+        tokens = sum(int(metadata.get('inputTokens', 0)) for metadata, _ in results)
+        with self._lock:
+            self.throughput.chunks += len(texts)
+            self.throughput.tokens += tokens
+            self.throughput.seconds += elapsed
+
+        logger.info(f"Embedded {len(texts)} chunks in {len(batches)} requests with concurrency {self.max_concurrency} in {elapsed:.2f}s "
+                    f"({len(texts) / elapsed if elapsed else 0:.2f} chunks/s, {tokens / elapsed if elapsed else 0:.2f} tokens/s)")
+        return results
+
+    def embed_matrix(self, texts: List[str], dimensions: int, normalize: bool) -> Tuple[np.ndarray, List[Dict[Any, Any]]]:
+        """Embed all texts concurrently and return their float32 embedding matrix (rows in input order) and metadata."""
+        results = self.embed(texts, dimensions=dimensions, normalize=normalize)
+        if not results:
+            return np.empty((0, dimensions), dtype=np.float32), []
+        return np.stack([np.asarray(embedding, dtype=np.float32) for _, embedding in results]), [metadata for metadata, _ in results]
+
+    def shutdown(self) -> None:
+        """Release the worker threads and log the cumulative throughput."""
+        self._executor.shutdown(wait=True)
+        logger.info(f"Embedding engine finished: {self.throughput}")
@@ -20,7 +20,7 @@ class EmbedderFactory:
         cls._registry[key] = embedder_cls
 
     @classmethod
-    def create_embedder(cls, experimentalConfig : ExperimentalConfig) -> BaseEmbedder:
+    def create_embedder(cls, experimentalConfig : ExperimentalConfig, max_concurrency: int = 10) -> BaseEmbedder:
         service_type = experimentalConfig.embedding_service
         model_id = experimentalConfig.embedding_model
         key = f"{service_type}:{model_id}"
@@ -34,5 +34,5 @@ class EmbedderFactory:
         if not embedder_cls:
             raise ValueError(f"No embedder registered for service {service_type} and model {model_id}")
         
-        return embedder_cls(model_id, experimentalConfig.aws_region, role_arn)
+        return embedder_cls(model_id, experimentalConfig.aws_region, role_arn, max_concurrency=max_concurrency)
 
@@ -1,7 +1,10 @@
 import boto3
-from typing import Dict, List
+from botocore.config import Config as BotoConfig
+from typing import Dict, List, Sequence, Tuple
 from botocore.exceptions import ClientError
 from baseclasses.base_classes import BaseEmbedder
+from util import fast_json
+from util.vector_utils import iter_text_batches, normalize_rows
 from sagemaker.session import Session
 from sagemaker.predictor import Predictor
 from sagemaker.serializers import JSONSerializer
@@ -24,27 +27,33 @@ EMBEDDING_MODELS = {
         "model_source": "jumpstart",
         "dimension": 1024,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "text_inputs"
+        "input_key": "text_inputs",
+        "max_batch_size": 64
     },
     "huggingface-sentencesimilarity-bge-m3": {
         "model_name": "bge-m3",
         "model_source": "jumpstart",
         "dimension": 1024,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "text_inputs"
+        "input_key": "text_inputs",
+        "max_batch_size": 64
     },
     "huggingface-textembedding-gte-qwen2-7b-instruct": {
         "model_name": "qwen",
         "model_source": "jumpstart",
         "dimension": 3584,
         "instance_type": "ml.g5.2xlarge",
-        "input_key": "inputs"
+        "input_key": "inputs",
+        "max_batch_size": 8
     }
 }
 
+# SageMaker real-time endpoints reject request payloads above 6 MB
+MAX_PAYLOAD_BYTES = 5 * 1024 * 1024
+
 # Sagemaker Base Embedder
 class SageMakerEmbedder(BaseEmbedder):
-    def __init__(self, model_id: str, region: str, role_arn: str) -> None:
+    def __init__(self, model_id: str, region: str, role_arn: str, max_concurrency: int = 10) -> None:
         """
         Initializes the SageMakerEmbedder with the given model ID, region, and role ARN.
         Sets up necessary SageMaker runtime clients, session, and endpoint predictor.
@@ -53,6 +62,7 @@ class SageMakerEmbedder(BaseEmbedder):
             model_id (str): The unique identifier for the model.
             region (str): The AWS region where the SageMaker services are hosted.
             role_arn (str): The ARN of the IAM role. Currently not used but included for future extensions.
+            max_concurrency (int): Number of concurrent callers, each kept a pooled runtime connection.
         """
 
         # Initialize the base class
@@ -64,11 +74,12 @@ class SageMakerEmbedder(BaseEmbedder):
         self.role = role_arn
         
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
+        self.client = boto3.client("sagemaker-runtime", region_name=region,
+                                   config=BotoConfig(max_pool_connections=max_concurrency))
         self.sagemaker_client = boto3.client('sagemaker', region_name=region)
         
-        # Create a new SageMaker session
-        self.session = Session(boto_session=boto3.Session(region_name=region))
+        # Create a new SageMaker session; its predictors invoke the endpoint through the pooled runtime client
+        self.session = Session(boto_session=boto3.Session(region_name=region), sagemaker_runtime_client=self.client)
         
         # Initialize additional embedding-related attributes
         self.embedding_model_id = model_id
@@ -76,6 +87,10 @@ class SageMakerEmbedder(BaseEmbedder):
         self.embedding_model_endpoint_name = f"{self._sanitize_name(model_id)[:44]}-embedding-endpoint"
         
         self.embedding_dimension = EMBEDDING_MODELS.get(model_id, {}).get('dimension', 1024)
+
+        # Endpoint batch limits used by `embed_batch`
+        self.max_batch_size = EMBEDDING_MODELS.get(model_id, {}).get('max_batch_size', 1)
+        self.max_batch_bytes = MAX_PAYLOAD_BYTES
         
         self.wait_time = 5
         
@@ -202,7 +217,7 @@ class SageMakerEmbedder(BaseEmbedder):
 
         # Create AWS and SageMaker sessions for API interactions
         boto_session = boto3.Session(region_name=self.region_name)
-        sagemaker_session = sagemaker.Session(boto_session=boto_session)
+        sagemaker_session = sagemaker.Session(boto_session=boto_session, sagemaker_runtime_client=self.client)
 
         # Look up the appropriate instance type from model configurations
         instance_type = (EMBEDDING_MODELS.get(model_id))['instance_type']
@@ -420,6 +435,58 @@ class SageMakerEmbedder(BaseEmbedder):
             # Re-raise the exception after logging
             raise
     
+    def embed_batch(self, texts: List[str], dimensions: int = 256, normalize: bool = True) -> List[Tuple[Dict, Sequence[float]]]:
+        """
+        Retrieves embeddings for many texts, sending one endpoint request per batch.
+
+        Args:
+            texts (List[str]): The input texts for which embeddings are generated.
+
+        Returns:
+            List[Tuple[Dict, Sequence[float]]]: (metadata, embedding) pairs in input order,
+                embeddings being float32 rows of one matrix per request.
+
+        Raises:
+            ValueError: If the predictor is not initialized, an input text is empty or the
+                endpoint returns an unexpected number of embeddings.
+        """
+        if not self.predictor:
+            raise ValueError("Embedding predictor not initialized")
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Input text cannot be empty")
+
+        results = []
+        for start, end in iter_text_batches(texts, self.max_batch_size, self.max_batch_bytes):
+            batch = texts[start:end]
+            try:
+                start_time = time.time()
+                response = self.embedding_predictor.predict(self.prepare_batch_payload(batch))
+                latency = int((time.time() - start_time) * 1000)
+
+                if isinstance(response, (bytes, bytearray, str)):
+                    response = fast_json.loads(response)
+
+                embeddings = np.asarray(
+                    response['embedding'] if isinstance(response, dict) and 'embedding' in response else response,
+                    dtype=np.float32
+                ).reshape(len(batch), -1)
+
+                # Same post-processing as `embed`: unit length, then truncate or pad to the model dimension
+                embeddings = normalize_rows(embeddings)
+                if embeddings.shape[1] > self.embedding_dimension:
+                    embeddings = embeddings[:, :self.embedding_dimension]
+                elif embeddings.shape[1] < self.embedding_dimension:
+                    embeddings = np.pad(embeddings, ((0, 0), (0, self.embedding_dimension - embeddings.shape[1])))
+
+                # SageMaker does not provide input tokens, use the ~4 characters per token approximation
+                # Rows of the batch matrix, not copied into Python floats
+                for text, embedding in zip(batch, embeddings):
+                    results.append(({'inputTokens': len(text) // 4, 'latencyMs': latency}, embedding))
+            except Exception as e:
+                logger.error("Error in batch embedding of %d texts with model %s: %s", len(batch), self.embedding_model_id, str(e))
+                raise
+        return results
+
     def prepare_payload1(self, text: str, dimensions: int, normalize: bool) -> Dict:
         raise NotImplementedError("Subclasses must implement `prepare_payload`")
     
@@ -455,6 +522,20 @@ class SageMakerEmbedder(BaseEmbedder):
             payload["mode"] = "embedding"
                 
         return payload
+
+    def prepare_batch_payload(self, texts: List[str]) -> Dict:
+        """
+        Prepares a payload carrying several input texts in one request.
+
+        Args:
+            texts (List[str]): The input texts to be processed by the model.
+
+        Returns:
+            Dict: The payload containing the input texts and model configurations.
+        """
+        payload = self.prepare_payload(texts[0])
+        payload[EMBEDDING_MODELS[self.embedding_model_id]["input_key"]] = list(texts)
+        return payload
     
     @staticmethod
     def _sanitize_name(name: str) -> str:
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Any, Dict, List
+import hashlib
+import json
+import logging
+import threading
+
+from util.kv_store import RequestCoalescer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class GuardrailResponseCache:
+    """
+    In-memory LRU of ApplyGuardrail responses, keyed by a hash of the guardrail, its
+    version, the source and the content blocks checked.
+
+    The same questions are checked by every experiment of an execution with the same
+    guardrail, so each is only assessed once per process. Concurrent identical checks are
+    coalesced into one call.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._coalescer = RequestCoalescer()
+
+    @staticmethod
+    def cache_key(guardrail_id: str, guardrail_version: str, source: str, content: List[Dict[str, Any]]) -> str:
+        canonical = json.dumps([guardrail_id, guardrail_version, source, content], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def apply(self, guardrails: Any, guardrail_id: str, guardrail_version: str,
+              content: List[Dict[str, Any]], source: str) -> Dict[str, Any]:
+        """The response of `guardrails.apply_guardrail` for the content, from the cache when checked before."""
+        key = self.cache_key(guardrail_id, guardrail_version, source, content)
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                return response
+
+        def check() -> Dict[str, Any]:
+            response = guardrails.apply_guardrail(
+                guardrail_id=guardrail_id,
+                guardrail_version=guardrail_version,
+                content=content,
+                source=source
+            )
+            with self._lock:
+                self._responses[key] = response
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+            return response
+
+        return self._coalescer.run(key, check)
+
+
+# Shared by the experiments run in this process
+guardrail_response_cache = GuardrailResponseCache()
@@ -1,5 +1,6 @@
 from baseclasses.base_classes import BaseInferencer
 import boto3
+from botocore.config import Config as BotoConfig
 from typing import List, Dict, Any, Union, Tuple
 import logging
 from config.experimental_config import ExperimentalConfig, NShotPromptGuide
@@ -17,14 +18,18 @@ class BedrockInferencer(BaseInferencer):
     # This part was added as part of the SageMaker implementation changes. 
     # Due to updates in the base class implementation, the invocation point was changed from 
     # '_initialize_client' to '__init__'.
-    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str = 'us-east-1', role_arn: str = None):
+    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str = 'us-east-1', role_arn: str = None,
+                 max_concurrency: int = 10):
         super().__init__(model_id, experiment_config, region, role_arn)
+        self.max_concurrency = max_concurrency
         self._initialize_client() 
     
     def _initialize_client(self) -> None:
+        # One pooled connection per concurrent caller
         self.client = boto3.client(
             service_name='bedrock-runtime',
-            region_name=self.region_name
+            region_name=self.region_name,
+            config=BotoConfig(max_pool_connections=self.max_concurrency)
         )
 
     def generate_prompt(self, experiment_config: ExperimentalConfig, default_prompt: str, user_query: str, context: List[Dict] = None) -> Tuple[str, List[Dict[str, Any]]]:
@@ -98,20 +103,23 @@ class BedrockInferencer(BaseInferencer):
             if not skip_system_param:
                 request_params["system"] = [{"text" : system_prompt}]
             
-            response = self.client.converse(**request_params)
-           
-            metadata = {}
-            if 'usage' in response:
-                for key, value in response['usage'].items():
-                    metadata[key] = value
-            if 'metrics' in response:
-                for key, value in response['metrics'].items():
-                    metadata[key] = value
-            return metadata, self._extract_response(response)
+            return self._generate_cached(request_params, lambda: self._converse(request_params))
         except Exception as e:
             logger.error(f"Error generating text with Bedrock: {str(e)}")
             raise
 
+    def _converse(self, request_params: Dict[str, Any]) -> Tuple[Dict[Any, Any], str]:
+        response = self.client.converse(**request_params)
+
+        metadata = {}
+        if 'usage' in response:
+            for key, value in response['usage'].items():
+                metadata[key] = value
+        if 'metrics' in response:
+            for key, value in response['metrics'].items():
+                metadata[key] = value
+        return metadata, self._extract_response(response)
+
     def _prepare_conversation(self, message: str, role: str):
         # Format message and role into a conversation
         if not message or not role:
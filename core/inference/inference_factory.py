@@ -24,7 +24,7 @@ class InferencerFactory:
         cls._registry[key] = embedder_cls
     
     @classmethod
-    def create_inferencer(cls, experimentalConfig : ExperimentalConfig) -> BaseInferencer:
+    def create_inferencer(cls, experimentalConfig : ExperimentalConfig, max_concurrency: int = 10) -> BaseInferencer:
         service_type = experimentalConfig.retrieval_service
         model_id = experimentalConfig.retrieval_model
         key = f"{service_type}:{model_id}"
@@ -45,5 +45,6 @@ class InferencerFactory:
             model_id=model_id,
             experiment_config=experimentalConfig,
             region=experimentalConfig.aws_region,
-            role_arn=role_arn
+            role_arn=role_arn,
+            max_concurrency=max_concurrency
         )
\ No newline at end of file
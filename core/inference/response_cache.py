@@ -0,0 +1,109 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from config.config import Config
+from util import fast_json
+from util.kv_store import DiskKVStore, RequestCoalescer
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class ResponseCache:
+    """
+    Cache of generated answers for one inference model, keyed by a canonical hash of the
+    full request sent to the model: system prompt, messages and inference parameters.
+
+    Only meaningful for deterministic generation (temperature 0), where the same request
+    always gets the same answer, across reruns and across experiments that retrieve the
+    same context. Entries are stored in a DiskKVStore that can be shared through S3 like
+    the embedding and rerank caches. Concurrent identical requests are coalesced into one
+    call.
+
+    Answers come back with their original metadata (tokens, latency) and a `cache_hit`
+    flag, set for answers that were not generated, and billed, by this call. Only
+    `(metadata, answer)` results are cached; anything else, such as the error strings the
+    SageMaker inferencer returns, is passed through.
+    """
+
+    def __init__(self, namespace: str, cache_dir: str, max_bytes: int = 256 * 1024 * 1024,
+                 s3_bucket: Optional[str] = None, s3_prefix: Optional[str] = None) -> None:
+        self.namespace = namespace
+        file_name = re.sub(r'[^A-Za-z0-9._-]', '_', namespace) + ".sqlite"
+        self.store = DiskKVStore(os.path.join(cache_dir, file_name), max_bytes=max_bytes)
+        self.s3_bucket = s3_bucket
+        self.s3_key = f"{s3_prefix.strip('/')}/{file_name}" if s3_bucket and s3_prefix else None
+        self._coalescer = RequestCoalescer()
+
+    def cache_key(self, request: Dict[str, Any]) -> str:
+        canonical = json.dumps([self.namespace, request], sort_keys=True, ensure_ascii=False,
+                               separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Tuple[Dict[Any, Any], str]]:
+        cached = self.store.get(key)
+        if cached is None:
+            return None
+        entry = fast_json.loads(cached)
+        return dict(entry["metadata"], cache_hit=True), entry["answer"]
+
+    def generate(self, request: Dict[str, Any], generate: Callable[[], Any]) -> Any:
+        """Return the cached answer to `request`, or call `generate` once for it and cache the result."""
+        key = self.cache_key(request)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        owned, waiting = self._coalescer.claim([key])
+        if not owned:
+            result = waiting[key].result()
+            # Generated, and billed, by the caller that owned the request
+            return (dict(result[0], cache_hit=True), result[1]) if isinstance(result, tuple) else result
+
+        try:
+            # A request for the same key may have completed since the lookup
+            result = self._lookup(key)
+            if result is None:
+                result = generate()
+                if isinstance(result, tuple):
+                    metadata, answer = result
+                    self.store.put(key, fast_json.dumps({"metadata": metadata, "answer": answer}))
+                    result = (dict(metadata, cache_hit=False), answer)
+        except BaseException as e:
+            self._coalescer.fail(owned, e)
+            raise
+        self._coalescer.resolve({key: result})
+        return result
+
+    def pull(self) -> None:
+        """Merge the shared copy of the cache from S3, if S3 sync is configured."""
+        self.store.sync_pull(self.s3_bucket, self.s3_key)
+
+    def push(self) -> None:
+        """Publish the cache to S3 for later tasks, if S3 sync is configured."""
+        self.store.sync_push(self.s3_bucket, self.s3_key)
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+def get_response_cache(service: str, model_id: str, config: Config) -> ResponseCache:
+    """The process-wide ResponseCache of a service and model, created and pulled from S3 on first use."""
+    namespace = f"{service}_{model_id}"
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = ResponseCache(
+                namespace,
+                cache_dir=config.llm_response_cache_dir,
+                max_bytes=config.llm_response_cache_max_mb * 1024 * 1024,
+                s3_bucket=config.s3_bucket,
+                s3_prefix=config.llm_response_cache_s3_prefix
+            )
+            cache.pull()
+            _caches[namespace] = cache
+        return cache
@@ -9,8 +9,9 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class LlamaInferencer(SageMakerInferencer):
-    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str, role_arn: str):
-        super().__init__(model_id, experiment_config, region, role_arn)
+    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str, role_arn: str,
+                 max_concurrency: int = 10):
+        super().__init__(model_id, experiment_config, region, role_arn, max_concurrency=max_concurrency)
         
     def _prepare_conversation(self, message: str, role: str):
         # Format message and role into a conversation
@@ -1,4 +1,5 @@
 import boto3
+from botocore.config import Config as BotoConfig
 from typing import List, Dict
 from botocore.exceptions import ClientError
 from baseclasses.base_classes import BaseInferencer
@@ -62,7 +63,8 @@ INFERENCER_MODELS = {
 # Sagemaker Base Inferencer
 class SageMakerInferencer(BaseInferencer):
     
-    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str, role_arn: str):
+    def __init__(self, model_id: str, experiment_config: ExperimentalConfig, region: str, role_arn: str,
+                 max_concurrency: int = 10):
         """
         Initializes the SageMakerInferencer with the given model ID, region, and role ARN.
         Sets up necessary SageMaker runtime clients, session, and endpoint predictor.
@@ -71,6 +73,7 @@ class SageMakerInferencer(BaseInferencer):
             model_id (str): The unique identifier for the model.
             region (str): The AWS region where the SageMaker services are hosted.
             role_arn (str): The ARN of the IAM role. Currently not used but included for future extensions.
+            max_concurrency (int): Number of concurrent callers, each kept a pooled runtime connection.
         """
         
         # Store the region
@@ -84,11 +87,12 @@ class SageMakerInferencer(BaseInferencer):
         logger.info(f"Initializing SageMaker Generator for model: {model_id}")
 
         # Initialize the SageMaker runtime and client for general operations
-        self.client = boto3.client("sagemaker-runtime", region_name=region)
+        self.client = boto3.client("sagemaker-runtime", region_name=region,
+                                   config=BotoConfig(max_pool_connections=max_concurrency))
         self.sagemaker_client = boto3.client('sagemaker', region_name=region)
         
-        # Create a new SageMaker session
-        self.session = Session(boto_session=boto3.Session(region_name=region))
+        # Create a new SageMaker session; its predictors invoke the endpoint through the pooled runtime client
+        self.session = Session(boto_session=boto3.Session(region_name=region), sagemaker_runtime_client=self.client)
 
         # Initialize additional inferencing-related attributes
         self.inferencing_model_id = model_id
@@ -504,7 +508,15 @@ class SageMakerInferencer(BaseInferencer):
         system_prompt, prompt = self.generate_prompt(self.experiment_config, default_prompt, user_query, context)
         
         payload = self.construct_payload(system_prompt, prompt)
+        request = {"endpoint": self.inferencing_model_endpoint_name, "payload": payload}
 
+        return self._generate_cached(request, lambda: self._predict(prompt, payload))
+
+    def _predict(self, prompt, payload: dict):
+        """
+        Sends the payload to the inferencing endpoint and returns the answer metadata and the
+        cleaned answer, or a message string when no proper answer could be generated.
+        """
         try:
             start_time = time.time()
             
@@ -1,15 +1,21 @@
-from typing import List, Dict, Any, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Sequence, Union
 import boto3
+from botocore.config import Config as BotoConfig
 import logging
+import time
 from baseclasses.base_classes import VectorDatabase
 from config.config import Config
+from util.latency_stats import LatencyStats
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class KnowledgeBaseVectorDatabase(VectorDatabase):
-    def __init__(self, region: str = 'us-east-1'):
-        self.client = boto3.client("bedrock-agent-runtime", region_name=region)
+    def __init__(self, region: str = 'us-east-1', max_concurrency: int = 10):
+        self.client = boto3.client("bedrock-agent-runtime", region_name=region,
+                                   config=BotoConfig(max_pool_connections=max_concurrency))
+        self.search_latency = LatencyStats("searches")
         
     def create_index(self, index_name: str, mapping: Dict[str, Any], algorithm: str) -> None:
         raise NotImplementedError("This method is not implemented in this minimal version.")
@@ -43,10 +49,21 @@ class KnowledgeBaseVectorDatabase(VectorDatabase):
             'numberOfResults': knn
             }
         }
+        start_time = time.perf_counter()
         response = self.client.retrieve(knowledgeBaseId = kb_data, 
                                         retrievalQuery = query, 
                                         retrievalConfiguration=retrievalConfiguration)
+        self.search_latency.record(time.perf_counter() - start_time)
         formatted_context = self._format_response(response)
         logger.info("Getting results from knowledge base")
         return formatted_context
+
+    def search_many(self, index_name: str, queries: Sequence[str], k: int, max_concurrency: int = 8) -> List[List[Dict[str, Any]]]:
+        """Retrieve from knowledge base `index_name` for several query texts, with up to `max_concurrency` calls in flight."""
+        if not queries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(queries)), thread_name_prefix="kb-retrieve") as executor:
+            results = list(executor.map(lambda query: self.search(query, index_name, k), queries))
+        logger.info(f"Searched {len(queries)} queries on knowledge base {index_name}: {self.search_latency}")
+        return results
         
\ No newline at end of file
@@ -0,0 +1,204 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+import random
+import threading
+import time
+
+from opensearchpy import OpenSearch
+from opensearchpy.exceptions import TransportError
+from opensearchpy.helpers import BulkIndexError, expand_action
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Bulk responses that mean "slow down" rather than "rejected"
+RETRYABLE_STATUS = 429
+
+# Index settings relaxed for the duration of a load
+INGEST_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": "0"}
+
+@dataclass
+class BulkLoadStats:
+    """Throughput of one bulk load."""
+    documents: int = 0
+    bytes: int = 0
+    requests: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.documents} documents ({self.bytes / (1024 * 1024):.1f} MB) in {self.requests} requests "
+                f"and {self.seconds:.1f}s: {self.docs_per_second:.0f} docs/s, "
+                f"{self.bytes_per_second / (1024 * 1024):.2f} MB/s, {self.retries} retries")
+
+
+class OpenSearchBulkLoader:
+    """
+    Parallel bulk ingestion into OpenSearch.
+
+    Documents (helpers.bulk style actions) are grouped into requests of at most `max_docs`
+    documents and `max_batch_bytes` of payload, and sent by `workers` threads with at most
+    `2 * workers` requests in flight. Documents rejected with 429 are retried with jittered
+    exponential backoff; any other rejection fails the load with a `BulkIndexError`, like
+    `helpers.bulk`.
+    """
+
+    def __init__(self, client: OpenSearch, workers: int = 4, max_docs: int = 500,
+                 max_batch_bytes: int = 10 * 1024 * 1024, max_retries: int = 8,
+                 initial_backoff: float = 0.5, max_backoff: float = 30.0) -> None:
+        self.client = client
+        self.workers = max(1, workers)
+        self.max_docs = max_docs
+        self.max_batch_bytes = max_batch_bytes
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter: uniform over [0, min(max_backoff, initial_backoff * 2^attempt)]."""
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * (2 ** attempt)))
+
+    def _iter_batches(self, documents: Iterable[Dict[str, Any]]) -> Iterator[List[bytes]]:
+        """Serialize documents to their action and source lines, grouped by count and payload size."""
+        serializer = self.client.transport.serializer
+        # Serializers that produce bytes (see FastJSONSerializer) skip the round trip through str
+        dumps = getattr(serializer, "dumps_bytes", None) or (lambda data: serializer.dumps(data).encode("utf-8"))
+        batch, batch_bytes = [], 0
+        for document in documents:
+            action, source = expand_action(document)
+            payload = dumps(action) + b"\n"
+            if source is not None:
+                payload += dumps(source) + b"\n"
+            if batch and (len(batch) >= self.max_docs or batch_bytes + len(payload) > self.max_batch_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(payload)
+            batch_bytes += len(payload)
+        if batch:
+            yield batch
+
+    def _send(self, batch: List[bytes], stats: BulkLoadStats) -> None:
+        """Send one bulk request, retrying throttled documents until they are accepted."""
+        pending, errors = batch, []
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.bulk(body=b"".join(pending))
+            except TransportError as e:
+                if e.status_code != RETRYABLE_STATUS or attempt == self.max_retries:
+                    raise
+                throttled = pending
+            else:
+                throttled, errors = [], []
+                if response.get("errors"):
+                    for payload, item in zip(pending, response["items"]):
+                        result = next(iter(item.values()))
+                        if result.get("status") == RETRYABLE_STATUS:
+                            throttled.append(payload)
+                        elif result.get("status", 200) >= 300:
+                            errors.append(item)
+                accepted = len(pending) - len(throttled) - len(errors)
+                with self._lock:
+                    stats.requests += 1
+                    stats.documents += accepted
+                    stats.bytes += sum(map(len, pending))
+                if errors:
+                    raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+                if not throttled:
+                    return
+                if attempt == self.max_retries:
+                    raise BulkIndexError(f"{len(throttled)} document(s) still throttled after {self.max_retries} retries.",
+                                         [{"status": RETRYABLE_STATUS}] * len(throttled))
+            with self._lock:
+                stats.retries += 1
+            delay = self._backoff(attempt)
+            logger.warning(f"Bulk request throttled, retrying {len(throttled)} document(s) in {delay:.1f}s")
+            time.sleep(delay)
+            pending = throttled
+
+    def load(self, documents: Iterable[Dict[str, Any]],
+             on_progress: Optional[Callable[[int], None]] = None) -> BulkLoadStats:
+        """
+        Index all documents and return the load's throughput.
+
+        `on_progress` is called with the number of leading documents (in input order) that
+        are all indexed, each time that number grows.
+        """
+        stats = BulkLoadStats()
+        start_time = time.perf_counter()
+        in_flight: Deque[Tuple[Future, int]] = deque()
+        indexed = 0
+
+        def complete_oldest() -> None:
+            nonlocal indexed
+            future, count = in_flight.popleft()
+            future.result()
+            indexed += count
+            if on_progress is not None:
+                on_progress(indexed)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="opensearch-bulk") as pool:
+            try:
+                for batch in self._iter_batches(documents):
+                    in_flight.append((pool.submit(self._send, batch, stats), len(batch)))
+                    while len(in_flight) >= 2 * self.workers:
+                        complete_oldest()
+                while in_flight:
+                    complete_oldest()
+            finally:
+                for future, _ in in_flight:
+                    future.cancel()
+        stats.seconds = time.perf_counter() - start_time
+        logger.info(f"Bulk loaded {stats}")
+        return stats
+
+    @contextmanager
+    def ingest_settings(self, index_names: Sequence[str]) -> Iterator[None]:
+        """
+        Disable refresh and replicas on the given indices for the duration of a load.
+
+        The original settings are restored afterwards, even if the load fails, and the indices
+        refreshed so the new documents are searchable right away.
+        """
+        index_names = [name for name in index_names if self.client.indices.exists(index=name)]
+        original: Dict[str, Dict[str, Optional[str]]] = {}
+        try:
+            for name in index_names:
+                settings = self.client.indices.get_settings(index=name, flat_settings=True)[name]["settings"]
+                # A missing setting is restored as null, i.e. back to the cluster default
+                original[name] = {key: settings.get(key) for key in INGEST_SETTINGS}
+                self.client.indices.put_settings(index=name, body=INGEST_SETTINGS)
+                logger.info(f"Relaxed {name} settings for ingestion (was {original[name]})")
+            yield
+        finally:
+            for name, settings in original.items():
+                try:
+                    self.client.indices.put_settings(index=name, body=settings)
+                    self.client.indices.refresh(index=name)
+                    logger.info(f"Restored {name} settings {settings}")
+                except Exception as e:
+                    logger.error(f"Failed to restore settings of {name} to {settings}: {e}")
+
+    def force_merge(self, index_name: str, max_num_segments: int = 1) -> None:
+        """Merge the index's segments, so k-NN searches visit fewer graphs."""
+        start_time = time.perf_counter()
+        self.client.indices.forcemerge(index=index_name, max_num_segments=max_num_segments, request_timeout=3600)
+        logger.info(f"Force merged {index_name} to {max_num_segments} segment(s) in {time.perf_counter() - start_time:.1f}s")
+
+    def knn_warmup(self, index_name: str) -> None:
+        """Load the index's k-NN graphs into native memory ahead of the first searches."""
+        start_time = time.perf_counter()
+        self.client.transport.perform_request("GET", f"/_plugins/_knn/warmup/{index_name}", params={"request_timeout": 3600})
+        logger.info(f"Warmed up k-NN graphs of {index_name} in {time.perf_counter() - start_time:.1f}s")
@@ -1,17 +1,68 @@
 import traceback, json
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from botocore.endpoint import uuid
 from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.helpers import bulk
+from opensearchpy.serializer import JSONSerializer
 from baseclasses.base_classes import VectorDatabase
+from util.quantization import MAPPING_META_KEY, RESCORE_FIELD, VectorQuantizer, quantizer_from_meta
+from util import fast_json
+from util.latency_stats import LatencyStats
 import boto3
 import logging
+import threading
+import time
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Hierarchical parent chunks are stored once, in a companion index of the vector index
+PARENT_INDEX_SUFFIX = "_parents"
+
+# Source fields returned by kNN searches: the text, and how hierarchical children reach their parent.
+# Embeddings are left out, they are the bulk of a hit and callers never read them.
+SEARCH_SOURCE_FIELDS = ["text", "parent_id", "child_text"]
+
+# Bounds of one _msearch request of search_many
+MSEARCH_MAX_QUERIES = 100
+MSEARCH_MAX_BYTES = 5 * 1024 * 1024
+
+def parent_index_name(index_name: str) -> str:
+    return f"{index_name}{PARENT_INDEX_SUFFIX}"
+
+class FastJSONSerializer(JSONSerializer):
+    """
+    OpenSearch client serializer backed by `util.fast_json` (orjson when installed), so
+    float32 vectors are written from their NumPy buffers.
+
+    `dumps` returns text like the default serializer, for the client helpers; the bulk
+    loader uses `dumps_bytes` to skip the round trip through str.
+    """
+
+    def dumps(self, data: Any) -> Any:
+        if isinstance(data, (str, bytes)):
+            return data
+        return self.dumps_bytes(data).decode("utf-8")
+
+    def dumps_bytes(self, data: Any) -> bytes:
+        try:
+            return fast_json.dumps(data)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
+
+    def loads(self, s: str) -> Any:
+        try:
+            return fast_json.loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
+
+
 class OpenSearchVectorDatabase(VectorDatabase):
-    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None):
+    def __init__(self, host: str, use_ssl: bool = True, port: int = 443, is_serverless : bool = True, region: str = 'us-east-1', username: str = None, password: str = None,
+                 mapping_cache_seconds: float = 300, max_concurrency: int = 10):
+        # One pooled connection per concurrent caller (pool_maxsize of the requests connection)
         if is_serverless:
             try:
                 # Get credentials from the Lambda role
@@ -29,6 +80,8 @@ class OpenSearchVectorDatabase(VectorDatabase):
                     timeout=30,
                     max_retries=3,
                     retry_on_timeout=True,
+                    serializer=FastJSONSerializer(),
+                    pool_maxsize=max_concurrency,
                     # Add required headers for OpenSearch Serverless
                     headers={
                         'host': host
@@ -47,8 +100,15 @@ class OpenSearchVectorDatabase(VectorDatabase):
                 connection_class=RequestsHttpConnection,
                 timeout=30,
                 max_retries=3,
-                retry_on_timeout=True
+                retry_on_timeout=True,
+                serializer=FastJSONSerializer(),
+                pool_maxsize=max_concurrency
             )
+        self.search_latency = LatencyStats("searches")
+        # Vector field and quantizer per index, resolved from its mapping at most every mapping_cache_seconds
+        self.mapping_cache_seconds = mapping_cache_seconds
+        self._search_contexts: Dict[str, Tuple[float, str, Optional[VectorQuantizer]]] = {}
+        self._search_contexts_lock = threading.Lock()
 
     def _get_algorithm_settings(self, algorithm: str, dim: int) -> Dict[str, Any]:
         
@@ -86,6 +146,22 @@ class OpenSearchVectorDatabase(VectorDatabase):
                 "space_type": "innerproduct",
                 "parameters": base_hnsw_params
             }
+        elif algorithm == "hnsw_int8":
+            # Byte vectors quantized client-side (see util.quantization)
+            return {
+                "name": "hnsw",
+                "engine": "lucene",
+                "space_type": "innerproduct",
+                "parameters": base_hnsw_params
+            }
+        elif algorithm == "hnsw_binary":
+            # Packed sign bits quantized client-side, rescored with their int8 copy
+            return {
+                "name": "hnsw",
+                "engine": "faiss",
+                "space_type": "hamming",
+                "parameters": base_hnsw_params
+            }
         else:
             raise ValueError(f"Unsupported algorithm: {algorithm}")
     
@@ -112,11 +188,15 @@ class OpenSearchVectorDatabase(VectorDatabase):
                         "type": "knn_vector",
                         "dimension": dim,
                         "method": algorithm_settings,
-                        **({"mode": "on_disk"} if algorithm == "hnsw_bq" else {})
+                        **({"mode": "on_disk"} if algorithm == "hnsw_bq" else {}),
+                        **({"data_type": "byte"} if algorithm == "hnsw_int8" else {}),
+                        **({"data_type": "binary"} if algorithm == "hnsw_binary" else {})
                     }
                 }
             }
         }
+        if algorithm == "hnsw_binary":
+            index_body["mappings"]["properties"][RESCORE_FIELD] = {"type": "binary"}
     
         # Add other fields from the original mapping
         for field, props in mapping['properties'].items():
@@ -128,6 +208,7 @@ class OpenSearchVectorDatabase(VectorDatabase):
     
         try:
             self.client.indices.create(index=index_name, body=index_body)
+            self._forget_search_context(index_name)
             logger.info(f"Successfully created index '{index_name}'")
         except Exception as e:
             logger.error(f"Error creating index '{index_name}': {str(e)}")
@@ -138,37 +219,215 @@ class OpenSearchVectorDatabase(VectorDatabase):
 
     def update_index(self, index_name: str, new_mapping: Dict[str, Any]) -> None:
         self.client.indices.put_mapping(index=index_name, body=new_mapping)
+        self._forget_search_context(index_name)
 
     def delete_index(self, index_name: str) -> None:
         self.client.indices.delete(index=index_name)
+        self._forget_search_context(index_name)
 
     def insert_document(self, index_name: str, document: Dict[str, Any]) -> None:
         self.client.index(index=index_name, body=document)
 
-    def search(self, index_name: str, query_vector: List[float], k: int) -> List[Dict[str, Any]]:
-        vector_field = next((field for field, props in 
-                             self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties'].items() 
+    def get_quantizer(self, index_name: str) -> Optional[VectorQuantizer]:
+        """Quantization parameters stored in the index mapping, None for float vector indexes."""
+        mappings = self.client.indices.get_mapping(index=index_name)[index_name]['mappings']
+        return quantizer_from_meta(mappings.get('_meta', {}).get(MAPPING_META_KEY))
+
+    def put_quantizer(self, index_name: str, quantizer: VectorQuantizer) -> None:
+        self.client.indices.put_mapping(index=index_name, body={"_meta": {MAPPING_META_KEY: quantizer.to_meta()}})
+        self._forget_search_context(index_name)
+        logger.info(f"Stored {quantizer.mode} quantization parameters in the mapping of '{index_name}'")
+
+    def _vector_search_context(self, index_name: str) -> Tuple[str, Optional[VectorQuantizer]]:
+        """
+        Vector field of an index and the quantizer of its queries (None for float indexes),
+        cached for `mapping_cache_seconds`.
+        """
+        with self._search_contexts_lock:
+            cached = self._search_contexts.get(index_name)
+        if cached is not None and time.monotonic() < cached[0]:
+            return cached[1], cached[2]
+
+        mappings = self.client.indices.get_mapping(index=index_name)[index_name]['mappings']
+        vector_field = next((field for field, props in mappings['properties'].items() 
                              if 'type' in props and props['type'] == 'knn_vector'), None)
         if not vector_field:
             raise ValueError("Index does not contain a knn_vector field")
+        quantizer = quantizer_from_meta(mappings.get('_meta', {}).get(MAPPING_META_KEY))
+        with self._search_contexts_lock:
+            self._search_contexts[index_name] = (time.monotonic() + self.mapping_cache_seconds, vector_field, quantizer)
+        return vector_field, quantizer
 
-        query = {
-            "size": k,
+    def _forget_search_context(self, index_name: str) -> None:
+        with self._search_contexts_lock:
+            self._search_contexts.pop(index_name, None)
+
+    @staticmethod
+    def _knn_query(vector_field: str, quantizer: Optional[VectorQuantizer], query_vector: Sequence[float], k: int,
+                   source_fields: Sequence[str] = SEARCH_SOURCE_FIELDS) -> Dict[str, Any]:
+        # Queries of quantized indexes are quantized like their documents
+        search_vector = quantizer.quantize_query(query_vector) if quantizer else query_vector
+        search_k = k * quantizer.oversample if quantizer else k
+        # Rescoring reads the int8 copy of binary quantized vectors
+        includes = list(source_fields) + (quantizer.rescore_fields if quantizer else [])
+        return {
+            "size": search_k,
             "query": {
                 "knn": {
                     vector_field: {
-                        "vector": query_vector,
-                        "k": k
+                        "vector": search_vector,
+                        "k": search_k
                     }
                 }
             },
-            "_source": True,
-            "fields": ["text", "parent_id"]
+            "_source": {"includes": includes}
         }
 
-        response = self.client.search(index=index_name, body=query)
-        return [hit['_source'] for hit in response['hits']['hits']]
+    @staticmethod
+    def _rescore_hits(quantizer: Optional[VectorQuantizer], query_vector: Sequence[float], response: Dict[str, Any], k: int) -> List[Dict[str, Any]]:
+        results = [hit['_source'] for hit in response['hits']['hits']]
+        if quantizer:
+            results = quantizer.rescore(query_vector, results, k)
+            for result in results:
+                result.pop(RESCORE_FIELD, None)
+        return results
+
+    def _attach_missing_parents(self, index_name: str, results: List[Dict[str, Any]]) -> None:
+        # Hierarchical children indexed without their parent's text reference it by parent_id
+        if any('text' not in result and 'parent_id' in result for result in results):
+            self._attach_parent_text(index_name, results)
+
+    def search(self, index_name: str, query_vector: List[float], k: int,
+               source_fields: Sequence[str] = SEARCH_SOURCE_FIELDS) -> List[Dict[str, Any]]:
+        vector_field, quantizer = self._vector_search_context(index_name)
+        start_time = time.perf_counter()
+        response = self.client.search(index=index_name, body=self._knn_query(vector_field, quantizer, query_vector, k, source_fields))
+        self.search_latency.record(time.perf_counter() - start_time)
+        results = self._rescore_hits(quantizer, query_vector, response, k)
+        self._attach_missing_parents(index_name, results)
+        return results
+
+    def search_many(self, index_name: str, queries: Sequence[Sequence[float]], k: int,
+                    source_fields: Sequence[str] = SEARCH_SOURCE_FIELDS,
+                    max_queries: int = MSEARCH_MAX_QUERIES, max_bytes: int = MSEARCH_MAX_BYTES) -> List[List[Dict[str, Any]]]:
+        """
+        Search several query vectors with `_msearch` requests of at most `max_queries`
+        queries and about `max_bytes` of body. Queries that fail inside a batch are retried
+        on their own with `search`.
+        """
+        vector_field, quantizer = self._vector_search_context(index_name)
+        header = fast_json.dumps({"index": index_name}) + b"\n"
+        results: List[List[Dict[str, Any]]] = []
+        batch: List[int] = []
+        lines: List[bytes] = []
+        batch_bytes = 0
+
+        def send() -> None:
+            start_time = time.perf_counter()
+            responses = self.client.msearch(body=b"".join(lines))['responses']
+            self.search_latency.record(time.perf_counter() - start_time, count=len(batch))
+            batch_results = []
+            for i, response in zip(batch, responses):
+                if 'error' in response:
+                    logger.warning(f"Search {i} of {len(queries)} failed in _msearch on {index_name}, retrying it alone: {response['error']}")
+                    batch_results.append(self.search(index_name, queries[i], k, source_fields))
+                else:
+                    batch_results.append(self._rescore_hits(quantizer, queries[i], response, k))
+            # One mget for the parents of the whole batch
+            self._attach_missing_parents(index_name, [result for query_results in batch_results for result in query_results])
+            results.extend(batch_results)
+
+        for i, query_vector in enumerate(queries):
+            line = header + fast_json.dumps(self._knn_query(vector_field, quantizer, query_vector, k, source_fields)) + b"\n"
+            if batch and (len(batch) >= max_queries or batch_bytes + len(line) > max_bytes):
+                send()
+                batch, lines, batch_bytes = [], [], 0
+            batch.append(i)
+            lines.append(line)
+            batch_bytes += len(line)
+        if batch:
+            send()
+        logger.info(f"Searched {len(queries)} queries on {index_name}: {self.search_latency}")
+        return results
+
+    def create_parent_index(self, index_name: str) -> None:
+        """
+        Create the companion index holding the parent chunks of a hierarchical index.
+
+        Parents are only fetched by id, so their text is stored but not indexed.
+        """
+        parent_index = parent_index_name(index_name)
+        if self.index_exists(parent_index):
+            return
+        index_body = {
+            "mappings": {
+                "dynamic": False,
+                "properties": {
+                    "text": {"type": "text", "index": False},
+                    "execution_id": {"type": "keyword"}
+                }
+            }
+        }
+        logger.info(f"Creating parent index '{parent_index}'")
+        self.client.indices.create(index=parent_index, body=index_body)
+
+    def get_parents(self, index_name: str, parent_ids: List[str]) -> Dict[str, str]:
+        """Text of the given parents of a hierarchical index, fetched with a single mget."""
+        distinct_ids = list(dict.fromkeys(parent_ids))
+        if not distinct_ids:
+            return {}
+        response = self.client.mget(index=parent_index_name(index_name), body={"ids": distinct_ids}, _source=["text"])
+        return {doc['_id']: doc['_source']['text'] for doc in response['docs'] if doc.get('found')}
+
+    def _attach_parent_text(self, index_name: str, results: List[Dict[str, Any]]) -> None:
+        parents = self.get_parents(index_name, [result['parent_id'] for result in results if 'text' not in result])
+        for result in results:
+            if 'text' not in result:
+                parent_text = parents.get(result['parent_id'])
+                if parent_text is None:
+                    logger.warning(f"Parent {result['parent_id']} missing from {parent_index_name(index_name)}, using the child chunk")
+                    parent_text = result.get('child_text', '')
+                result['text'] = parent_text
     
+    def _keyword_field(self, index_name: str, field: str) -> str:
+        """Name under which `field` can be matched exactly: itself if keyword, else its keyword sub-field."""
+        props = self.client.indices.get_mapping(index=index_name)[index_name]['mappings']['properties'].get(field, {})
+        if props.get('type') == 'keyword':
+            return field
+        if 'keyword' in props.get('fields', {}):
+            return f"{field}.keyword"
+        raise ValueError(f"Field '{field}' of index '{index_name}' cannot be matched exactly")
+
+    def delete_chunks(self, index_name: str, chunk_ids: List[str], batch_size: int = 1000) -> int:
+        """
+        Delete the documents of the given chunk ids and return how many were deleted.
+
+        Document ids are looked up with a terms query and deleted with bulk requests rather
+        than delete_by_query, which serverless collections do not support.
+        """
+        field = self._keyword_field(index_name, "chunk_id") if chunk_ids else None
+        deleted = 0
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start:start + batch_size]
+            response = self.client.search(index=index_name, body={
+                "size": len(batch),
+                "_source": False,
+                "query": {"terms": {field: batch}}
+            })
+            deleted += self.delete_documents(index_name, [hit['_id'] for hit in response['hits']['hits']])
+        return deleted
+
+    def delete_documents(self, index_name: str, ids: List[str]) -> int:
+        """Delete documents by _id, ignoring missing ones, and return how many were deleted."""
+        if not ids:
+            return 0
+        deleted, errors = bulk(self.client, ({"_op_type": "delete", "_index": index_name, "_id": doc_id} for doc_id in ids),
+                               raise_on_error=False)
+        failed = [error for error in errors if next(iter(error.values())).get('status') != 404]
+        if failed:
+            raise RuntimeError(f"Failed to delete {len(failed)} document(s) from '{index_name}': {failed[:3]}")
+        return deleted
+
     def index_exists(self, index_name: str) -> bool:
         """
         Check if an index exists in OpenSearch.
@@ -1,5 +1,6 @@
-from typing import Dict, List, Type, Union
+from typing import Any, Dict, Iterable, Iterator, List, Type, Union
 from core.chunking import FixedChunker, HierarchicalChunker
+from core.chunking.span_chunker import create_token_counter
 from baseclasses.base_classes import BaseChunker, BaseHierarchicalChunker
 import logging
 from config.experimental_config import ExperimentalConfig
@@ -26,20 +27,47 @@ class ChunkingProcessor:
         if strategy not in chunker_strategies:
             raise ValueError(f"Unknown chunking strategy: {strategy}")
 
-        logger.info(f"Initializing {strategy} chunker...")
+        token_counter = create_token_counter(self.experimentalConfig.chunk_tokenizer)
+        logger.info(f"Initializing {strategy} chunker with {token_counter.name} token counting...")
         if strategy == 'fixed':
             return chunker_strategies[strategy](
                 self.experimentalConfig.chunk_size,
-                self.experimentalConfig.chunk_overlap
+                self.experimentalConfig.chunk_overlap,
+                token_counter=token_counter
             )
         elif strategy == 'hierarchical':
             return chunker_strategies[strategy](
                 self.experimentalConfig.hierarchical_parent_chunk_size,
                 self.experimentalConfig.hierarchical_child_chunk_size,
-                self.experimentalConfig.hierarchical_chunk_overlap_percentage
+                self.experimentalConfig.hierarchical_chunk_overlap_percentage,
+                token_counter=token_counter
             )
 
+    def chunk_params(self) -> Dict[str, Any]:
+        """The experiment parameters that determine the chunks of a text, e.g. for cache keys."""
+        strategy = self.experimentalConfig.chunking_strategy.lower()
+        params = {"chunking_strategy": strategy}
+        # Only recorded when set, so keys of the default 4 chars per token estimate are unchanged
+        if self.experimentalConfig.chunk_tokenizer != "chars":
+            params["chunk_tokenizer"] = self.experimentalConfig.chunk_tokenizer
+        if strategy == 'hierarchical':
+            return {
+                **params,
+                "hierarchical_parent_chunk_size": self.experimentalConfig.hierarchical_parent_chunk_size,
+                "hierarchical_child_chunk_size": self.experimentalConfig.hierarchical_child_chunk_size,
+                "hierarchical_chunk_overlap_percentage": self.experimentalConfig.hierarchical_chunk_overlap_percentage
+            }
+        return {
+            **params,
+            "chunk_size": self.experimentalConfig.chunk_size,
+            "chunk_overlap": self.experimentalConfig.chunk_overlap
+        }
+
     def chunk(self, texts: List[str]) -> Union[List[str], List[List[str]]]:
         """Chunk the input list of text into a single flat list"""
-        all_chunks = [chunk for text in texts for chunk in self.chunker.chunk(text)]
-        return all_chunks
\ No newline at end of file
+        return list(self.iter_chunks(texts))
+
+    def iter_chunks(self, texts: Iterable[str]) -> Iterator[Union[str, List[str]]]:
+        """Lazily chunk the input texts, holding only one text's chunks at a time"""
+        for text in texts:
+            yield from self.chunker.chunk(text)
@@ -1,30 +1,69 @@
 from core.embedding import EmbedderFactory
-from typing import Dict, List, Tuple, Any
+from core.embedding.embedding_engine import ConcurrentEmbeddingEngine, EmbeddingThroughput
+from core.embedding.embedding_cache import CachedEmbedder
+from constants import ModelInvocationConstants
+from typing import Dict, List, Optional, Tuple, Any
+from config.config import Config
 from config.experimental_config import ExperimentalConfig
+from util.model_invocations import task_concurrency
 import logging
 
+import numpy as np
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 class EmbedProcessor:
     """Processor for embedding text chunks."""
 
-    def __init__(self, experimentalConfig : ExperimentalConfig) -> None:
+    def __init__(self, experimentalConfig : ExperimentalConfig, max_concurrency: Optional[int] = None,
+                 config: Optional[Config] = None) -> None:
         self.experimentalConfig = experimentalConfig
-        self.embedder = EmbedderFactory.create_embedder(experimentalConfig)
+        # Default to this task's share of the embedding model's invocation limit, which also caps the
+        # indexing tasks running on the model; without a Config, to the model's whole limit
+        service, model_id = experimentalConfig.embedding_service, experimentalConfig.embedding_model
+        if max_concurrency:
+            self.max_concurrency = max_concurrency
+        elif config is not None:
+            self.max_concurrency = task_concurrency(config, service, model_id)
+        else:
+            self.max_concurrency = ModelInvocationConstants.get_limit(service, model_id)
+        # A pooled connection per embedding thread, and never fewer than botocore's default
+        self.embedder = EmbedderFactory.create_embedder(experimentalConfig, max_concurrency=max(10, self.max_concurrency))
+        # Embeddings are cached across experiments when a Config with the cache enabled is given
+        self.cache = None
+        if config is not None and config.embedding_cache_enabled:
+            self.cache = CachedEmbedder(
+                self.embedder,
+                cache_dir=config.embedding_cache_dir,
+                max_bytes=config.embedding_cache_max_mb * 1024 * 1024,
+                s3_bucket=config.s3_bucket,
+                s3_prefix=config.embedding_cache_s3_prefix
+            )
+            self.cache.pull()
+            self.embedder = self.cache
+        self._engine = None
+
+    @property
+    def engine(self) -> ConcurrentEmbeddingEngine:
+        """Lazily created so that query-time users of embed_text never spawn a thread pool."""
+        if self._engine is None:
+            self._engine = ConcurrentEmbeddingEngine(self.embedder, self.max_concurrency)
+        return self._engine
+
+    @property
+    def throughput(self) -> EmbeddingThroughput:
+        return self.engine.throughput
 
     def embed(self, chunks: List[str]) -> List[Tuple[List[float], str, Dict[Any, Any]]]:
-        """Embed each chunk one by one."""
-        embeddings = []
+        """Embed the chunks concurrently, keeping the input order."""
         try:
-            dimensions = self.experimentalConfig.vector_dimension 
+            dimensions = self.experimentalConfig.vector_dimension
             normalize = True  # Always normalize
 
             logger.info(f"Embedding {len(chunks)} chunks with dimensions: {dimensions}.")
-            for idx, chunk in enumerate(chunks):
-                logger.debug(f"Embedding chunk {idx + 1}/{len(chunks)}: {chunk[:50]}...")
-                metadata, embedding = self.embedder.embed(chunk, dimensions=dimensions, normalize=normalize)
-                embeddings.append((embedding, chunk, metadata))  # Append as tuple
+            results = self.engine.embed(chunks, dimensions=dimensions, normalize=normalize)
+            embeddings = [(embedding, chunk, metadata) for chunk, (metadata, embedding) in zip(chunks, results)]
 
             logger.info("Embedding process completed successfully.")
             return embeddings
@@ -32,10 +71,45 @@ class EmbedProcessor:
             logger.error(f"Error during embedding process: {e}")
             raise
 
+    def embed_matrix(self, chunks: List[str]) -> Tuple[np.ndarray, List[Dict[Any, Any]]]:
+        """Embed the chunks concurrently into a float32 matrix, one row per chunk in input order, and their metadata."""
+        try:
+            dimensions = self.experimentalConfig.vector_dimension
+            normalize = True  # Always normalize
+
+            logger.info(f"Embedding {len(chunks)} chunks with dimensions: {dimensions}.")
+            matrix, metadata = self.engine.embed_matrix(chunks, dimensions=dimensions, normalize=normalize)
+            logger.info("Embedding process completed successfully.")
+            return matrix, metadata
+        except Exception as e:
+            logger.error(f"Error during embedding process: {e}")
+            raise
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Embedding cache hit/miss counters, zero when caching is disabled."""
+        if self.cache is None:
+            return {"embedding_cache_hits": 0, "embedding_cache_misses": 0}
+        return {"embedding_cache_hits": self.cache.hits, "embedding_cache_misses": self.cache.misses}
+
+    def push_cache(self) -> None:
+        """Publish the embedding cache to S3 (when S3 sync is configured) without closing it."""
+        if self.cache is not None:
+            self.cache.push()
+
+    def close(self) -> None:
+        """Shut down the embedding engine, report its throughput and publish the embedding cache."""
+        if self._engine is not None:
+            self._engine.shutdown()
+            self._engine = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
     def embed_text(self, text: str) -> Tuple[Dict[Any, Any], List[float]]:
         """Embed each chunk one by one."""
         try:
-            dimensions = self.experimentalConfig.vector_dimension 
+            dimensions = self.experimentalConfig.vector_dimension
             normalize = True  # Always normalize
             metadata, embedding = self.embedder.embed(text, dimensions=dimensions, normalize=normalize)
             logger.info("Embedding text process completed successfully.")
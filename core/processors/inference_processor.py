@@ -1,5 +1,7 @@
 from core.inference import InferencerFactory
-from typing import Dict, List, Tuple, Any
+from core.inference.response_cache import get_response_cache
+from typing import Dict, List, Tuple, Any, Optional
+from config.config import Config
 from config.experimental_config import ExperimentalConfig
 import logging
 
@@ -9,9 +11,17 @@ logger.setLevel(logging.INFO)
 class InferenceProcessor:
     """Processor for embedding text chunks."""
 
-    def __init__(self, experimentalConfig : ExperimentalConfig) -> None:
+    def __init__(self, experimentalConfig : ExperimentalConfig, config: Optional[Config] = None,
+                 max_concurrency: int = 10) -> None:
         self.experimentalConfig = experimentalConfig
-        self.inferencer = InferencerFactory.create_inferencer(experimentalConfig)
+        # The inferencer's client keeps a connection for each of the max_concurrency callers
+        self.inferencer = InferencerFactory.create_inferencer(experimentalConfig, max_concurrency=max_concurrency)
+        # Answers are only reused when generation is deterministic and the cache is opted into
+        if config is not None and config.llm_response_cache_enabled and float(experimentalConfig.temp_retrieval_llm) == 0:
+            logger.info(f"Caching responses of {experimentalConfig.retrieval_service} {experimentalConfig.retrieval_model}")
+            self.inferencer.response_cache = get_response_cache(
+                experimentalConfig.retrieval_service, experimentalConfig.retrieval_model, config
+            )
 
     def generate_text(self, user_query: str, default_prompt: str, context: List[Dict] = None, **kwargs) -> Tuple[Dict[Any,Any], str]:
         try:
@@ -25,3 +35,9 @@ class InferenceProcessor:
         except Exception as e:
             logger.error(f"Error generating text with Inferencer: {str(e)}")
             raise
+
+
+    def push_cache(self) -> None:
+        """Publish the response cache to S3, when responses are cached."""
+        if self.inferencer.response_cache is not None:
+            self.inferencer.response_cache.push()
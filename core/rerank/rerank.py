@@ -1,3 +1,4 @@
+from typing import List
 import logging
 import boto3
 from config.experimental_config import ExperimentalConfig
@@ -8,18 +9,56 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 class DocumentReranker:
-    def __init__(self, region, rerank_model_id):
+    def __init__(self, region, rerank_model_id, bedrock_agent_runtime=None):
         """
         Initialize the DocumentReranker with the AWS region, model ID, and Bedrock agent runtime.
         
         Args:
             region (str): The AWS region to use.
             model_id (str): The model ID to use for reranking.
-            bedrock_agent_runtime (object): The Bedrock agent runtime instance to interact with the API.
+            bedrock_agent_runtime (object): The Bedrock agent runtime instance to interact with the API,
+                created for this reranker when not given.
         """
         self.region = region
         self.rerank_model_id = rerank_model_id
-        self.bedrock_agent_runtime = boto3.client('bedrock-agent-runtime', region_name=self.region)
+        self.bedrock_agent_runtime = bedrock_agent_runtime or boto3.client('bedrock-agent-runtime', region_name=self.region)
+
+    def rerank_indices(self, input_prompt: str, texts: List[str]) -> List[int]:
+        """
+        Positions of `texts` in order of relevance to the query, as ranked by the model.
+
+        Unlike `rerank_documents`, errors are raised, so callers can tell them from results.
+        """
+        model_package_arn = f"arn:aws:bedrock:{self.region}::foundation-model/{self.rerank_model_id}"
+        response = self.bedrock_agent_runtime.rerank(
+            queries=[{
+                "type": "TEXT",
+                "textQuery": {"text": input_prompt}
+            }],
+            sources=[{
+                "type": "INLINE",
+                "inlineDocumentSource": {
+                    "type": "TEXT",
+                    "textDocument": {"text": text}
+                }
+            } for text in texts],
+            rerankingConfiguration={
+                "type": "BEDROCK_RERANKING_MODEL",
+                "bedrockRerankingConfiguration": {
+                    "numberOfResults": len(texts),
+                    "modelConfiguration": {"modelArn": model_package_arn}
+                }
+            }
+        )
+        if 'results' not in response:
+            raise ValueError("Error in rerank response: No results found.")
+        indices = []
+        for result in response['results']:
+            if isinstance(result, dict) and 'index' in result:
+                indices.append(result['index'])
+            else:
+                logger.error(f"Unexpected result format: {result}")
+        return indices
         
     def rerank_documents(self, input_prompt, retrieved_documents):
         """
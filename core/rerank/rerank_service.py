@@ -0,0 +1,159 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from config.config import Config
+from core.rerank.rerank import DocumentReranker
+from util.kv_store import DiskKVStore, RequestCoalescer
+from util.latency_stats import LatencyStats
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Documents per billed Bedrock rerank query
+DOCUMENTS_PER_RERANK_QUERY = 100
+
+@dataclass
+class RerankStats:
+    """Rerank counters of one experiment, shared by its question threads."""
+    calls: int = 0
+    billed_queries: int = 0
+    cache_hits: int = 0
+    latency: LatencyStats = field(default_factory=lambda: LatencyStats("rerank calls"))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_call(self, documents: int, seconds: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.billed_queries += math.ceil(documents / DOCUMENTS_PER_RERANK_QUERY)
+        self.latency.record(seconds)
+
+    def add_cache_hit(self) -> None:
+        with self._lock:
+            self.cache_hits += 1
+
+    def __str__(self) -> str:
+        return f"{self.calls} calls ({self.billed_queries} billed queries), {self.cache_hits} cache hits, {self.latency}"
+
+
+class RerankService:
+    """
+    Process-wide reranker for one (region, model): a single Bedrock agent runtime client,
+    safe to call from many question threads, and a content-addressed cache of results.
+
+    Results are keyed by hash(model, query, document texts) and stored as the reranked
+    order of the documents, in a DiskKVStore that can be shared through S3 like the
+    embedding cache, so experiments retrieving the same documents for the same questions
+    only pay for the first rerank. Concurrent identical requests are coalesced. Failed
+    calls are not cached and return no documents, as DocumentReranker does.
+    """
+
+    def __init__(self, region: str, rerank_model_id: str, max_concurrency: int = 50,
+                 cache_dir: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024,
+                 s3_bucket: Optional[str] = None, s3_prefix: Optional[str] = None) -> None:
+        self.region = region
+        self.rerank_model_id = rerank_model_id
+        client = boto3.client('bedrock-agent-runtime', region_name=region,
+                              config=BotoConfig(max_pool_connections=max_concurrency))
+        self.reranker = DocumentReranker(region, rerank_model_id, bedrock_agent_runtime=client)
+
+        self.store = None
+        self.s3_bucket = s3_bucket
+        self.s3_key = None
+        if cache_dir:
+            file_name = re.sub(r'[^A-Za-z0-9._-]', '_', rerank_model_id) + ".sqlite"
+            self.store = DiskKVStore(os.path.join(cache_dir, file_name), max_bytes=max_bytes)
+            self.s3_key = f"{s3_prefix.strip('/')}/{file_name}" if s3_bucket and s3_prefix else None
+        self._coalescer = RequestCoalescer()
+
+    def cache_key(self, query: str, texts: List[str]) -> str:
+        content = "\x00".join([self.rerank_model_id, query, str(len(texts))] + texts)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], stats: Optional[RerankStats] = None) -> List[Dict[str, Any]]:
+        """Rerank documents for a query, returning `{'text': ...}` dicts in order of relevance."""
+        if not documents:
+            return []
+        texts = [document['text'] for document in documents]
+        key = self.cache_key(query, texts)
+        cached = self.store.get(key) if self.store is not None else None
+        if cached is not None:
+            order = json.loads(cached)
+            if stats is not None:
+                stats.add_cache_hit()
+        else:
+            owned, waiting = self._coalescer.claim([key])
+            if owned:
+                try:
+                    # A request for the same key may have completed since the lookup
+                    cached = self.store.get(key) if self.store is not None else None
+                    if cached is not None:
+                        order = json.loads(cached)
+                        if stats is not None:
+                            stats.add_cache_hit()
+                    else:
+                        start_time = time.perf_counter()
+                        order = self.reranker.rerank_indices(query, texts)
+                        if stats is not None:
+                            stats.add_call(len(texts), time.perf_counter() - start_time)
+                        if self.store is not None:
+                            self.store.put(key, json.dumps(order).encode('utf-8'))
+                except Exception as e:
+                    self._coalescer.fail(owned, e)
+                    logger.error(f"Rerank with {self.rerank_model_id} failed: {e}")
+                    return []
+                self._coalescer.resolve({key: order})
+            else:
+                try:
+                    order = waiting[key].result()
+                except Exception:
+                    return []
+                if stats is not None:
+                    stats.add_cache_hit()
+        return [{'text': texts[i]} for i in order]
+
+    def pull(self) -> None:
+        """Merge the shared copy of the cache from S3, if S3 sync is configured."""
+        if self.store is not None:
+            self.store.sync_pull(self.s3_bucket, self.s3_key)
+
+    def push(self) -> None:
+        """Publish the cache to S3 for later tasks, if S3 sync is configured."""
+        if self.store is not None:
+            self.store.sync_push(self.s3_bucket, self.s3_key)
+
+
+_services: Dict[Tuple[str, str], RerankService] = {}
+_services_lock = threading.Lock()
+
+def get_rerank_service(region: str, rerank_model_id: str, config: Optional[Config] = None) -> RerankService:
+    """
+    The process-wide RerankService of a region and model, created on first use; with a
+    Config that enables the rerank cache, its results are cached and synced with S3.
+    """
+    with _services_lock:
+        service = _services.get((region, rerank_model_id))
+        if service is None:
+            if config is not None and config.rerank_cache_enabled:
+                service = RerankService(
+                    region, rerank_model_id,
+                    cache_dir=config.rerank_cache_dir,
+                    max_bytes=config.rerank_cache_max_mb * 1024 * 1024,
+                    s3_bucket=config.s3_bucket,
+                    s3_prefix=config.rerank_cache_s3_prefix
+                )
+                service.pull()
+            else:
+                service = RerankService(region, rerank_model_id)
+            _services[(region, rerank_model_id)] = service
+        return service
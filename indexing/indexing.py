@@ -1,13 +1,22 @@
 from core.processors import ChunkingProcessor, EmbedProcessor
-from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from core.opensearch_vectorstore import OpenSearchVectorDatabase, parent_index_name
+from core.opensearch_bulk import BulkLoadStats, OpenSearchBulkLoader
 from util.s3util import S3Util
-from util.pdf_utils import process_pdf_from_folder
+from util.pdf_utils import ParallelPdfExtractor, iter_pdf_text_from_folder
+from util.artifact_cache import KBArtifactCache
+from util.embedding_artifact import EmbeddedBatch, EmbeddingArtifactStore, EmbeddingArtifactWriter
+from util.index_manifest import IndexManifestStore, ManifestRecorder
+from util.quantization import QUANTIZED_ALGORITHMS, VectorQuantizer, fit_quantizer
+from core.chunking.span_chunker import ChunkSpans, HierarchicalChunkSpans, split_words
 import logging
-from typing import Dict, List, Any
-from opensearchpy.helpers import bulk
+import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 import os
 import uuid
 import json
+import queue
+import tempfile
+import threading
 from config.experimental_config import ExperimentalConfig
 from config.config import Config
 from core.dynamodb import DynamoDBOperations
@@ -16,6 +25,9 @@ import re
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# In-memory size of one embedding element, held as float32 in a batch matrix
+BYTES_PER_VECTOR_ELEMENT = 4
+
 def clean_text_for_vector_db(text):
     """
     Cleans the input text by removing quotes, special symbols, extra whitespaces,
@@ -38,8 +50,25 @@ def clean_text_for_vector_db(text):
     # Strip leading and trailing spaces
     return text.strip()
 
-def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-> None:
-    """Main function to run the chunking and embedding pipeline."""
+def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig, deadline: Optional[float] = None,
+                      continuation: bool = False) -> bool:
+    """Main function to run the chunking and embedding pipeline.
+
+    The pipeline is streamed end to end (extract -> chunk -> embed -> bulk): files are
+    extracted one at a time (or their cached text and chunks reused, see `_iter_kb_chunks`),
+    chunks are embedded in batches sized by
+    `config.indexing_memory_budget_mb`, and each embedded batch is handed to a background
+    bulk consumer, so peak memory does not grow with the size of the knowledge base and
+    OpenSearch ingestion overlaps with embedding. Embedded corpora are shared on S3 between
+    experiments that only differ by indexing algorithm (see `_load_through_embedding_artifact`),
+    and an index re-indexed over a changed knowledge base only embeds its new and changed
+    files (see `_index_incrementally`).
+
+    Runs are checkpointed, so an interrupted run resumes where its last checkpoint left
+    off. With a `deadline` (a `time.monotonic()` value), the run stops once it has passed,
+    saves a checkpoint and returns False, for a `continuation` call to pick up; it returns
+    True once the index is complete.
+    """
     experiment_dynamodb = DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table)
     logger.info(experiment_dynamodb.table)
     try:
@@ -48,80 +77,550 @@ def chunk_embed_store(config : Config, experimentalConfig : ExperimentalConfig)-
         if not experimentalConfig.kb_data:
             raise ValueError("S3 path is missing in the kb_data field.")
         
-        pdf_folder_path = S3Util().download_directory_from_s3(experimentalConfig.kb_data)
-        
-        # Step 1: Chunking
-        chunks = ChunkingProcessor(experimentalConfig).chunk(process_pdf_from_folder(pdf_folder_path))
-        
-        embed_chunks = chunks
-        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-            embed_chunks = []
-            for chunk in chunks:
-                embed_chunks.append(chunk[2]) # Child Chunk only
-
-        # Step 2: Embedding
-        embedding_results = EmbedProcessor(experimentalConfig).embed(embed_chunks)
-
-        total_index_embed_tokens = 0
-        for _, _, metadata in embedding_results:
-            total_index_embed_tokens += int(metadata['inputTokens'])
-
-        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-            temp_results = []
-            for i, chunk in enumerate(chunks):
-                temp_embedding = list(embedding_results[i])
-                temp_embedding.extend([chunk[0], chunk[1]])
-                temp_results.append(temp_embedding)
-            embedding_results = temp_results
-            documents = [
-                {
-                    "_index": experimentalConfig.index_id,
-                    "execution_id":experimentalConfig.execution_id,
-                    "chunk_id": str(uuid.uuid4()),  # Generate a unique UUID for each chunk
-                    "text": clean_text_for_vector_db(parent_chunk),
-                    "child_text": clean_text_for_vector_db(chunk),
-                    "parent_id": parent_id,
-                    config.vector_field: embedding,
-                    "metadata": metadata  # Optional metadata, defaulting to an empty dictionary
-                }
-                for embedding, chunk, metadata, parent_id, parent_chunk in embedding_results  # Enumerate is unnecessary since UUIDs are used
-            ]
+        memory_budget = config.indexing_memory_budget_mb * 1024 * 1024
+        stats = {"index_embed_tokens": 0}
+
+        completed = True
+        if config.incremental_indexing_enabled and config.artifact_cache_enabled and config.s3_bucket:
+            load_stats, cache_stats, completed = _index_incrementally(config, experimentalConfig, memory_budget, stats, deadline)
         else:
-            documents = [
-                {
-                    "_index": experimentalConfig.index_id,
-                    "execution_id":experimentalConfig.execution_id,
-                    "chunk_id": str(uuid.uuid4()),  # Generate a unique UUID for each chunk
-                    "text": clean_text_for_vector_db(chunk),
-                    config.vector_field: embedding,
-                    "metadata": metadata  # Optional metadata, defaulting to an empty dictionary
-                }
-                for embedding, chunk, metadata in embedding_results  # Enumerate is unnecessary since UUIDs are used
-            ]
-
-        logger.info(f"Experiment {experimentalConfig.experiment_id} Indexing Embed Tokens : {total_index_embed_tokens}")
+            if deadline is not None:
+                logger.warning("Indexing can only stop at a deadline with incremental indexing and the artifact cache enabled, "
+                               "indexing the whole knowledge base")
+            load_stats, cache_stats = _index_all(config, experimentalConfig, None, memory_budget, stats)
+
+        total_index_embed_tokens = stats["index_embed_tokens"]
+        logger.info(f"Experiment {experimentalConfig.experiment_id} Indexing Embed Tokens : {total_index_embed_tokens}, "
+                    f"Embedding cache hits : {cache_stats['embedding_cache_hits']}, misses : {cache_stats['embedding_cache_misses']}")
 
+        # A continuation adds its counts to those of the calls before it
+        counter = (lambda name, value: f"{name} = if_not_exists({name}, :zero) + {value}") if continuation else \
+                  (lambda name, value: f"{name} = {value}")
         experiment_dynamodb.update_item(
                     key={'id': experimentalConfig.experiment_id},
-                    update_expression="SET index_embed_tokens = :embed",
-                    expression_values={':embed': total_index_embed_tokens}
+                    update_expression=f"SET {counter('index_embed_tokens', ':embed')}, {counter('embedding_cache_hits', ':hits')}, "
+                                      f"{counter('embedding_cache_misses', ':misses')}, "
+                                      "index_docs_per_second = :docs_ps, index_bytes_per_second = :bytes_ps",
+                    expression_values={
+                        ':embed': total_index_embed_tokens,
+                        ':hits': cache_stats['embedding_cache_hits'],
+                        ':misses': cache_stats['embedding_cache_misses'],
+                        ':docs_ps': round(load_stats.docs_per_second, 2),
+                        ':bytes_ps': round(load_stats.bytes_per_second),
+                        **({':zero': 0} if continuation else {})
+                    }
                 )
-        
-        _insert_to_opensearch(config, documents)
+        return completed
     except Exception as e:
         logger.exception(f"Pipeline failed: {e}")
         raise e
-    
-def _insert_to_opensearch(config: Config, documents: List[Dict[str, Any]]):
+
+def _index_params(config: Config, experimentalConfig: ExperimentalConfig) -> Dict[str, Any]:
+    """Everything besides the KB files that determines an index's documents."""
+    return {
+        "extractor": config.pdf_extraction_backend,
+        "chunking": ChunkingProcessor(experimentalConfig).chunk_params(),
+        "embedding_service": experimentalConfig.embedding_service,
+        "embedding_model": experimentalConfig.embedding_model,
+        "vector_dimension": experimentalConfig.vector_dimension,
+        "indexing_algorithm": experimentalConfig.indexing_algorithm,
+        "vector_field": config.vector_field,
+        "parent_index": _uses_parent_index(config)
+    }
+
+def _index_incrementally(config: Config, experimentalConfig: ExperimentalConfig, memory_budget: int,
+                         stats: Dict[str, int], deadline: Optional[float] = None) -> Tuple[BulkLoadStats, Dict[str, int], bool]:
+    """
+    Bring the index up to date with the knowledge base, using its manifest, and return the
+    load and embedding cache statistics and whether the index is complete.
+
+    The manifest records which KB files (S3 key and ETag) the index holds and under which
+    chunk and parent ids. Re-indexing deletes the chunks of changed and removed files and
+    embeds only new and changed files; without a manifest (or when the index parameters
+    changed) the whole knowledge base is indexed. The manifest is saved after every run.
+
+    While indexing, the manifest is checkpointed every `indexing_checkpoint_seconds` with
+    the files completed so far, along with the embedding cache, and whenever the run needs
+    a new block of ids (see `ManifestRecorder`). A run resuming from a checkpoint deletes
+    the ids the interrupted run reserved beyond its completed files, then indexes the files
+    it had not completed like any other change. Past `deadline`, the run stops and leaves
+    a checkpoint.
+    """
+    manifest_store = IndexManifestStore(config.s3_bucket, f"{config.artifact_cache_s3_prefix}/index_manifests")
     vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
         password=config.opensearch_password)
-    chunks_length = len(documents)
-    chunk_size = 500 # Default chunk size streaming by Opensearch
-    if chunks_length < chunk_size:
-        chunk_size = chunks_length
-    logger.info(f"Opensearch Bulk insert initiated")
-    bulk(vector_database.client, documents, chunk_size=chunk_size, max_retries=1)
-    logger.info("Opensearch Bulk insert successful \n Pipeline completed successfully.")
+    index_id = experimentalConfig.index_id
+    objects = S3Util().list_objects(experimentalConfig.kb_data)
+    # Compared with the stored manifest's params, so normalized like them
+    params = json.loads(json.dumps(_index_params(config, experimentalConfig)))
+    kept = {}
+
+    def save_checkpoint() -> None:
+        manifest_store.save(index_id, params, {**kept, **recorder.entries(complete=False)}, pending=recorder.pending())
+
+    recorder = ManifestRecorder(index_id, on_reserve=save_checkpoint,
+                                on_checkpoint=save_checkpoint if config.indexing_checkpoint_seconds > 0 else None,
+                                checkpoint_seconds=config.indexing_checkpoint_seconds, deadline=deadline)
+
+    previous = manifest_store.load(index_id)
+    if previous is not None and previous.get('pending'):
+        chunk_ids, parent_ids = IndexManifestStore.pending_ids(index_id, previous['pending'])
+        deleted = vector_database.delete_chunks(index_id, chunk_ids)
+        if parent_ids:
+            vector_database.delete_documents(parent_index_name(index_id), parent_ids)
+        logger.info(f"Resuming the indexing of {index_id} after {len(previous['files'])} completed files, "
+                    f"deleted {deleted} chunks of the files in progress")
+    if previous is not None and previous['params'] != params:
+        logger.info(f"Index parameters of {index_id} changed, re-indexing all files")
+        _delete_indexed_files(vector_database, index_id, previous['files'])
+        previous = None
+    elif previous is not None and previous['files'] and vector_database.client.count(index=index_id)['count'] == 0:
+        # The index was recreated since the manifest was saved
+        logger.info(f"Index {index_id} is empty, ignoring its manifest")
+        previous = None
+
+    if previous is None:
+        load_stats, cache_stats = _index_all(config, experimentalConfig, objects, memory_budget, stats, recorder)
+    else:
+        to_index, stale = IndexManifestStore.diff(previous, objects)
+        logger.info(f"Index {index_id}: {len(objects) - len(to_index)} files up to date, {len(to_index)} new or changed, "
+                    f"{len(set(stale) - {obj['Key'] for obj in to_index})} removed")
+        _delete_indexed_files(vector_database, index_id, stale)
+        kept.update((key, entry) for key, entry in previous['files'].items() if key not in stale)
+        load_stats, cache_stats = BulkLoadStats(), {"embedding_cache_hits": 0, "embedding_cache_misses": 0}
+        if to_index:
+            # A small delta is not worth dropping the replicas of the whole index
+            load_stats, cache_stats = _embed_and_load(
+                config, experimentalConfig, _iter_kb_chunks(config, experimentalConfig, to_index, recorder), memory_budget, stats,
+                recorder=recorder, tune_index=2 * len(to_index) > len(objects)
+            )
+
+    if recorder.stopped:
+        save_checkpoint()
+        return load_stats, cache_stats, False
+    manifest_store.save(index_id, params, {**kept, **recorder.entries()})
+    return load_stats, cache_stats, True
+
+def _delete_indexed_files(vector_database: OpenSearchVectorDatabase, index_id: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    """Delete the chunks (and hierarchical parents) that manifest entries recorded."""
+    if not entries:
+        return
+    chunk_ids = [chunk_id for entry in entries.values() for chunk_id in IndexManifestStore.chunk_ids(index_id, entry)]
+    deleted = vector_database.delete_chunks(index_id, chunk_ids)
+    parent_ids = [parent_id for entry in entries.values() for parent_id in entry['parent_ids']]
+    if parent_ids:
+        vector_database.delete_documents(parent_index_name(index_id), parent_ids)
+    logger.info(f"Deleted {deleted} chunks and {len(parent_ids)} parents of {len(entries)} files from {index_id}")
+
+def _index_all(config: Config, experimentalConfig: ExperimentalConfig, objects: Optional[List[Dict[str, Any]]],
+               memory_budget: int, stats: Dict[str, int],
+               recorder: Optional[ManifestRecorder] = None) -> Tuple[BulkLoadStats, Dict[str, int]]:
+    """Index the whole knowledge base, through the shared embedding artifact when enabled."""
+    if config.embedding_artifact_enabled and config.artifact_cache_enabled and config.s3_bucket:
+        # Reuse (or build) the embedded corpus shared with experiments differing only by indexing algorithm
+        return _load_through_embedding_artifact(config, experimentalConfig, objects, memory_budget, stats, recorder)
+    return _embed_and_load(config, experimentalConfig, _iter_kb_chunks(config, experimentalConfig, objects, recorder),
+                           memory_budget, stats, recorder=recorder)
+
+def _embed_and_load(config: Config, experimentalConfig: ExperimentalConfig, chunks: Iterable, memory_budget: int,
+                    stats: Dict[str, int], spool: Optional[Callable[[Iterator[EmbeddedBatch]], Iterator[EmbeddedBatch]]] = None,
+                    recorder: Optional[ManifestRecorder] = None, tune_index: bool = True) -> Tuple[BulkLoadStats, Dict[str, int]]:
+    """
+    Embed a chunk stream and bulk load it, returning the load and embedding cache statistics.
+
+    Chunks are embedded in batches bounded by a third of the memory budget (one batch
+    embedding, one batch queued, one batch inside the bulk buffer), and the bulk insert
+    overlaps with the embedding of the next batch. `spool` may observe the embedded batches
+    on their way to the index.
+    """
+    embed_processor = EmbedProcessor(experimentalConfig, config=config)
+    if recorder is not None:
+        # Embeddings paid for by files still in progress are reused when an interrupted run resumes
+        recorder.checkpoint_hooks.append(embed_processor.push_cache)
+    try:
+        embedded_batches = _iter_embedded_batches(experimentalConfig, chunks, embed_processor, memory_budget // 3, stats)
+        if spool is not None:
+            embedded_batches = spool(embedded_batches)
+        document_batches = _iter_document_batches(config, experimentalConfig, embedded_batches, recorder)
+        load_stats = _insert_to_opensearch(config, experimentalConfig, _iter_in_background(document_batches, max_pending=1),
+                                           memory_budget // 3, tune_index=tune_index,
+                                           on_progress=recorder.acknowledge if recorder is not None else None)
+        return load_stats, embed_processor.cache_stats
+    finally:
+        if recorder is not None:
+            recorder.checkpoint_hooks.remove(embed_processor.push_cache)
+        embed_processor.close()
+
+def _load_through_embedding_artifact(config: Config, experimentalConfig: ExperimentalConfig,
+                                     objects: Optional[List[Dict[str, Any]]], memory_budget: int, stats: Dict[str, int],
+                                     recorder: Optional[ManifestRecorder] = None) -> Tuple[BulkLoadStats, Dict[str, int]]:
+    """
+    Bulk load the experiment's embedding artifact, embedding the knowledge base first if no
+    experiment has yet.
+
+    The artifact is keyed by everything that determines the vectors (KB manifest, extractor,
+    chunking, embedding model and dimension) but not the indexing algorithm, so experiments
+    that only differ by algorithm embed the corpus once. Whoever holds the artifact's lease
+    embeds it while loading its own index and publishes it; the others wait and load it.
+    """
+    store = EmbeddingArtifactStore(config.s3_bucket, f"{config.artifact_cache_s3_prefix}/embeddings",
+                                   lease_seconds=config.embedding_artifact_lease_minutes * 60)
+    chunk_cache = KBArtifactCache(config.s3_bucket, config.artifact_cache_s3_prefix, extractor=config.pdf_extraction_backend)
+    if objects is None:
+        objects = S3Util().list_objects(experimentalConfig.kb_data)
+    chunk_artifact_id = chunk_cache.chunk_artifact_id([(obj['Key'], obj['ETag']) for obj in objects],
+                                                      ChunkingProcessor(experimentalConfig).chunk_params())
+    artifact_id = store.artifact_id(chunk_artifact_id, {
+        "embedding_service": experimentalConfig.embedding_service,
+        "embedding_model": experimentalConfig.embedding_model,
+        "vector_dimension": experimentalConfig.vector_dimension,
+        "normalize": True
+    })
+    is_hierarchical = experimentalConfig.chunking_strategy.lower() == 'hierarchical'
+    no_cache_stats = {"embedding_cache_hits": 0, "embedding_cache_misses": 0}
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        while True:
+            manifest = store.get_manifest(artifact_id)
+            if manifest is None and store.try_acquire(artifact_id):
+                logger.info(f"Embedding artifact {artifact_id} not found, embedding the knowledge base")
+                writer = EmbeddingArtifactWriter(scratch_dir, experimentalConfig.vector_dimension, is_hierarchical)
+                # File boundaries travel with the artifact, for the manifests of the indexes loading it
+                recorder = recorder or ManifestRecorder(experimentalConfig.index_id)
+                try:
+                    result = _embed_and_load(
+                        config, experimentalConfig, _iter_kb_chunks(config, experimentalConfig, objects, recorder), memory_budget, stats,
+                        spool=lambda batches: store.tee(artifact_id, batches, writer), recorder=recorder
+                    )
+                    if recorder.stopped:
+                        # Only part of the knowledge base was embedded; the artifact is left to a complete run
+                        return result
+                    try:
+                        store.publish(artifact_id, writer, {"index_id": experimentalConfig.index_id, "files": recorder.files})
+                    except Exception as e:
+                        # The index itself is complete; other experiments will embed on their own
+                        logger.warning(f"Failed to publish embedding artifact {artifact_id}: {e}")
+                    return result
+                finally:
+                    writer.close()
+                    store.release(artifact_id)
+            if manifest is None:
+                manifest = store.wait(artifact_id)
+                if manifest is None:
+                    continue
+
+            logger.info(f"Loading embedding artifact {artifact_id} built by {manifest.get('index_id')}")
+            per_row_bytes = BYTES_PER_VECTOR_ELEMENT * int(experimentalConfig.vector_dimension) + 4096
+            embedded_batches = store.iter_batches(artifact_id, manifest, scratch_dir, max(1, (memory_budget // 3) // per_row_bytes))
+            if recorder is not None:
+                for key, etag, count in manifest['files']:
+                    recorder.add_file(key, etag, count)
+            document_batches = _iter_document_batches(config, experimentalConfig, embedded_batches, recorder)
+            load_stats = _insert_to_opensearch(config, experimentalConfig, _iter_in_background(document_batches, max_pending=1),
+                                               memory_budget // 3,
+                                               on_progress=recorder.acknowledge if recorder is not None else None)
+            return load_stats, no_cache_stats
+
+def _iter_kb_chunks(config: Config, experimentalConfig: ExperimentalConfig,
+                    objects: Optional[List[Dict[str, Any]]] = None,
+                    recorder: Optional[ManifestRecorder] = None) -> Iterator[Union[str, Tuple[str, str, str]]]:
+    """
+    Yield the chunks of the knowledge base (or of the given KB objects), one file at a time.
+
+    With the artifact cache enabled, extracted text is kept on S3 per file ETag and the
+    chunk spans per (KB manifest, chunking parameters), so an experiment sharing the KB and
+    chunking settings of an earlier one skips the PDF download, extraction and chunking;
+    each file is then also reported to `recorder` ahead of its chunks.
+    Hierarchical parent ids are regenerated on every run.
+    """
+    chunking_processor = ChunkingProcessor(experimentalConfig)
+    extractor = ParallelPdfExtractor(backend=config.pdf_extraction_backend, max_workers=config.pdf_extraction_workers or None)
+    if not (config.artifact_cache_enabled and config.s3_bucket):
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            pdf_folder_path = S3Util().download_directory_from_s3(
+                experimentalConfig.kb_data, local_path=scratch_dir, max_concurrency=config.s3_download_concurrency,
+                multipart_chunk_mb=config.s3_multipart_chunk_mb
+            )
+            yield from chunking_processor.iter_chunks(
+                iter_pdf_text_from_folder(pdf_folder_path, backend=extractor.backend, max_workers=extractor.max_workers)
+            )
+        return
 
+    s3_util = S3Util()
+    cache = KBArtifactCache(config.s3_bucket, config.artifact_cache_s3_prefix, extractor=extractor.backend)
+    if objects is None:
+        objects = s3_util.list_objects(experimentalConfig.kb_data)
+    artifact_id = cache.chunk_artifact_id([(obj['Key'], obj['ETag']) for obj in objects], chunking_processor.chunk_params())
+    artifact = cache.get_chunks(artifact_id)
+    is_hierarchical = experimentalConfig.chunking_strategy.lower() == 'hierarchical'
+    logger.info(f"Chunk artifact {artifact_id} {'found, reusing cached chunks' if artifact else 'not found, chunking'} "
+                f"for {len(objects)} files")
 
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        texts = _iter_kb_texts(config, objects, cache, extractor, s3_util, scratch_dir)
+        if artifact is not None:
+            # Cached spans index the same word buffer the chunkers build, so only that buffer is rebuilt
+            for (obj, text), file_entry in zip(texts, artifact['files']):
+                buffer = split_words(text)[0]
+                if is_hierarchical:
+                    file_chunks = HierarchicalChunkSpans(
+                        buffer, [tuple(span) for span in file_entry['parents']],
+                        [(parent, (start, end)) for parent, start, end in file_entry['children']]
+                    )
+                else:
+                    file_chunks = ChunkSpans(buffer, [tuple(span) for span in file_entry['spans']])
+                if recorder is not None:
+                    recorder.add_file(obj['Key'], obj['ETag'], len(file_chunks))
+                yield from file_chunks
+            return
+
+        files = []
+        for obj, text in texts:
+            file_chunks = chunking_processor.chunker.chunk(text)
+            if is_hierarchical:
+                files.append({"key": obj['Key'], "parents": file_chunks.parents,
+                              "children": [[parent, start, end] for parent, (start, end) in file_chunks.children]})
+            else:
+                files.append({"key": obj['Key'], "spans": file_chunks.spans})
+            if recorder is not None:
+                recorder.add_file(obj['Key'], obj['ETag'], len(file_chunks))
+            yield from file_chunks
+        cache.put_chunks(artifact_id, {"version": KBArtifactCache.CHUNK_ARTIFACT_VERSION, "files": files})
+
+def _iter_kb_texts(config: Config, objects: List[Dict[str, Any]], cache: KBArtifactCache,
+                   extractor: ParallelPdfExtractor, s3_util: S3Util, scratch_dir: str) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Yield (object, extracted text) for every KB object, in order.
+
+    Text is read from the cache when present; the remaining files are downloaded
+    concurrently (or streamed from S3 with `kb_stream_downloads`), extracted in parallel,
+    and their text is added to the cache.
+    """
+    # Files with identical content (same ETag) are extracted once
+    missing = {}
+    for obj in objects:
+        if obj['ETag'] not in missing and not cache.has_text(obj['ETag']):
+            missing[obj['ETag']] = obj
+    missing = list(missing.values())
+    transfer = dict(max_concurrency=config.s3_download_concurrency, multipart_chunk_mb=config.s3_multipart_chunk_mb)
+    if config.kb_stream_downloads:
+        # PDF content goes straight from S3 to the extraction workers
+        sources = (content for _, content in s3_util.iter_object_bytes(missing, **transfer))
+    else:
+        sources = s3_util.download_objects(missing, scratch_dir, **transfer)
+
+    missing_etags = {obj['ETag'] for obj in missing}
+    extracted = extractor.iter_extract(sources)
+    try:
+        for obj in objects:
+            if obj['ETag'] in missing_etags:
+                source, text = next(extracted)
+                if isinstance(source, str):
+                    os.remove(source)
+                cache.put_text(obj['ETag'], text)
+                missing_etags.discard(obj['ETag'])
+            else:
+                text = cache.get_text(obj['ETag'])
+            yield obj, text
+        extractor.log_summary()
+    finally:
+        extracted.close()
+
+def _estimate_chunk_bytes(chunk: Union[str, Tuple[str, str, str]], vector_dimension: int) -> int:
+    """Rough in-memory footprint of one chunk once embedded and turned into a document."""
+    text_length = len(chunk[1]) + len(chunk[2]) if isinstance(chunk, tuple) else len(chunk)
+    # Raw + cleaned text, and one float32 matrix row
+    return 2 * text_length + BYTES_PER_VECTOR_ELEMENT * int(vector_dimension or 0)
+
+def _iter_chunk_batches(chunks: Iterable, vector_dimension: int, max_batch_bytes: int) -> Iterator[List]:
+    """Group a chunk stream into batches whose estimated footprint stays under max_batch_bytes."""
+    batch, batch_bytes = [], 0
+    for chunk in chunks:
+        chunk_bytes = _estimate_chunk_bytes(chunk, vector_dimension)
+        if batch and batch_bytes + chunk_bytes > max_batch_bytes:
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(chunk)
+        batch_bytes += chunk_bytes
+    if batch:
+        yield batch
+
+def _iter_embedded_batches(experimentalConfig: ExperimentalConfig, chunks: Iterable, embed_processor: EmbedProcessor,
+                           max_batch_bytes: int, stats: Dict[str, int]) -> Iterator[EmbeddedBatch]:
+    """Embed a chunk stream batch by batch and yield (chunks, embedding matrix, metadata) per batch."""
+    is_hierarchical = experimentalConfig.chunking_strategy.lower() == 'hierarchical'
+    for batch in _iter_chunk_batches(chunks, experimentalConfig.vector_dimension, max_batch_bytes):
+        # Hierarchical chunks are (parent_id, parent_chunk, child_chunk); only the child is embedded
+        embed_chunks = [chunk[2] for chunk in batch] if is_hierarchical else batch
+        matrix, metadata = embed_processor.embed_matrix(embed_chunks)
+        stats["index_embed_tokens"] += sum(int(meta['inputTokens']) for meta in metadata)
+        yield batch, matrix, metadata
+
+def _iter_document_batches(config: Config, experimentalConfig: ExperimentalConfig, embedded_batches: Iterable[EmbeddedBatch],
+                           recorder: Optional[ManifestRecorder] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield the OpenSearch documents of each embedded batch.
+
+    With a parent index (see `_uses_parent_index`), each hierarchical parent is written once
+    to the parent index, ahead of its first child, and child documents only reference it by
+    `parent_id`; otherwise every child carries its parent's text.
+
+    Indexes with a quantized algorithm (`hnsw_int8`, `hnsw_binary`) receive quantized
+    vectors; the quantizer is fitted on the first batch (see `_resolve_quantizer`).
+
+    With a `recorder`, chunk and parent ids are drawn from it and each emitted batch is
+    marked on it, so the run can be recorded in the index manifest and checkpointed; no
+    batch is emitted once its deadline has passed.
+    """
+    is_hierarchical = experimentalConfig.chunking_strategy.lower() == 'hierarchical'
+    separate_parents = is_hierarchical and _uses_parent_index(config)
+    parent_index = parent_index_name(experimentalConfig.index_id)
+    # Id each parent is written under, by the id the chunker gave it
+    written_parents = {}
+    is_quantized = experimentalConfig.indexing_algorithm in QUANTIZED_ALGORITHMS
+    quantizer = None
+    for batch, embeddings, batch_metadata in embedded_batches:
+        if recorder is not None and recorder.past_deadline():
+            logger.info(f"Deadline reached, stopping the indexing of {experimentalConfig.index_id}")
+            return
+        # Documents hold matrix rows, which the OpenSearch serializer writes straight from their buffer
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if is_quantized:
+            if quantizer is None:
+                quantizer = _resolve_quantizer(config, experimentalConfig, vectors)
+            quantized_fields = quantizer.document_fields(vectors)
+            vectors = quantizer.quantize(vectors)
+
+        documents = []
+        for i, metadata in enumerate(batch_metadata):
+            document = {
+                "_index": experimentalConfig.index_id,
+                "execution_id": experimentalConfig.execution_id,
+                "chunk_id": recorder.next_chunk_id() if recorder else str(uuid.uuid4()),  # Generate a unique UUID for each chunk
+                config.vector_field: vectors[i],
+                "metadata": metadata  # Optional metadata, defaulting to an empty dictionary
+            }
+            if is_quantized:
+                document.update(quantized_fields[i])
+            if is_hierarchical:
+                chunker_parent_id, parent_chunk, chunk = batch[i]
+                parent_id = written_parents.get(chunker_parent_id)
+                if parent_id is None:
+                    parent_id = written_parents[chunker_parent_id] = (recorder.next_parent_id() if recorder and separate_parents
+                                                                        else chunker_parent_id)
+                    if separate_parents:
+                        documents.append({
+                            "_index": parent_index,
+                            "_id": parent_id,
+                            "execution_id": experimentalConfig.execution_id,
+                            "text": clean_text_for_vector_db(parent_chunk)
+                        })
+                if not separate_parents:
+                    document["text"] = clean_text_for_vector_db(parent_chunk)
+                document["child_text"] = clean_text_for_vector_db(chunk)
+                document["parent_id"] = parent_id
+            else:
+                document["text"] = clean_text_for_vector_db(batch[i])
+            documents.append(document)
+        if recorder is not None:
+            recorder.mark_documents(len(documents))
+        yield documents
+
+def _resolve_quantizer(config: Config, experimentalConfig: ExperimentalConfig, sample: np.ndarray) -> VectorQuantizer:
+    """
+    Quantizer of the experiment's index: the one stored in its mapping, or one fitted on
+    `sample` and stored there, so that every writer and every query use the same parameters.
+    """
+    vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
+        password=config.opensearch_password)
+    quantizer = vector_database.get_quantizer(experimentalConfig.index_id)
+    if quantizer is None:
+        vector_database.put_quantizer(experimentalConfig.index_id, fit_quantizer(experimentalConfig.indexing_algorithm, sample))
+        # Read back, in case a concurrent writer fitted its own parameters first
+        quantizer = vector_database.get_quantizer(experimentalConfig.index_id)
+    logger.info(f"Quantizing vectors of {experimentalConfig.index_id} with {quantizer.mode} parameters")
+    return quantizer
+
+def _uses_parent_index(config: Config) -> bool:
+    """Hierarchical parents go to a separate index on managed OpenSearch (serverless vector collections reject custom document ids)."""
+    return config.hierarchical_parent_index and not config.opensearch_serverless
+
+def _iter_in_background(batches: Iterator[List[Dict[str, Any]]], max_pending: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Drive a batch generator on a background thread and yield its items one by one.
+
+    At most `max_pending` finished batches wait in the queue, so the producer (embedding)
+    runs ahead of the consumer (bulk insert) without unbounded buffering. Exceptions raised
+    by the producer are re-raised in the consumer.
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        # Give up once the consumer has stopped, instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="indexing-embedder", daemon=True)
+    producer.start()
+    try:
+        while True:
+            batch = pending.get()
+            if batch is done:
+                break
+            if isinstance(batch, BaseException):
+                raise batch
+            yield from batch
+    finally:
+        stop.set()
+        producer.join(timeout=5)
+    
+def _insert_to_opensearch(config: Config, experimentalConfig: ExperimentalConfig, documents: Iterable[Dict[str, Any]],
+                          max_in_flight_bytes: int = 100 * 1024 * 1024, tune_index: bool = True,
+                          on_progress: Optional[Callable[[int], None]] = None) -> BulkLoadStats:
+    """
+    Bulk load the documents with `OpenSearchBulkLoader`.
+
+    On managed OpenSearch the target indices have refresh and replicas disabled during the
+    load (`opensearch_ingest_tuning`), and can be force merged and warmed up afterwards;
+    serverless collections manage these themselves.
+    """
+    vector_database = OpenSearchVectorDatabase(host=config.opensearch_host, is_serverless=config.opensearch_serverless, region=config.aws_region,username=config.opensearch_username,
+        password=config.opensearch_password)
+    index_names = [experimentalConfig.index_id]
+    if experimentalConfig.chunking_strategy.lower() == 'hierarchical' and _uses_parent_index(config):
+        # Normally created with the vector index; indexes created before parents were split out lack it
+        vector_database.create_parent_index(experimentalConfig.index_id)
+        index_names.append(parent_index_name(experimentalConfig.index_id))
 
+    workers = config.opensearch_bulk_workers
+    # Up to 2 requests per worker are in flight
+    max_batch_bytes = max(1, min(config.opensearch_bulk_max_mb * 1024 * 1024, max_in_flight_bytes // (2 * workers)))
+    loader = OpenSearchBulkLoader(vector_database.client, workers=workers, max_docs=config.opensearch_bulk_max_docs,
+                                  max_batch_bytes=max_batch_bytes, max_retries=config.opensearch_bulk_max_retries)
+    tune = tune_index and config.opensearch_ingest_tuning and not config.opensearch_serverless
+    logger.info(f"Opensearch Bulk insert initiated ({workers} workers, {max_batch_bytes // 1024} KB requests)")
+    with loader.ingest_settings(index_names if tune else []):
+        load_stats = loader.load(documents, on_progress)
+    if not config.opensearch_serverless:
+        if config.opensearch_force_merge:
+            loader.force_merge(experimentalConfig.index_id)
+        if config.opensearch_knn_warmup:
+            loader.knn_warmup(experimentalConfig.index_id)
+    logger.info(f"Opensearch Bulk insert successful ({load_stats}) \n Pipeline completed successfully.")
+    return load_stats
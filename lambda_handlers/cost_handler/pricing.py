@@ -139,13 +139,20 @@ def compute_actual_price_breakdown(
                 inferencer_metadata['query_embed_tokens_cost'] = query_embedding_cost
             if rerank_model_id and rerank_model_id != "none" :
                 retriever_metadata['rerank_model'] = rerank_model_id
-                retriever_metadata['reranker_queries'] = question_details["reranker_queries"]
+                # Billed rerank queries recorded by the retriever; estimated for experiments run before they were
+                reranker_queries = configuration.get("rerank_queries")
+                if reranker_queries is None:
+                    reranker_queries = question_details["reranker_queries"]
+                else:
+                    retriever_metadata['rerank_cache_hits'] = configuration.get("rerank_cache_hits", 0)
+                    retriever_metadata['rerank_p95_latency'] = float(configuration.get("rerank_latency_p95_ms", 0)) / THOUSAND
+                retriever_metadata['reranker_queries'] = reranker_queries
                 reranker_model_price = df[(df["model"] == rerank_model_id) & (df["Region"] == aws_region)]["input_price"]
                 if reranker_model_price.empty:
                     logger.error(f"No reranker model {rerank_model_id} price found.")
                     return None
                 reranker_model_price = float(reranker_model_price.values[0])  # Price per 1000 queries
-                reranking_cost = (reranker_model_price * float(question_details['reranker_queries'])) / THOUSAND
+                reranking_cost = (reranker_model_price * float(reranker_queries)) / THOUSAND
                 retriever_metadata['reranking_cost'] = reranking_cost
                 retrieval_cost += reranking_cost
             inferencing_cost = retrieval_model_input_actual_cost + retrieval_model_output_actual_cost + query_embedding_cost
@@ -215,7 +222,7 @@ def compute_actual_price_breakdown(
         overall_metadata['total_time'] = total_time
         overall_metadata['order'] = ['total_time', 'total_cost']
         indexing_metadata['order'] = ['model', 'service', 'knowledge_base_tokens', 'bedrock_cost', 'runtime', 'sagemaker_cost', 'ecs_cost', 'opensearch_cost', 'total_cost']
-        retriever_metadata['order'] = ['no_of_questions', 'rerank_model', 'reranker_queries', 'reranking_cost', 'runtime', 'ecs_cost', 'opensearch_cost', 'total_cost']
+        retriever_metadata['order'] = ['no_of_questions', 'rerank_model', 'reranker_queries', 'rerank_cache_hits', 'rerank_p95_latency', 'reranking_cost', 'runtime', 'ecs_cost', 'opensearch_cost', 'total_cost']
         inferencer_metadata['order'] = ['model', 'service', 'no_of_questions', 'input_tokens', 'output_tokens', 'query_embed_tokens', 'input_tokens_cost', 'output_tokens_cost', 'query_embed_tokens_cost', 'average_latency', 'runtime', 'sagemaker_embedding_cost', 'sagemaker_cost', 'total_cost']
         evaluator_metadata['order'] = ['runtime', 'ecs_cost', 'opensearch_cost', 'sagemaker_embedding_cost', 'sagemaker_inferencer_cost', 'total_cost']
         return overall_metadata, indexing_metadata, retriever_metadata, inferencer_metadata, evaluator_metadata
@@ -301,7 +308,9 @@ def calculate_experiment_question_details(experiment_question_metrics_items):
         if answer_metadata:
             latency = answer_metadata.get("latencyMs", 0)
             inputTokens = answer_metadata.get('inputTokens', 0)
-            overall_inferencer_time += (latency / THOUSAND)
+            # Cached answers keep the latency of their original generation, which was not spent here
+            if not answer_metadata.get("cache_hit"):
+                overall_inferencer_time += (latency / THOUSAND)
             if math.ceil(inputTokens / 500) >= 100:
                 reranker_queries += (math.ceil(inputTokens / 500) / 100)
             else:
@@ -1,16 +1,59 @@
 import json
+import time
+from datetime import datetime, timezone
 from typing import Dict, Any
+import boto3
 from config.config import Config
 from config.experimental_config import ExperimentalConfig
+from core.dynamodb import DynamoDBOperations
 from indexing.indexing import chunk_embed_store
 import logging
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
 
+def _continue_indexing(event: Dict[str, Any], context: Any, continuation: int) -> None:
+    """Invoke this function again, asynchronously, to resume indexing from its last checkpoint."""
+    boto3.client('lambda').invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps({**event, "continuation_token": continuation}).encode('utf-8')
+    )
+
+def _notify_task(event: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Report the outcome of a continued indexing to the Step Functions task waiting on `task_token`."""
+    sfn_client = boto3.client('stepfunctions')
+    if response["status"] == "success":
+        sfn_client.send_task_success(taskToken=event['task_token'], output=json.dumps(response))
+    else:
+        sfn_client.send_task_failure(taskToken=event['task_token'], error='TaskProcessingError',
+                                     cause=response.get('errorMessage'))
+
+def _record_outcome(event: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """
+    Write the outcome of a continued indexing to its experiment item, as the indexing state
+    machine does, for callers without a `task_token` that only saw "in_progress".
+    """
+    config = Config.load_config()
+    indexing_end = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    status = "succeeded" if response["status"] == "success" else "failed"
+    DynamoDBOperations(region=config.aws_region, table_name=config.experiment_table).update_item(
+        key={'id': event['experiment_id']},
+        update_expression="SET index_status = :status, indexing_end = :end, index_error = :error",
+        expression_values={':status': status, ':end': indexing_end, ':error': response.get('errorMessage', '')}
+    )
+    logger.info("Recorded indexing outcome %s on experiment %s", status, event['experiment_id'])
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
-    Lambda handler to invoke the retrieve method.
+    Lambda handler to invoke the indexing pipeline.
+
+    Indexing stops `indexing_lambda_reserve_seconds` before the function times out and
+    checkpoints its progress; the function then re-invokes itself asynchronously with a
+    `continuation_token` and returns the status "in_progress". Callers that cannot wait on
+    the continuations can pass a Step Functions `task_token`, which the last invocation
+    completes; without one, the last invocation writes the final index_status, and the
+    error of a failure, to the experiment item.
     
     Args:
         event (Dict[str, Any]): Lambda event containing configuration parameters
@@ -19,6 +62,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: Response containing execution status and details
     """
+    continuation = int(event.get('continuation_token') or 0)
     try:
         # Validate input parameters
 
@@ -54,18 +98,40 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Load base configuration
         config = Config.load_config()
            
-        # Execute retrieve method
-        chunk_embed_store(config, exp_config)
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - config.indexing_lambda_reserve_seconds
+        if continuation >= config.indexing_lambda_max_continuations:
+            # The last allowed invocation runs to completion or times out
+            deadline = None
+
+        # Execute indexing
+        completed = chunk_embed_store(config, exp_config, deadline=deadline, continuation=continuation > 0)
+        if not completed:
+            logger.info("Indexing checkpointed, continuing in invocation %d", continuation + 1)
+            _continue_indexing(event, context, continuation + 1)
+            return {
+                **event,  # Pass the entire input event
+                "status": "in_progress",
+                "continuation_token": continuation + 1
+            }
 
-        return {
+        response = {
             **event,  # Pass the entire input event
             "status": "success"
         }
     except Exception as e:
         logger.error("Error processing event: %s", str(e))
-        return {
+        response = {
             **event,  # Pass the entire input event
             "status": "failed",
             "errorMessage": str(e)
         }
+    if event.get('task_token'):
+        _notify_task(event, response)
+    elif continuation > 0:
+        try:
+            _record_outcome(event, response)
+        except Exception as e:
+            # Raising would make Lambda retry the whole invocation
+            logger.error("Could not record the indexing outcome on the experiment: %s", str(e))
+    return response
 
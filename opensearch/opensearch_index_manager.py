@@ -23,11 +23,13 @@ class OpenSearchIndex:
         algorithm (str): Indexing algorithm to be used
         vector_field (str): Name of the vector field
         dimension (int): Dimensionality of the vector
+        hierarchical (bool): Whether the index holds hierarchical child chunks
     """
     name: str
     algorithm: str
     vector_field: str
     dimension: int
+    hierarchical: bool = False
 
 
 class OpenSearchIndexManager:
@@ -87,10 +89,27 @@ class OpenSearchIndexManager:
                 },
                 "text": {
                     "type": "text"
+                },
+                # Exact chunk ids, for deleting the chunks of changed KB files
+                "chunk_id": {
+                    "type": "keyword"
                 }
             }
         }
 
+    def _create_parent_index(self, index: OpenSearchIndex) -> None:
+        """
+        Create the parent index of a hierarchical index, where each parent chunk is stored once.
+
+        Serverless collections keep the parent text on every child document instead.
+        """
+        if not index.hierarchical or self.config.opensearch_serverless or not self.config.hierarchical_parent_index:
+            return
+        try:
+            self.opensearch_db.create_parent_index(index_name=index.name)
+        except Exception as e:
+            logger.error(f"Failed to create parent index for {index.name}: {e}")
+
     def _validate_experiment_config(self, config_data: Dict[str, Any]) -> Optional[OpenSearchIndex]:
         """
         Validate and extract OpenSearch index configuration from experiment config.
@@ -115,7 +134,8 @@ class OpenSearchIndexManager:
                 name=index_id,
                 algorithm=config.get('indexing_algorithm', ''),
                 vector_field=self.config.vector_field,
-                dimension=config.get('vector_dimension', 0)
+                dimension=config.get('vector_dimension', 0),
+                hierarchical=config.get('chunking_strategy', '').lower() == 'hierarchical'
             )
         except Exception as e:
             logger.error(f"Error processing experiment configuration: {e}")
@@ -150,6 +170,8 @@ class OpenSearchIndexManager:
                 logger.info(f"Skipping duplicate index: {index_config.name}")
                 continue
 
+            self._create_parent_index(index_config)
+
             # Check if index already exists
             if self.opensearch_db.index_exists(index_name=index_config.name):
                 logger.info(f"Index {index_config.name} already exists")
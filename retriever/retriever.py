@@ -1,18 +1,26 @@
 from datetime import datetime, timezone
 from core.guardrails.bedrock_guardrails import BedrockGuardrails
+from core.guardrails.guardrail_cache import guardrail_response_cache
 from core.opensearch_vectorstore import OpenSearchVectorDatabase
 from config.experimental_config import ExperimentalConfig
 from util.s3util import S3Util
 from baseclasses.base_classes import ExperimentQuestionMetrics
-from core.dynamodb import DynamoDBOperations
+from core.dynamodb import DynamoDBBatchWriter, DynamoDBOperations
 from config.config import Config, get_config
 from core.processors import EmbedProcessor
 from core.processors import InferenceProcessor
-from core.rerank.rerank import DocumentReranker
+from core.rerank.rerank_service import RerankStats, get_rerank_service
 from core.knowledgebase_vectorstore import KnowledgeBaseVectorDatabase
+from util.retrieval_store import RetrievalStore
+from util.question_embeddings import QuestionEmbeddings, QuestionEmbeddingStore
+from util.retrieval_journal import RetrievalJournal, question_id
+from util.model_invocations import task_concurrency
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
 import time
 
-import boto3, json, uuid
+import boto3, json
 from core.inference.inference_factory import InferencerFactory
 import logging
 
@@ -20,7 +28,7 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 # Function to retrieve and process data using Vectorstore and inference models
-from typing import List, Dict, Any, Optional, Tuple, Union
+from typing import List, Deque, Dict, Any, Optional, Tuple, Union
 from dataclasses import asdict
 
 def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
@@ -34,6 +42,7 @@ def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
     Raises:
         RetrievalError: If the retrieval process fails
     """
+    components = None
     try:
         logger.info(f"Starting retrieval process for experiment ID: {experimentalConfig.experiment_id}")
         
@@ -68,25 +77,56 @@ def retrieve(config: Config, experimentalConfig: ExperimentalConfig) -> None:
         )
 
 
+        update_expression = "SET retrieval_query_embed_tokens = :rqembed, retrieval_input_tokens = :rinput, retrieval_output_tokens = :routput"
+        expression_values = {
+            ":rqembed": retrieval_query_embed_tokens,
+            ":rinput": retrieval_input_tokens,
+            ":routput": retrieval_output_tokens,
+        }
+        if components.get('reranker') is not None:
+            # Billed rerank usage for the cost computation; cached reranks are not billed
+            rerank_stats = components['rerank_stats']
+            logger.info(f"Experiment {experimentalConfig.experiment_id} reranking: {rerank_stats}")
+            update_expression += (", rerank_calls = :rrcalls, rerank_queries = :rrqueries, rerank_cache_hits = :rrhits"
+                                  ", rerank_latency_p50_ms = :rrp50, rerank_latency_p95_ms = :rrp95")
+            expression_values.update({
+                ":rrcalls": rerank_stats.calls,
+                ":rrqueries": rerank_stats.billed_queries,
+                ":rrhits": rerank_stats.cache_hits,
+                ":rrp50": int(round(rerank_stats.latency.percentile_ms(50))),
+                ":rrp95": int(round(rerank_stats.latency.percentile_ms(95))),
+            })
+            components['reranker'].push()
+        components['inference_processor'].push_cache()
+
         components['experiment_dynamodb'].update_item(
             key={"id": experimentalConfig.experiment_id},
-            update_expression="SET retrieval_query_embed_tokens = :rqembed, retrieval_input_tokens = :rinput, retrieval_output_tokens = :routput",
-            expression_values={
-                ":rqembed": retrieval_query_embed_tokens,
-                ":rinput": retrieval_input_tokens,
-                ":routput": retrieval_output_tokens,
-            },
+            update_expression=update_expression,
+            expression_values=expression_values,
         )
         
+        # Every answer is stored, a later run of the task starts over
+        if components.get("journal") is not None:
+            components["journal"].delete()
+
         logger.info("Retrieval process completed successfully")
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
         raise RetrievalError(f"Retrieval process failed: {str(e)}")
+    finally:
+        # Release the embedding threads used to embed the questions in batches
+        if components is not None and components.get("embed_processor") is not None:
+            components["embed_processor"].close()
 
 def initialize_components(config: Config, experimentalConfig: ExperimentalConfig) -> Dict[str, Any]:
     """Initialize all required components for the retrieval process."""
     try:
+        # Questions in flight at once; the inference and search clients pool a connection for each,
+        # and never fewer than botocore's default of 10
+        question_concurrency = get_question_concurrency(config, experimentalConfig)
+        client_pool_size = max(10, question_concurrency)
+
         # Initialize embedding processor if required
         if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
             logger.info("Skipping embed processor initialization")
@@ -98,14 +138,14 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             
         # Initialize inference processor
         logger.info("Initializing inference processor")
-        inference_processor = InferenceProcessor(experimentalConfig)
+        inference_processor = InferenceProcessor(experimentalConfig, config, max_concurrency=client_pool_size)
         
         # Initialize vector database
         vector_database = None
         if experimentalConfig.knowledge_base:
             if experimentalConfig.bedrock_knowledge_base:
                 logger.info("Connecting to Knowledge base")
-                vector_database = KnowledgeBaseVectorDatabase(region=experimentalConfig.aws_region)
+                vector_database = KnowledgeBaseVectorDatabase(region=experimentalConfig.aws_region, max_concurrency=client_pool_size)
             else:
                 logger.info(f"Connecting to OpenSearch at {config.opensearch_host}")
                 vector_database = OpenSearchVectorDatabase(
@@ -113,7 +153,8 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
                     is_serverless=config.opensearch_serverless,
                     region=config.aws_region,
                     username=config.opensearch_username,
-                    password=config.opensearch_password
+                    password=config.opensearch_password,
+                    max_concurrency=client_pool_size
                 )
         
         # Initialize DynamoDB connections
@@ -127,12 +168,45 @@ def initialize_components(config: Config, experimentalConfig: ExperimentalConfig
             region=config.aws_region, table_name=config.experiment_table
         )
 
+        # Reranker shared by every question thread, and by later experiments in this process
+        reranker = None
+        if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
+            logger.info(f"Initializing reranker {experimentalConfig.rerank_model_id}")
+            reranker = get_rerank_service(experimentalConfig.aws_region, experimentalConfig.rerank_model_id, config)
+
+        # Search results shared with the other experiments of the execution
+        retrieval_store = None
+        if experimentalConfig.knowledge_base and config.retrieval_store_enabled and config.s3_bucket:
+            retrieval_store = RetrievalStore(config.s3_bucket, f"{config.artifact_cache_s3_prefix}/retrieval_results")
+
+        # Ground truth questions embedded once per execution and embedding model
+        question_embedding_store = None
+        if embed_processor is not None and config.question_embedding_store_enabled and config.s3_bucket:
+            question_embedding_store = QuestionEmbeddingStore(config.s3_bucket, f"{config.artifact_cache_s3_prefix}/question_embeddings")
+
+        # Journal of the answered questions, for a restarted task to resume from
+        journal = None
+        if config.retrieval_journal_enabled:
+            journal = RetrievalJournal(
+                os.path.join(config.retrieval_journal_dir, f"{experimentalConfig.experiment_id}.jsonl"),
+                bucket=config.s3_bucket,
+                s3_key=f"{config.artifact_cache_s3_prefix}/retrieval_journals/{experimentalConfig.experiment_id}.jsonl",
+                upload_seconds=config.retrieval_journal_upload_seconds
+            )
+
         return {
             "embed_processor": embed_processor,
             "inference_processor": inference_processor,
             "vector_database": vector_database,
             "metrics_dynamodb": metrics_dynamodb,
-            "experiment_dynamodb": experiment_dynamodb
+            "experiment_dynamodb": experiment_dynamodb,
+            "reranker": reranker,
+            "rerank_stats": RerankStats(),
+            "retrieval_store": retrieval_store,
+            "question_embedding_store": question_embedding_store,
+            "question_embeddings": None,
+            "journal": journal,
+            "question_concurrency": question_concurrency
         }
         
     except Exception as e:
@@ -152,13 +226,20 @@ def apply_guardrail_check(components, guardrail_id, content, source, log_prefix)
     Returns:
         Tuple of (blocked, modified_text, assessment)
     """
-    response = components['guardrails']['client'].apply_guardrail(
-        guardrail_id=guardrail_id,
-        guardrail_version=components['guardrails']['version'],
-        content=[{'text': content}],
-        source=source
+    response = _apply_guardrail(components, guardrail_id, [{'text': content}], source)
+    return _guardrail_outcome(response, log_prefix)
+
+def _apply_guardrail(components, guardrail_id, content_blocks, source):
+    """ApplyGuardrail response for the content blocks, cached by content (see `GuardrailResponseCache`)."""
+    return guardrail_response_cache.apply(
+        components['guardrails']['client'],
+        guardrail_id,
+        components['guardrails']['version'],
+        content_blocks,
+        source
     )
 
+def _guardrail_outcome(response, log_prefix):
     if response['action'] == 'GUARDRAIL_INTERVENED':
         assessment = response.get('assessments', [])
         modified_text = ' '.join(output['text'] for output in response['outputs'])
@@ -169,6 +250,35 @@ def apply_guardrail_check(components, guardrail_id, content, source, log_prefix)
     return False, None, None
 
 
+def check_input_and_context(components, guardrail_id, question, context):
+    """
+    Check the question and its retrieved context with one INPUT ApplyGuardrail call of two
+    content blocks. When the guardrail intervenes, each is checked on its own to report
+    which one was blocked, as separate checks would; if neither is, nothing is blocked.
+
+    Returns (guardrail_blocked, modified_text, input_assessment, context_assessment), where
+    guardrail_blocked is 'NONE', 'INPUT' or 'CONTEXT'.
+    """
+    question_block, context_block = {'text': {'text': question}}, {'text': {'text': context}}
+    response = _apply_guardrail(components, guardrail_id, [question_block, context_block], 'INPUT')
+    if response['action'] != 'GUARDRAIL_INTERVENED':
+        logger.info("Question and context passed guardrails check")
+        return 'NONE', None, None, None
+
+    blocked, modified_question, input_assessment = apply_guardrail_check(
+        components, guardrail_id, content=question_block['text'], source='INPUT', log_prefix="Question"
+    )
+    if blocked:
+        return 'INPUT', modified_question, input_assessment, None
+    blocked, modified_context, context_assessment = apply_guardrail_check(
+        components, guardrail_id, content=context_block['text'], source='INPUT', log_prefix="Context"
+    )
+    if not blocked:
+        # Only the two together were blocked, which separate checks would not have done
+        logger.info("Question and context passed separate guardrails checks")
+        return 'NONE', None, None, None
+    return 'CONTEXT', modified_context, None, context_assessment
+
 def load_ground_truth_data(experimentalConfig: ExperimentalConfig) -> List[Dict]:
     """Load ground truth data from S3."""
     logger.info(f"Reading ground truth data from S3: {experimentalConfig.gt_data}")
@@ -180,51 +290,185 @@ def process_questions(
     config: Config,
     experimentalConfig: ExperimentalConfig,
 ) -> Tuple[int, int, int]:
-    """Process questions and store results in DynamoDB."""
-    batch_items = []
-    logger.info(f"Processing {len(gt_data)} questions from ground truth data")
-
-    retrieval_query_embed_tokens = 0
-    retrieval_input_tokens = 0
-    retrieval_output_tokens = 0
-
+    """
+    Process questions concurrently and store results in DynamoDB.
+
+    Questions are embedded, or their embeddings loaded, once for the whole set (see
+    `load_question_embeddings`), and their searches run batched (see
+    `prefetch_retrievals`); then up to this task's share of the retrieval model's
+    invocation limit (see `get_question_concurrency`) questions are in flight at once.
+    Results are collected in ground truth order, journaled (see `RetrievalJournal`) and
+    their metrics handed to a background DynamoDB writer, which must have stored all of
+    them before this returns.
+    Questions journaled by an earlier attempt of the task are not answered again.
+    """
+    max_concurrency = components.get("question_concurrency") or get_question_concurrency(config, experimentalConfig)
+    logger.info(f"Processing {len(gt_data)} questions from ground truth data with concurrency {max_concurrency}")
     logger.info(f"Rerank model id for experiment {experimentalConfig.experiment_id}: {experimentalConfig.rerank_model_id}")
+
+    # Metrics are written behind the question loop, several batches at a time
+    writer = DynamoDBBatchWriter(components["metrics_dynamodb"])
+    totals = {"retrieval_query_embed_tokens": 0, "retrieval_input_tokens": 0, "retrieval_output_tokens": 0, "retrieval_cached_answers": 0}
+
+    # Questions answered before a restart are replayed from the journal rather than answered again
+    journal = components.get("journal")
+    journaled = journal.load() if journal is not None else {}
+    for entry in journaled.values():
+        writer.add(entry["item"])
+        for name, tokens in entry["usage"].items():
+            totals[name] = totals.get(name, 0) + tokens
+    pending = []
     for idx, item in enumerate(gt_data):
-        try:
-            question = item["question"]
-            logger.debug(f"Processing question {idx+1}: {question}")
+        metric_id = question_id(experimentalConfig.experiment_id, idx, item["question"])
+        if metric_id not in journaled:
+            pending.append((idx, item, metric_id))
+    if journaled:
+        logger.info(f"Resuming experiment {experimentalConfig.experiment_id}: {len(gt_data) - len(pending)} questions already answered, {len(pending)} left")
+
+    if pending:
+        components["question_embeddings"], embed_tokens = load_question_embeddings(gt_data, components, experimentalConfig)
+        totals["retrieval_query_embed_tokens"] += embed_tokens
+    prefetched = prefetch_retrievals([item for _, item, _ in pending], components, experimentalConfig) if pending else None
+
+    def collect(metric_id: str, future: Future) -> None:
+        item, usage, answered = future.result()
+        # Failed questions are not journaled, so a restarted task tries them again
+        if answered and journal is not None:
+            journal.append(metric_id, item, usage)
+        writer.add(item)
+        for name, tokens in usage.items():
+            totals[name] += tokens
+
+    # Retrievals started alongside the input guardrail check of their question
+    components["speculation_executor"] = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="speculation")
+    try:
+        with components["speculation_executor"], ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="question") as executor:
+            # A bounded window of submitted questions keeps memory flat on large ground truth sets
+            in_flight: Deque[Tuple[str, Future]] = deque()
+            for position, (idx, item, metric_id) in enumerate(pending):
+                in_flight.append((metric_id, executor.submit(_process_question, idx, item, components, config, experimentalConfig,
+                                                             prefetched[position] if prefetched else None)))
+                if len(in_flight) >= 2 * max_concurrency:
+                    collect(*in_flight.popleft())
+            while in_flight:
+                collect(*in_flight.popleft())
+    finally:
+        if journal is not None:
+            journal.sync()
+        # Write remaining items; raises if any metrics could not be stored
+        writer.close()
+
+    retrieval_query_embed_tokens = totals["retrieval_query_embed_tokens"]
+    retrieval_input_tokens = totals["retrieval_input_tokens"]
+    retrieval_output_tokens = totals["retrieval_output_tokens"]
+    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
+    if totals["retrieval_cached_answers"]:
+        logger.info(f"Experiment {experimentalConfig.experiment_id}: {totals['retrieval_cached_answers']} answers served from the response cache")
+    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+def _add_answer_usage(usage: Dict[str, int], answer_metadata: Dict[str, Any]) -> None:
+    """Add the tokens of a generated answer to `usage`; answers from the response cache are not billed."""
+    if answer_metadata.get("cache_hit"):
+        usage["retrieval_cached_answers"] += 1
+        return
+    usage["retrieval_input_tokens"] += int(answer_metadata["inputTokens"])
+    usage["retrieval_output_tokens"] += int(answer_metadata["outputTokens"])
+
+def get_question_concurrency(config: Config, experimentalConfig: ExperimentalConfig) -> int:
+    """
+    Number of questions processed at once: `retrieval_max_concurrency` when set, otherwise
+    this task's share of the retrieval model's invocation limit (see `task_concurrency`).
+    """
+    if config.retrieval_max_concurrency > 0:
+        return config.retrieval_max_concurrency
+    return task_concurrency(config, experimentalConfig.retrieval_service, experimentalConfig.retrieval_model)
+
+def _process_question(
+    idx: int,
+    item: Dict,
+    components: Dict[str, Any],
+    config: Config,
+    experimentalConfig: ExperimentalConfig,
+    prefetched: Optional[Tuple[Dict[str, Any], Any, List[Dict[str, Any]]]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, int], bool]:
+    """
+    Answer one ground truth question and return its DynamoDB metrics item, token usage
+    and whether it was answered.
+    `prefetched` is its (query metadata, query embedding, search results) from
+    `prefetch_retrievals`; without it the question is embedded and searched here.
 
-            # Generate embeddings
-            if experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
-                query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None                
+    Failures are logged and recorded as an empty answer, not answered; tokens already
+    spent on the question are still reported.
+    """
+    usage = {"retrieval_query_embed_tokens": 0, "retrieval_input_tokens": 0, "retrieval_output_tokens": 0, "retrieval_cached_answers": 0}
+    try:
+        question = item["question"]
+        metric_id = question_id(experimentalConfig.experiment_id, idx, question)
+        logger.debug(f"Processing question {idx+1}: {question}")
+
+        # Generate embeddings
+        search_results = None
+        if prefetched is not None:
+            query_metadata, query_embedding, search_results = prefetched
+        elif experimentalConfig.bedrock_knowledge_base or not experimentalConfig.knowledge_base:
+            query_metadata, query_embedding = {'inputTokens': '0', 'latencyMs': '0'}, None                
+        else:
+            precomputed = components.get("question_embeddings")
+            query_embedding = precomputed.get(question) if precomputed is not None else None
+            if query_embedding is not None:
+                query_metadata = {'inputTokens': '0', 'latencyMs': '0'}
             else:
                 logger.info("Generating embeddings for the question using provided embedder")
                 query_metadata, query_embedding = components["embed_processor"].embed_text(
                     question
                 )
-                
-            query_results=None
-            guardrail_input_assessment = None
-            guardrail_output_assessment = None
-            guardrail_context_assessment = None
-            guardrail_id = None
-            guardrail_blocked = None
-
-            answer_metadata = {}
-            answer = ""
-
-            # Retrieval query embed is not provided by knowledge base
-            retrieval_query_embed_tokens += int(query_metadata.get("inputTokens", 0) if query_embedding else 0)
-
-            #Apply Guardrails
-            if experimentalConfig.enable_guardrails:
-                logger.info("Applying guardrails")
-                guardrail_id = components['guardrails']['id']
-                guardrail_blocked = 'NONE'
-                query_results = None
-
-                # Apply INPUT guardrails
-                if experimentalConfig.enable_prompt_guardrails:
+            
+        query_results=None
+        guardrail_input_assessment = None
+        guardrail_output_assessment = None
+        guardrail_context_assessment = None
+        guardrail_id = None
+        guardrail_blocked = None
+
+        answer_metadata = {}
+        answer = ""
+
+        # Retrieval query embed is not provided by knowledge base
+        usage["retrieval_query_embed_tokens"] += int(query_metadata.get("inputTokens", 0) if query_embedding is not None else 0)
+
+        #Apply Guardrails
+        if experimentalConfig.enable_guardrails:
+            logger.info("Applying guardrails")
+            guardrail_id = components['guardrails']['id']
+            guardrail_blocked = 'NONE'
+            query_results = None
+
+            if experimentalConfig.enable_context_guardrails:
+                # Search for relevant context once, then check it in the same call as the question
+                if experimentalConfig.knowledge_base:
+                    query_results = _retrieve_context(components, experimentalConfig, question, query_embedding, idx, search_results)
+
+                if query_results:
+                    context = ' '.join(record['text'] for record in query_results)
+                    if experimentalConfig.enable_prompt_guardrails:
+                        guardrail_blocked, blocked_answer, guardrail_input_assessment, guardrail_context_assessment = check_input_and_context(
+                            components, guardrail_id, question, context
+                        )
+                    else:
+                        blocked, blocked_answer, guardrail_context_assessment = apply_guardrail_check(
+                            components,
+                            guardrail_id,
+                            content={'text': context},
+                            source='INPUT',
+                            log_prefix="Context"
+                        )
+                        guardrail_blocked = 'CONTEXT' if blocked else 'NONE'
+                    if guardrail_blocked != 'NONE':
+                        answer = blocked_answer
+                    if guardrail_blocked == 'INPUT':
+                        # A blocked question keeps no context, as when it was checked before the search
+                        query_results = None
+                elif experimentalConfig.enable_prompt_guardrails:
                     blocked, modified_question, guardrail_input_assessment = apply_guardrail_check(
                         components,
                         guardrail_id,
@@ -236,175 +480,311 @@ def process_questions(
                         answer = modified_question
                         guardrail_blocked = 'INPUT'
 
-                # Apply CONTEXT guardrails if not already blocked
-                if experimentalConfig.enable_context_guardrails and guardrail_blocked == 'NONE':
-                    if experimentalConfig.knowledge_base:
-                        # Search for relevant context once
-                        if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                        elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                            query_results = components["vector_database"].search(
-                                question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                            )
-
-                        if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                            query_results = __duplicate_removal_for_heirarchical_config(query_results)
-
-                        if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                            #Rerank the query results
-                            query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
-
-
-                    if query_results:
-                        context = ' '.join(record['text'] for record in query_results)
-                        blocked, modified_context, guardrail_context_assessment = apply_guardrail_check(
-                            components,
-                            guardrail_id,
-                            content={'text': context},
-                            source='INPUT',
-                            log_prefix="Context"
-                        )
-                        if blocked:
-                            answer = modified_context
-                            guardrail_blocked = 'CONTEXT'
-
-                # Generate and check answer if not blocked
-                if guardrail_blocked == 'NONE':
-                    # Fetch context if not already done
-                    if query_results is None:
-                        if experimentalConfig.knowledge_base:
-                            if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                            )
-                            elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                                query_results = components["vector_database"].search(
-                                    question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                                )
-                            if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                                query_results = __duplicate_removal_for_heirarchical_config(query_results)
-                            if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                                #Rerank the query results
-                                query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
-
-                   # Generate answer
-                    if experimentalConfig.knowledge_base:
-                        answer_metadata, answer = components["inference_processor"].generate_text(
-                        user_query=question,
-                        context=query_results,
-                        default_prompt=config.inference_system_prompt,
-                    )
-                    else:
-                        answer_metadata, answer = components["inference_processor"].generate_text(
-                            user_query=question,
-                            default_prompt=config.inference_system_prompt,
-                        )
-                    retrieval_input_tokens += int(answer_metadata["inputTokens"])
-                    retrieval_output_tokens += int(answer_metadata["outputTokens"])
-
-                    # Apply OUTPUT guardrails if enabled
-                    if experimentalConfig.enable_response_guardrails:
-                        blocked, modified_answer, guardrail_output_assessment = apply_guardrail_check(
-                            components,
-                            guardrail_id,
-                            content={'text': answer},
-                            source='OUTPUT',
-                            log_prefix="Answer"
-                        )
-                        if blocked:
-                            answer = modified_answer
-                            guardrail_blocked = 'OUTPUT'
-            else:
+            elif experimentalConfig.enable_prompt_guardrails:
+                # Retrieve speculatively while the question is checked; the context is dropped if it is blocked
+                speculative_retrieval = None
                 if experimentalConfig.knowledge_base:
-                    # Search for relevant context
-                    if isinstance(components["vector_database"], OpenSearchVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
-                        )
-                    elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
-                        query_results = components["vector_database"].search(
-                            question, experimentalConfig.kb_data, experimentalConfig.knn_num
-                        )
-
-                    if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
-                        query_results = __duplicate_removal_for_heirarchical_config(query_results)
-
-                    if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
-                        #Rerank the query results
-                        query_results = __rerank_query_result(query_results, question, experimentalConfig, idx)
+                    speculative_retrieval = components["speculation_executor"].submit(
+                        _retrieve_context, components, experimentalConfig, question, query_embedding, idx, search_results
+                    )
+                blocked, modified_question, guardrail_input_assessment = apply_guardrail_check(
+                    components,
+                    guardrail_id,
+                    content={'text': question},
+                    source='INPUT',
+                    log_prefix="Question"
+                )
+                if blocked:
+                    answer = modified_question
+                    guardrail_blocked = 'INPUT'
+                    if speculative_retrieval is not None:
+                        # A retrieval already running still completes; its context is dropped
+                        speculative_retrieval.cancel()
+                        query_results = None
+                elif speculative_retrieval is not None:
+                    query_results = speculative_retrieval.result()
+
+            # Generate and check answer if not blocked
+            if guardrail_blocked == 'NONE':
+                # Fetch context if not already done
+                if query_results is None:
+                    if experimentalConfig.knowledge_base:
+                        query_results = _retrieve_context(components, experimentalConfig, question, query_embedding, idx, search_results)
 
-                # Generate answer
+               # Generate answer
                 if experimentalConfig.knowledge_base:
                     answer_metadata, answer = components["inference_processor"].generate_text(
-                        user_query=question,
-                        context=query_results,
-                        default_prompt=config.inference_system_prompt,
-                    )
+                    user_query=question,
+                    context=query_results,
+                    default_prompt=config.inference_system_prompt,
+                )
                 else:
                     answer_metadata, answer = components["inference_processor"].generate_text(
                         user_query=question,
-                        default_prompt=config.inference_system_prompt
+                        default_prompt=config.inference_system_prompt,
                     )
-                retrieval_input_tokens += int(answer_metadata["inputTokens"])
-                retrieval_output_tokens += int(answer_metadata["outputTokens"])
+                _add_answer_usage(usage, answer_metadata)
 
-            reference_contexts = (
-                [record["text"] for record in query_results] if query_results else []
-            )
-
-            if experimentalConfig.enable_guardrails:
-                metrics = _create_metrics(
-                    experimental_config=experimentalConfig,
-                    question=question,
-                    answer=answer,
-                    gt_answer=item['answer'],
-                    reference_contexts=reference_contexts,
-                    guardrail_input_assessment=guardrail_input_assessment,
-                    guardrail_context_assessment=guardrail_context_assessment,
-                    guardrail_output_assessment=guardrail_output_assessment,
-                    guardrail_id=guardrail_id,
-                    guardrail_blocked=guardrail_blocked,
-                    query_metadata=query_metadata,
-                    answer_metadata=answer_metadata,
+                # Apply OUTPUT guardrails if enabled
+                if experimentalConfig.enable_response_guardrails:
+                    blocked, modified_answer, guardrail_output_assessment = apply_guardrail_check(
+                        components,
+                        guardrail_id,
+                        content={'text': answer},
+                        source='OUTPUT',
+                        log_prefix="Answer"
+                    )
+                    if blocked:
+                        answer = modified_answer
+                        guardrail_blocked = 'OUTPUT'
+        else:
+            if experimentalConfig.knowledge_base:
+                # Search for relevant context
+                query_results = _retrieve_context(components, experimentalConfig, question, query_embedding, idx, search_results)
+
+            # Generate answer
+            if experimentalConfig.knowledge_base:
+                answer_metadata, answer = components["inference_processor"].generate_text(
+                    user_query=question,
+                    context=query_results,
+                    default_prompt=config.inference_system_prompt,
                 )
             else:
-                #  Update the metrics here to store the DynamoDb Table
-                metrics = _create_metrics(
-                    experimental_config=experimentalConfig,
-                    question=question,
-                    answer=answer,
-                    gt_answer=item["answer"],
-                    reference_contexts=reference_contexts,
-                    query_metadata=query_metadata,
-                    answer_metadata=answer_metadata,
+                answer_metadata, answer = components["inference_processor"].generate_text(
+                    user_query=question,
+                    default_prompt=config.inference_system_prompt
                 )
+            _add_answer_usage(usage, answer_metadata)
 
-            batch_items.append(metrics.to_dynamo_item())
-        except Exception as e:
-            logger.error(f"Error processing question {idx+1}: {str(e)}")
-            metrics = metrics = _create_metrics(
+        reference_contexts = (
+            [record["text"] for record in query_results] if query_results else []
+        )
+
+        if experimentalConfig.enable_guardrails:
+            metrics = _create_metrics(
                 experimental_config=experimentalConfig,
+                metric_id=metric_id,
                 question=question,
-                answer="",
+                answer=answer,
+                gt_answer=item['answer'],
+                reference_contexts=reference_contexts,
+                guardrail_input_assessment=guardrail_input_assessment,
+                guardrail_context_assessment=guardrail_context_assessment,
+                guardrail_output_assessment=guardrail_output_assessment,
+                guardrail_id=guardrail_id,
+                guardrail_blocked=guardrail_blocked,
+                query_metadata=query_metadata,
+                answer_metadata=answer_metadata,
+            )
+        else:
+            #  Update the metrics here to store the DynamoDb Table
+            metrics = _create_metrics(
+                experimental_config=experimentalConfig,
+                metric_id=metric_id,
+                question=question,
+                answer=answer,
                 gt_answer=item["answer"],
-                reference_contexts=[],
-                query_metadata={},
-                answer_metadata={},
+                reference_contexts=reference_contexts,
+                query_metadata=query_metadata,
+                answer_metadata=answer_metadata,
             )
-            batch_items.append(metrics.to_dynamo_item())
-    
-        # Write batch if size reaches threshold
-        if len(batch_items) >= 25:
-            write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
-            batch_items = []
-
-    # Write remaining items
-    if batch_items:
-        write_batch_to_dynamodb(batch_items, components["metrics_dynamodb"])
-    logger.info(f"Experiment {experimentalConfig.experiment_id} Retrieval Tokens : \n Query Embed Tokens : {retrieval_query_embed_tokens} \n Input Tokens : {retrieval_input_tokens} \n Output Tokens : {retrieval_output_tokens}")
-    return (retrieval_query_embed_tokens, retrieval_input_tokens, retrieval_output_tokens)
+
+        return metrics.to_dynamo_item(), usage, True
+    except Exception as e:
+        logger.error(f"Error processing question {idx+1}: {str(e)}")
+        metrics = _create_metrics(
+            experimental_config=experimentalConfig,
+            metric_id=question_id(experimentalConfig.experiment_id, idx, item["question"]),
+            question=item["question"],
+            answer="",
+            gt_answer=item["answer"],
+            reference_contexts=[],
+            query_metadata={},
+            answer_metadata={},
+        )
+        return metrics.to_dynamo_item(), usage, False
+
+def prefetch_retrievals(
+    gt_data: List[Dict],
+    components: Dict[str, Any],
+    experimentalConfig: ExperimentalConfig,
+) -> Optional[List[Tuple[Dict[str, Any], Any, List[Dict[str, Any]]]]]:
+    """
+    Search results of every question, read from the retrieval store when another
+    experiment of the execution already searched them, and otherwise searched with
+    `search_many` in a handful of requests for the whole ground truth set.
+
+    Questions missing from the store are searched at the largest knn_num of the
+    experiments sharing the index and added to the store; each experiment uses the first
+    knn_num results of a question. Questions read from the store are not embedded.
+
+    Returns (query metadata, query embedding, search results) per question, or None when
+    there is no knowledge base or the batch fails, in which case each question is embedded
+    and searched on its own.
+    """
+    if not experimentalConfig.knowledge_base:
+        return None
+    questions = [item["question"] for item in gt_data]
+    k = experimentalConfig.knn_num
+    store = components.get("retrieval_store")
+    if store is None:
+        return _search_questions(questions, components, experimentalConfig, k)
+
+    target_id = _retrieval_target_id(experimentalConfig)
+    try:
+        entry = store.load(target_id)
+    except Exception as e:
+        logger.warning(f"Could not read the retrieval store of {target_id}, searching every question: {e}")
+        entry = None
+    if entry is not None and entry["k"] >= k:
+        store_k, stored = entry["k"], entry["results"]
+    else:
+        store_k, stored = max(k, _execution_search_k(components, experimentalConfig)), {}
+
+    keys = [RetrievalStore.question_key(question) for question in questions]
+    missing = [idx for idx, key in enumerate(keys) if key not in stored]
+    searched = _search_questions([questions[idx] for idx in missing], components, experimentalConfig, store_k) if missing else []
+    if searched is None:
+        return None
+
+    prefetched = [None] * len(questions)
+    for idx, (metadata, embedding, results) in zip(missing, searched):
+        stored[keys[idx]] = results
+        prefetched[idx] = (metadata, embedding, results[:k])
+    for idx, key in enumerate(keys):
+        if prefetched[idx] is None:
+            prefetched[idx] = ({'inputTokens': '0', 'latencyMs': '0'}, None, stored[key][:k])
+    logger.info(f"{len(questions) - len(missing)} of {len(questions)} questions read from the retrieval store of {target_id}")
+
+    if missing:
+        try:
+            store.save(target_id, store_k, stored)
+        except Exception as e:
+            logger.warning(f"Could not save the retrieval store of {target_id}: {e}")
+    return prefetched
+
+def _search_questions(
+    questions: List[str],
+    components: Dict[str, Any],
+    experimentalConfig: ExperimentalConfig,
+    k: int,
+) -> Optional[List[Tuple[Dict[str, Any], Any, List[Dict[str, Any]]]]]:
+    """Embed and search questions in batches; None when the batch fails."""
+    vector_database = components["vector_database"]
+    try:
+        if experimentalConfig.bedrock_knowledge_base:
+            embeddings = [({'inputTokens': '0', 'latencyMs': '0'}, None) for _ in questions]
+            results = vector_database.search_many(experimentalConfig.kb_data, questions, k)
+        else:
+            embeddings = _embed_questions(questions, components)
+            results = vector_database.search_many(
+                experimentalConfig.index_id, [embedding for _, embedding in embeddings], k
+            )
+    except Exception as e:
+        logger.warning(f"Batch retrieval failed, searching question by question: {e}")
+        return None
+    return [(metadata, embedding, question_results) for (metadata, embedding), question_results in zip(embeddings, results)]
+
+def _embed_questions(questions: List[str], components: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Any]]:
+    """(metadata, embedding) of each question, from the precomputed question embeddings when they hold it."""
+    precomputed = components.get("question_embeddings")
+    embeddings = [None] * len(questions)
+    if precomputed is not None:
+        for idx, question in enumerate(questions):
+            vector = precomputed.get(question)
+            if vector is not None:
+                embeddings[idx] = ({'inputTokens': '0', 'latencyMs': '0'}, vector)
+    missing = [idx for idx, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        embedded = components["embed_processor"].embed([questions[idx] for idx in missing])
+        for idx, (embedding, _, metadata) in zip(missing, embedded):
+            embeddings[idx] = (metadata, embedding)
+    return embeddings
+
+def load_question_embeddings(
+    gt_data: List[Dict],
+    components: Dict[str, Any],
+    experimentalConfig: ExperimentalConfig,
+) -> Tuple[Optional[QuestionEmbeddings], int]:
+    """
+    Embeddings of the ground truth questions, stored once per (ground truth ETag,
+    embedding model, dimension) by the first retrieval task that needs them and
+    memory-mapped by the others, and the input tokens spent embedding them here.
+
+    Returns (None, 0) when there is nothing to embed with or the store cannot be used, in
+    which case questions are embedded when searched.
+    """
+    store = components.get("question_embedding_store")
+    if store is None or not gt_data:
+        return None, 0
+    try:
+        bucket, key = S3Util().parse_s3_path(experimentalConfig.gt_data)
+        gt_etag = boto3.client('s3').head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+        store_id = store.store_id(gt_etag, {
+            "service": experimentalConfig.embedding_service,
+            "model": experimentalConfig.embedding_model,
+            "dimension": experimentalConfig.vector_dimension,
+        })
+        embeddings = store.load(store_id)
+        if embeddings is not None:
+            return embeddings, 0
+    except Exception as e:
+        logger.warning(f"Could not read the stored question embeddings, embedding questions when searched: {e}")
+        return None, 0
+
+    questions = list(dict.fromkeys(item["question"] for item in gt_data))
+    try:
+        vectors, metadata = components["embed_processor"].embed_matrix(questions)
+    except Exception as e:
+        logger.warning(f"Could not embed the questions in batches, embedding them when searched: {e}")
+        return None, 0
+    tokens = sum(int(meta.get("inputTokens", 0) or 0) for meta in metadata)
+    try:
+        return store.save(store_id, questions, vectors), tokens
+    except Exception as e:
+        logger.warning(f"Could not store the question embeddings: {e}")
+        rows = {QuestionEmbeddings.question_key(question): row for row, question in enumerate(questions)}
+        return QuestionEmbeddings(rows, vectors), tokens
+
+def _retrieval_target_id(experimentalConfig: ExperimentalConfig) -> str:
+    """What the experiment searches: its index, or its knowledge base within the execution."""
+    if experimentalConfig.bedrock_knowledge_base:
+        return f"{experimentalConfig.index_id}_{experimentalConfig.kb_data}"
+    return experimentalConfig.index_id
+
+def _execution_search_k(components: Dict[str, Any], experimentalConfig: ExperimentalConfig) -> int:
+    """The largest knn_num of the experiments of the execution searching the same index."""
+    try:
+        experiments = components["experiment_dynamodb"].scan_all(
+            filter_expression="#execution_id = :execution_id AND #index_id = :index_id",
+            expression_values={":execution_id": experimentalConfig.execution_id, ":index_id": experimentalConfig.index_id},
+            expression_attribute_names={"#execution_id": "execution_id", "#index_id": "index_id"},
+        )
+        return max([int(item.get("config", {}).get("knn_num", 0)) for item in experiments.get("Items", [])] + [experimentalConfig.knn_num])
+    except Exception as e:
+        logger.warning(f"Could not read the knn_num of the other experiments of {experimentalConfig.execution_id}: {e}")
+        return experimentalConfig.knn_num
+
+def _retrieve_context(components, experimentalConfig, question, query_embedding, idx, search_results=None):
+    """Search results of a question (searched here unless prefetched), deduplicated and reranked as configured."""
+    query_results = search_results
+    if query_results is None:
+        if isinstance(components["vector_database"], OpenSearchVectorDatabase):
+            query_results = components["vector_database"].search(
+                experimentalConfig.index_id, query_embedding, experimentalConfig.knn_num
+            )
+        elif isinstance(components["vector_database"], KnowledgeBaseVectorDatabase):
+            query_results = components["vector_database"].search(
+                question, experimentalConfig.kb_data, experimentalConfig.knn_num
+            )
+
+    if experimentalConfig.chunking_strategy.lower() == 'hierarchical':
+        query_results = __duplicate_removal_for_heirarchical_config(query_results)
+
+    if experimentalConfig.rerank_model_id and experimentalConfig.rerank_model_id.lower() != 'none':
+        #Rerank the query results
+        query_results = __rerank_query_result(components, query_results, question, experimentalConfig, idx)
+    return query_results
 
 def __duplicate_removal_for_heirarchical_config(query_results):
     overall_documents = []
@@ -419,17 +799,17 @@ def __duplicate_removal_for_heirarchical_config(query_results):
 
     return overall_documents
 
-def __rerank_query_result(query_results, question, experimentalConfig, index):
+def __rerank_query_result(components, query_results, question, experimentalConfig, index):
     logger.info(f"Into reranking for experiment {experimentalConfig.experiment_id} for question {index+1}")
     start_time = time.time()
-    reranker = DocumentReranker(region=experimentalConfig.aws_region, rerank_model_id=experimentalConfig.rerank_model_id)  
-    result = reranker.rerank_documents(question, query_results)
+    result = components["reranker"].rerank(question, query_results, components["rerank_stats"])
     end_time = time.time()
     logger.info(f"Reranking for question {index+1} took {end_time - start_time:.2f} seconds") 
     return result
 
 def _create_metrics(
     experimental_config: ExperimentalConfig,
+    metric_id: str,
     question: str,
     answer: str,
     gt_answer: str,
@@ -444,6 +824,7 @@ def _create_metrics(
 ) -> "ExperimentQuestionMetrics":
     """Create metrics object with provided data."""
     return ExperimentQuestionMetrics(
+        id=metric_id,
         execution_id=experimental_config.execution_id,
         experiment_id=experimental_config.experiment_id,
         question=question,
@@ -459,11 +840,6 @@ def _create_metrics(
         guardrail_blocked=guardrail_blocked
     )
 
-def write_batch_to_dynamodb(batch_items: List[Dict], dynamodb: DynamoDBOperations) -> None:
-    """Write a batch of items to DynamoDB."""
-    logger.info(f"Writing batch of {len(batch_items)} items to DynamoDB")
-    dynamodb.batch_write(batch_items)
-    
 class RetrievalError(Exception):
     """Custom exception for retrieval process errors."""
     pass
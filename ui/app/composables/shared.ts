@@ -257,6 +257,14 @@ export const useProjectCreateMeta = () => {
           label: "HNSW - SQ",
           value: "hnsw_sq"
         },
+        {
+          label: "HNSW - INT8",
+          value: "hnsw_int8"
+        },
+        {
+          label: "HNSW - Binary",
+          value: "hnsw_binary"
+        },
       ],
     },
     retrievalStrategy: {
@@ -892,6 +900,10 @@ export const useHumanIndexingAlgorithm = (algorithm: string) => {
       return "HNSW - SQ";
     case "hnsw_bq":
       return "HNSW - BQ";
+    case "hnsw_int8":
+      return "HNSW - INT8";
+    case "hnsw_binary":
+      return "HNSW - Binary";
   }
 };
 
@@ -0,0 +1,81 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+import gzip
+import hashlib
+import json
+import logging
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class KBArtifactCache:
+    """
+    S3 cache of knowledge base artifacts that are identical across experiments.
+
+    - Extracted text, one gzip sidecar per source file, keyed by the file's S3 ETag and
+      the extractor that produced it.
+    - Chunk lists, keyed by a hash of the KB manifest (key, ETag pairs) and the chunking
+      parameters, stored as the chunkers' (start, end) spans into each file's word buffer.
+    """
+
+    CHUNK_ARTIFACT_VERSION = 2
+
+    def __init__(self, bucket: str, prefix: str, extractor: str = 'pymupdf') -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.extractor = extractor
+        self.s3_client = boto3.client('s3')
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+            return gzip.decompress(response['Body'].read())
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return None
+            raise
+
+    def _put(self, key: str, data: bytes) -> None:
+        self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=gzip.compress(data), ContentEncoding='gzip')
+
+    def _text_key(self, etag: str) -> str:
+        return f"{self.prefix}/text/{self.extractor}/{etag}.txt.gz"
+
+    def has_text(self, etag: str) -> bool:
+        try:
+            self.s3_client.head_object(Bucket=self.bucket, Key=self._text_key(etag))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def get_text(self, etag: str) -> Optional[str]:
+        data = self._get(self._text_key(etag))
+        return data.decode('utf-8') if data is not None else None
+
+    def put_text(self, etag: str, text: str) -> None:
+        self._put(self._text_key(etag), text.encode('utf-8'))
+
+    def chunk_artifact_id(self, manifest: Sequence[Tuple[str, str]], chunk_params: Dict[str, Any]) -> str:
+        """Hash of the KB manifest, the extractor and the chunking parameters."""
+        content = json.dumps({
+            'version': self.CHUNK_ARTIFACT_VERSION,
+            'extractor': self.extractor,
+            'manifest': [list(entry) for entry in manifest],
+            'params': chunk_params
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _chunk_key(self, artifact_id: str) -> str:
+        return f"{self.prefix}/chunks/{artifact_id}.json.gz"
+
+    def get_chunks(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        data = self._get(self._chunk_key(artifact_id))
+        return json.loads(data) if data is not None else None
+
+    def put_chunks(self, artifact_id: str, artifact: Dict[str, Any]) -> None:
+        self._put(self._chunk_key(artifact_id), json.dumps(artifact, separators=(',', ':')).encode('utf-8'))
+        logger.info(f"Stored chunk artifact s3://{self.bucket}/{self._chunk_key(artifact_id)}")
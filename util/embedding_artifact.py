@@ -0,0 +1,270 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+
+import boto3
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# A chunk as produced by the chunkers: the text, or (parent_id, parent_chunk, child_chunk)
+Chunk = Union[str, Tuple[str, str, str]]
+# One embedded batch: chunks, their vectors (a float32 matrix, one row per chunk) and the embedding metadata of each
+EmbeddedBatch = Tuple[List[Chunk], np.ndarray, List[Dict[str, Any]]]
+
+FIXED_SCHEMA = pa.schema([("text", pa.string())])
+HIERARCHICAL_SCHEMA = pa.schema([("parent_id", pa.string()), ("parent_text", pa.string()), ("child_text", pa.string())])
+
+def _is_missing(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+def _is_precondition_failed(error: ClientError) -> bool:
+    return error.response.get('Error', {}).get('Code') in ('412', 'PreconditionFailed', 'ConditionalRequestConflict')
+
+
+class EmbeddingArtifactWriter:
+    """
+    Spool embedded batches to local files while they stream through indexing.
+
+    Vectors are appended as raw float32 rows and turned into a `.npy` matrix once the row
+    count is known; chunks go to a Parquet file one row group per batch.
+    """
+
+    def __init__(self, scratch_dir: str, dimension: int, hierarchical: bool) -> None:
+        self.scratch_dir = scratch_dir
+        self.dimension = dimension
+        self.hierarchical = hierarchical
+        self.rows = 0
+        self.input_tokens = 0
+        self._raw_path = os.path.join(scratch_dir, "vectors.f32")
+        self._raw_file = open(self._raw_path, "wb")
+        self.chunks_path = os.path.join(scratch_dir, "chunks.parquet")
+        self._chunks_writer = pq.ParquetWriter(self.chunks_path, HIERARCHICAL_SCHEMA if hierarchical else FIXED_SCHEMA)
+
+    def write(self, chunks: Sequence[Chunk], vectors: Sequence[Sequence[float]], metadata: Sequence[Dict[str, Any]]) -> None:
+        matrix = np.asarray(vectors, dtype="<f4")
+        if matrix.shape != (len(chunks), self.dimension):
+            raise ValueError(f"Expected {len(chunks)} vectors of dimension {self.dimension}, got {matrix.shape}")
+        self._raw_file.write(matrix.tobytes())
+        if self.hierarchical:
+            parent_ids, parents, children = zip(*chunks)
+            table = pa.table({"parent_id": parent_ids, "parent_text": parents, "child_text": children}, schema=HIERARCHICAL_SCHEMA)
+        else:
+            table = pa.table({"text": list(chunks)}, schema=FIXED_SCHEMA)
+        self._chunks_writer.write_table(table)
+        self.rows += len(chunks)
+        self.input_tokens += sum(int(meta.get('inputTokens', 0) or 0) for meta in metadata)
+
+    def finish(self) -> str:
+        """Close the spool files and return the path of the `.npy` vector matrix."""
+        self._raw_file.close()
+        self._chunks_writer.close()
+        vectors_path = os.path.join(self.scratch_dir, "vectors.npy")
+        if not self.rows:
+            np.save(vectors_path, np.zeros((0, self.dimension), dtype="<f4"))
+            os.remove(self._raw_path)
+            return vectors_path
+        matrix = np.lib.format.open_memmap(vectors_path, mode="w+", dtype="<f4", shape=(self.rows, self.dimension))
+        raw = np.memmap(self._raw_path, dtype="<f4", mode="r", shape=(self.rows, self.dimension))
+        step = max(1, (64 * 1024 * 1024) // (4 * max(self.dimension, 1)))
+        for start in range(0, self.rows, step):
+            matrix[start:start + step] = raw[start:start + step]
+        matrix.flush()
+        del matrix, raw
+        os.remove(self._raw_path)
+        return vectors_path
+
+    def close(self) -> None:
+        if not self._raw_file.closed:
+            self._raw_file.close()
+        if self._chunks_writer.is_open:
+            self._chunks_writer.close()
+
+
+class EmbeddingArtifactStore:
+    """
+    S3 store of embedded knowledge bases, shared by experiments that only differ by indexing algorithm.
+
+    An artifact is the float32 vector matrix (`vectors.npy`) and the chunks (`chunks.parquet`)
+    of one (KB manifest, extractor, chunking, embedding model, dimension) combination; a
+    `manifest.json` written last marks it complete. The experiment that first needs an
+    artifact takes a lease on it (an S3 object created with If-None-Match, renewed while
+    embedding); the others wait for the artifact instead of embedding the same corpus, and
+    take the lease over if it expires.
+    """
+
+    ARTIFACT_VERSION = 1
+
+    def __init__(self, bucket: str, prefix: str, lease_seconds: int = 1800, poll_seconds: int = 15) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.s3_client = boto3.client('s3')
+        self._lease_etags: Dict[str, str] = {}
+
+    def artifact_id(self, chunk_artifact_id: str, embedding_params: Dict[str, Any]) -> str:
+        """Hash of the chunk artifact (KB manifest, extractor, chunking) and the embedding parameters."""
+        content = json.dumps({'version': self.ARTIFACT_VERSION, 'chunks': chunk_artifact_id, 'embedding': embedding_params},
+                             sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _key(self, artifact_id: str, name: str) -> str:
+        return f"{self.prefix}/{artifact_id}/{name}"
+
+    def get_manifest(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """The manifest of a complete artifact, None while it does not exist."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(artifact_id, "manifest.json"))
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if _is_missing(e):
+                return None
+            raise
+
+    def _lease_body(self) -> bytes:
+        return json.dumps({'owner': self.owner, 'expires': time.time() + self.lease_seconds}).encode('utf-8')
+
+    def try_acquire(self, artifact_id: str) -> bool:
+        """Take the artifact's lease, or an expired one over; False while someone else holds it."""
+        key = self._key(artifact_id, "lease.json")
+        try:
+            response = self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=self._lease_body(), IfNoneMatch='*')
+            self._lease_etags[artifact_id] = response['ETag']
+            return True
+        except ClientError as e:
+            if not _is_precondition_failed(e):
+                raise
+        try:
+            current = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+            lease = json.loads(current['Body'].read())
+        except ClientError as e:
+            # Released in the meantime; the next attempt may take it
+            if _is_missing(e):
+                return False
+            raise
+        if lease.get('expires', 0) > time.time():
+            return False
+        try:
+            # Only replaces the expired lease if nobody else took it over first
+            response = self.s3_client.put_object(Bucket=self.bucket, Key=key, Body=self._lease_body(), IfMatch=current['ETag'])
+            self._lease_etags[artifact_id] = response['ETag']
+            logger.warning(f"Took over the expired lease of embedding artifact {artifact_id} from {lease.get('owner')}")
+            return True
+        except ClientError as e:
+            if _is_precondition_failed(e) or _is_missing(e):
+                return False
+            raise
+
+    def renew(self, artifact_id: str) -> None:
+        etag = self._lease_etags.get(artifact_id)
+        if etag is None:
+            return
+        try:
+            response = self.s3_client.put_object(Bucket=self.bucket, Key=self._key(artifact_id, "lease.json"),
+                                                 Body=self._lease_body(), IfMatch=etag)
+            self._lease_etags[artifact_id] = response['ETag']
+        except ClientError as e:
+            if not (_is_precondition_failed(e) or _is_missing(e)):
+                raise
+            # Someone took the lease over; finishing is still correct, just no longer exclusive
+            logger.warning(f"Lost the lease of embedding artifact {artifact_id}")
+            self._lease_etags.pop(artifact_id, None)
+
+    def release(self, artifact_id: str) -> None:
+        etag = self._lease_etags.pop(artifact_id, None)
+        if etag is None:
+            return
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket, Key=self._key(artifact_id, "lease.json"), IfMatch=etag)
+        except ClientError as e:
+            if not (_is_precondition_failed(e) or _is_missing(e)):
+                logger.warning(f"Failed to release the lease of embedding artifact {artifact_id}: {e}")
+
+    def wait(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Wait while another experiment holds the lease.
+
+        Returns the manifest once the artifact is complete, or None when the lease is
+        released or expires without it (the caller should then try to acquire it).
+        """
+        key = self._key(artifact_id, "lease.json")
+        logger.info(f"Waiting for embedding artifact {artifact_id}, being built by another experiment")
+        while True:
+            manifest = self.get_manifest(artifact_id)
+            if manifest is not None:
+                return manifest
+            try:
+                lease = json.loads(self.s3_client.get_object(Bucket=self.bucket, Key=key)['Body'].read())
+            except ClientError as e:
+                if _is_missing(e):
+                    return self.get_manifest(artifact_id)
+                raise
+            if lease.get('expires', 0) <= time.time():
+                return None
+            time.sleep(self.poll_seconds)
+
+    def tee(self, artifact_id: str, batches: Iterable[EmbeddedBatch], writer: EmbeddingArtifactWriter) -> Iterator[EmbeddedBatch]:
+        """Pass embedded batches through, spooling them to `writer` and renewing the lease as they go."""
+        renewed = time.monotonic()
+        for batch in batches:
+            writer.write(*batch)
+            if time.monotonic() - renewed > self.lease_seconds / 4:
+                self.renew(artifact_id)
+                renewed = time.monotonic()
+            yield batch
+
+    def publish(self, artifact_id: str, writer: EmbeddingArtifactWriter, metadata: Dict[str, Any]) -> None:
+        """Upload a finished artifact; the manifest goes last so readers never see a partial one."""
+        vectors_path = writer.finish()
+        transfer = TransferConfig(multipart_chunksize=16 * 1024 * 1024, max_concurrency=8)
+        self.s3_client.upload_file(vectors_path, self.bucket, self._key(artifact_id, "vectors.npy"), Config=transfer)
+        self.s3_client.upload_file(writer.chunks_path, self.bucket, self._key(artifact_id, "chunks.parquet"), Config=transfer)
+        manifest = {'version': self.ARTIFACT_VERSION, 'rows': writer.rows, 'dimension': writer.dimension,
+                    'hierarchical': writer.hierarchical, 'input_tokens': writer.input_tokens, **metadata}
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(artifact_id, "manifest.json"),
+                                  Body=json.dumps(manifest).encode('utf-8'))
+        logger.info(f"Published embedding artifact s3://{self.bucket}/{self._key(artifact_id, '')} ({writer.rows} chunks)")
+
+    def iter_batches(self, artifact_id: str, manifest: Dict[str, Any], scratch_dir: str,
+                     batch_rows: int) -> Iterator[EmbeddedBatch]:
+        """
+        Download a complete artifact and yield it in batches of `batch_rows` chunks.
+
+        Vectors are memory-mapped, so only one batch is in memory at a time. The metadata
+        of every chunk reports no input tokens: nothing is embedded again.
+        """
+        transfer = TransferConfig(multipart_chunksize=16 * 1024 * 1024, max_concurrency=8)
+        vectors_path = os.path.join(scratch_dir, "vectors.npy")
+        chunks_path = os.path.join(scratch_dir, "chunks.parquet")
+        self.s3_client.download_file(self.bucket, self._key(artifact_id, "vectors.npy"), vectors_path, Config=transfer)
+        self.s3_client.download_file(self.bucket, self._key(artifact_id, "chunks.parquet"), chunks_path, Config=transfer)
+
+        if not manifest['rows']:
+            return
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if vectors.shape != (manifest['rows'], manifest['dimension']):
+            raise ValueError(f"Embedding artifact {artifact_id} holds {vectors.shape} vectors, "
+                             f"its manifest {(manifest['rows'], manifest['dimension'])}")
+        start = 0
+        for record_batch in pq.ParquetFile(chunks_path).iter_batches(batch_size=batch_rows):
+            columns = record_batch.to_pydict()
+            if manifest['hierarchical']:
+                chunks = list(zip(columns['parent_id'], columns['parent_text'], columns['child_text']))
+            else:
+                chunks = columns['text']
+            end = start + len(chunks)
+            yield chunks, np.array(vectors[start:end], dtype=np.float32), [{'inputTokens': 0, 'latencyMs': '0'} for _ in chunks]
+            start = end
+        logger.info(f"Loaded {start} chunks from embedding artifact {artifact_id}")
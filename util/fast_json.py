@@ -0,0 +1,39 @@
+from typing import Any, Union
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NumPy arrays are written straight from their buffer; non-string keys are accepted like json does
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+def _default(value: Any) -> Any:
+    """Serialize what neither encoder handles natively: NumPy values (non-contiguous arrays with orjson)."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """
+    Compact UTF-8 JSON of `value`, with orjson when installed and the standard library otherwise.
+
+    NumPy arrays and scalars are accepted by both; with orjson, a float32 vector is written
+    from its buffer, as the shortest decimal that round-trips to the same float32.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,233 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import gzip
+import json
+import logging
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Namespace of the deterministic chunk ids, so that a manifest entry only needs a range to name its chunks
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1f4a38-2c3e-4d0e-9a8b-5b7f0c1d2e3f")
+
+def chunk_id(index_id: str, run_id: str, ordinal: int) -> str:
+    """Id of the `ordinal`-th chunk indexed into `index_id` by indexing run `run_id`."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{index_id}/{run_id}/{ordinal}"))
+
+def parent_id(index_id: str, run_id: str, ordinal: int) -> str:
+    """Id of the `ordinal`-th hierarchical parent indexed into `index_id` by indexing run `run_id`."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{index_id}/{run_id}/parent/{ordinal}"))
+
+
+class ManifestRecorder:
+    """
+    Collects, during one indexing run, which chunks and parents each KB file produced.
+
+    The chunk producer reports each file with its chunk count before yielding its chunks,
+    and the document builder draws chunk and parent ids in stream order, so both sides only
+    keep per-file and per-parent records.
+
+    For checkpointing, the document builder marks each batch of documents it emits and the
+    bulk loader acknowledges how many leading documents are indexed, which tells the files
+    whose chunks are all in the index. With `on_reserve`, ids are drawn from reserved blocks
+    and `on_reserve` must persist each new reservation (see `pending`) before returning, so
+    a resumed run knows every id the interrupted one may have written. `on_checkpoint` is
+    called at most every `checkpoint_seconds` as documents are acknowledged, followed by the
+    `checkpoint_hooks`, and the run stops emitting documents once `deadline` (a
+    `time.monotonic()` value) has passed.
+    """
+
+    def __init__(self, index_id: str, run_id: Optional[str] = None,
+                 on_reserve: Optional[Callable[[], None]] = None, reserve_block: int = 10000,
+                 on_checkpoint: Optional[Callable[[], None]] = None, checkpoint_seconds: float = 300,
+                 deadline: Optional[float] = None) -> None:
+        self.index_id = index_id
+        self.run_id = run_id or uuid.uuid4().hex
+        # (key, etag, chunk count) per file, in stream order
+        self.files: List[Tuple[str, str, int]] = []
+        # (ordinal of its first child, parent id) per hierarchical parent, in stream order
+        self.parents: List[Tuple[int, str]] = []
+        self._next_ordinal = 0
+
+        self.on_reserve = on_reserve
+        self.reserve_block = reserve_block
+        self.reserved = (0, 0)
+        self.on_checkpoint = on_checkpoint
+        self.checkpoint_hooks: List[Callable[[], None]] = []
+        self.checkpoint_seconds = checkpoint_seconds
+        self._last_checkpoint = time.monotonic()
+        self.deadline = deadline
+        self.stopped = False
+        # (documents emitted, chunks drawn, parents drawn) after each emitted batch
+        self._marks: Deque[Tuple[int, int, int]] = deque()
+        self._documents = 0
+        # Chunks and parents whose documents are all indexed
+        self.acknowledged = (0, 0)
+        # Reservations and checkpoints are persisted while the lock is held, so they are
+        # saved one at a time and each one from a consistent state
+        self._lock = threading.RLock()
+
+    def add_file(self, key: str, etag: str, chunk_count: int) -> None:
+        with self._lock:
+            self.files.append((key, etag, chunk_count))
+
+    def _reserve(self) -> None:
+        """Extend the reservation of chunk or parent ids once the ids drawn exceed it."""
+        if self.on_reserve is None:
+            return
+        chunks, parents = self.reserved
+        if self._next_ordinal > chunks:
+            chunks = self._next_ordinal + self.reserve_block
+        if len(self.parents) > parents:
+            parents = len(self.parents) + self.reserve_block
+        if (chunks, parents) != self.reserved:
+            self.reserved = (chunks, parents)
+            self.on_reserve()
+
+    def next_chunk_id(self) -> str:
+        with self._lock:
+            ordinal = self._next_ordinal
+            self._next_ordinal += 1
+            self._reserve()
+        return chunk_id(self.index_id, self.run_id, ordinal)
+
+    def next_parent_id(self) -> str:
+        """Id of a new parent, first referenced by the chunk whose id was drawn last."""
+        with self._lock:
+            new_id = parent_id(self.index_id, self.run_id, len(self.parents))
+            self.parents.append((self._next_ordinal - 1, new_id))
+            self._reserve()
+        return new_id
+
+    def past_deadline(self) -> bool:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.stopped = True
+        return self.stopped
+
+    def mark_documents(self, count: int) -> None:
+        """Record that a batch of `count` documents was emitted, covering every id drawn so far."""
+        with self._lock:
+            self._documents += count
+            self._marks.append((self._documents, self._next_ordinal, len(self.parents)))
+
+    def acknowledge(self, documents: int) -> None:
+        """Record that the first `documents` emitted documents are indexed."""
+        with self._lock:
+            while self._marks and self._marks[0][0] <= documents:
+                _, chunks, parents = self._marks.popleft()
+                self.acknowledged = (chunks, parents)
+            due = self.on_checkpoint is not None and time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+            if due:
+                self._last_checkpoint = time.monotonic()
+                self.on_checkpoint()
+        if due:
+            for hook in self.checkpoint_hooks:
+                hook()
+
+    def entries(self, complete: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Manifest entries of the files recorded in this run; with `complete` False, of the
+        files whose chunks are all acknowledged so far.
+        """
+        with self._lock:
+            entries, first, parent = {}, 0, 0
+            limit = self._next_ordinal if complete else self.acknowledged[0]
+            for key, etag, count in self.files:
+                if not complete and first + count > limit:
+                    break
+                parent_ids = []
+                while parent < len(self.parents) and self.parents[parent][0] < first + count:
+                    parent_ids.append(self.parents[parent][1])
+                    parent += 1
+                entries[key] = {"etag": etag, "run": self.run_id, "first": first, "count": count, "parent_ids": parent_ids}
+                first += count
+            if complete and first != self._next_ordinal:
+                raise ValueError(f"Recorded {first} chunks for {len(self.files)} files but indexed {self._next_ordinal}")
+            return entries
+
+    def pending(self) -> Dict[str, Any]:
+        """
+        Range of the chunk and parent ids of this run that may be in the index without their
+        file being complete (see `entries`): those drawn or reserved after the complete files'.
+        """
+        with self._lock:
+            complete = self.entries(complete=False)
+            first = sum(entry["count"] for entry in complete.values())
+            parent_first = sum(len(entry["parent_ids"]) for entry in complete.values())
+            return {"run": self.run_id, "first": first, "count": max(self._next_ordinal, self.reserved[0]) - first,
+                    "parent_first": parent_first, "parent_count": max(len(self.parents), self.reserved[1]) - parent_first}
+
+
+class IndexManifestStore:
+    """
+    S3 store of one manifest per index: the KB files it holds, by S3 key and ETag, and the
+    chunk and parent ids each file was indexed under.
+
+    Entries name their chunks as a range of deterministic ids (see `chunk_id`) rather than
+    listing them, so manifests stay small for large knowledge bases.
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, bucket: str, prefix: str) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.s3_client = boto3.client('s3')
+
+    def _key(self, index_id: str) -> str:
+        return f"{self.prefix}/{index_id}.json.gz"
+
+    def load(self, index_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(index_id))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return None
+            raise
+        manifest = json.loads(gzip.decompress(response['Body'].read()))
+        return manifest if manifest.get('version') == self.MANIFEST_VERSION else None
+
+    def save(self, index_id: str, params: Dict[str, Any], files: Dict[str, Dict[str, Any]],
+             pending: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Save the manifest of an index. A checkpoint of an unfinished run only lists the files
+        completed so far and the `pending` ids (see `ManifestRecorder.pending`) to delete
+        before resuming.
+        """
+        manifest = {'version': self.MANIFEST_VERSION, 'index_id': index_id, 'params': params, 'files': files}
+        if pending is not None:
+            manifest['pending'] = pending
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(index_id),
+                                  Body=gzip.compress(json.dumps(manifest, separators=(',', ':')).encode('utf-8')),
+                                  ContentEncoding='gzip')
+        logger.info(f"Saved {'checkpoint' if pending is not None else 'manifest'} of {index_id} ({len(files)} files)")
+
+    @staticmethod
+    def chunk_ids(index_id: str, entry: Dict[str, Any]) -> List[str]:
+        return [chunk_id(index_id, entry['run'], entry['first'] + i) for i in range(entry['count'])]
+
+    @staticmethod
+    def pending_ids(index_id: str, pending: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """Chunk and parent ids an interrupted run may have written beyond its completed files."""
+        return (IndexManifestStore.chunk_ids(index_id, pending),
+                [parent_id(index_id, pending['run'], pending['parent_first'] + i) for i in range(pending['parent_count'])])
+
+    @staticmethod
+    def diff(manifest: Dict[str, Any], objects: Sequence[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Compare an index manifest with the current KB objects.
+
+        Returns the objects to index (new or changed) and the manifest entries whose chunks
+        must be deleted (changed or removed files).
+        """
+        indexed = manifest['files']
+        to_index = [obj for obj in objects if indexed.get(obj['Key'], {}).get('etag') != obj['ETag']]
+        current = {obj['Key']: obj['ETag'] for obj in objects}
+        stale = {key: entry for key, entry in indexed.items() if current.get(key) != entry['etag']}
+        return to_index, stale
@@ -0,0 +1,282 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class DiskKVStore:
+    """
+    Thread-safe on-disk key/value store backed by a single SQLite file.
+
+    Values are opaque bytes. Every read refreshes the entry's access time, and once the
+    stored values exceed `max_bytes` the least recently used entries are evicted down to
+    90% of the limit. The file can be merged with, and published to, a copy on S3 so that
+    short-lived tasks share one store; transfers that would not fit in the free space of
+    the temp directory are skipped, and so are pushes with no new entries.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._total_bytes = self._stored_bytes()
+        # Entries written since the last push
+        self._unpushed = 0
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the stored values of the given keys; missing keys are left out."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE entries SET last_access = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [key for key, _ in rows]
+                    )
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, bytes]]) -> None:
+        """Store the given (key, value) pairs, evicting old entries when over the size limit."""
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._unpushed += len(rows)
+            self._total_bytes = self._stored_bytes()
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def put(self, key: str, value: bytes) -> None:
+        self.put_many([(key, value)])
+
+    def _evict(self, target_bytes: int) -> None:
+        """Delete least recently used entries until the store holds at most target_bytes. Caller holds the lock."""
+        freed, keys = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if self._total_bytes - freed <= target_bytes:
+                break
+            keys.append(key)
+            freed += size
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            self._conn.execute(f"DELETE FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch)
+        self._total_bytes -= freed
+        logger.info(f"Evicted {len(keys)} entries ({freed} bytes) from {self.path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def merge_from(self, other_path: str) -> int:
+        """Copy the entries of another store file that are missing here; returns the number added."""
+        with self._lock:
+            before = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            self._conn.execute("ATTACH DATABASE ? AS other", (other_path,))
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO entries SELECT key, value, size, last_access FROM other.entries")
+            finally:
+                self._conn.execute("DETACH DATABASE other")
+            added = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - before
+            self._total_bytes = self._stored_bytes()
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+        return added
+
+    def _file_bytes(self) -> int:
+        """Size of the store file, free pages included, which a snapshot copies. Caller holds the lock."""
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    @staticmethod
+    def _has_room(needed_bytes: int) -> bool:
+        return shutil.disk_usage(tempfile.gettempdir()).free >= needed_bytes
+
+    def _merge_remote(self, bucket: str, key: str) -> Optional[int]:
+        """Merge s3://bucket/key into this store; returns the number added, None when it would not fit on disk."""
+        s3_client = boto3.client("s3")
+        try:
+            remote_bytes = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                logger.info(f"No shared store at s3://{bucket}/{key} yet")
+                return 0
+            raise
+        # The download, and up to as much again while its entries are merged into the local file
+        if not self._has_room(2 * remote_bytes):
+            logger.warning(f"Not enough free space in {tempfile.gettempdir()} to merge s3://{bucket}/{key} "
+                           f"({remote_bytes} bytes)")
+            return None
+        fd, remote_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            s3_client.download_file(Bucket=bucket, Key=key, Filename=remote_path)
+            added = self.merge_from(remote_path)
+            logger.info(f"Merged {added} entries from s3://{bucket}/{key} into {self.path}")
+            return added
+        finally:
+            os.remove(remote_path)
+
+    def pull_from_s3(self, bucket: str, key: str) -> int:
+        """
+        Merge the store published at s3://bucket/key into this one; a missing object is not
+        an error, and one too large for the free space of the temp directory is skipped.
+        """
+        return self._merge_remote(bucket, key) or 0
+
+    def push_to_s3(self, bucket: str, key: str) -> None:
+        """
+        Publish this store to s3://bucket/key, if entries were written since the last push.
+
+        The remote copy is merged in first, so entries written by tasks that finished in
+        the meantime are kept; concurrent pushes are last-writer-wins. The push is skipped
+        when the remote copy or the snapshot would not fit in the temp directory.
+        """
+        with self._lock:
+            unpushed = self._unpushed
+        if not unpushed:
+            logger.info(f"No new entries in {self.path} since the last push")
+            return
+        if self._merge_remote(bucket, key) is None:
+            return
+        with self._lock:
+            snapshot_bytes = self._file_bytes()
+        if not self._has_room(snapshot_bytes):
+            logger.warning(f"Not enough free space in {tempfile.gettempdir()} to snapshot {self.path} "
+                           f"({snapshot_bytes} bytes), not publishing it")
+            return
+        fd, snapshot_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            # Consistent single-file snapshot, including pages still in the WAL
+            snapshot = sqlite3.connect(snapshot_path)
+            try:
+                with self._lock:
+                    self._conn.backup(snapshot)
+                    unpushed = self._unpushed
+            finally:
+                snapshot.close()
+            boto3.client("s3").upload_file(Filename=snapshot_path, Bucket=bucket, Key=key)
+            with self._lock:
+                self._unpushed -= unpushed
+            logger.info(f"Published {self.path} to s3://{bucket}/{key}")
+        finally:
+            os.remove(snapshot_path)
+
+    def sync_pull(self, bucket: Optional[str], key: Optional[str]) -> int:
+        """
+        `pull_from_s3`, when S3 sync is configured (bucket and key are set); failures are
+        logged and the local store is used as is. Returns the number of entries added.
+        """
+        if not (bucket and key):
+            return 0
+        try:
+            return self.pull_from_s3(bucket, key)
+        except Exception as e:
+            logger.warning(f"Could not pull s3://{bucket}/{key} into {self.path}, continuing with the local store: {e}")
+            return 0
+
+    def sync_push(self, bucket: Optional[str], key: Optional[str]) -> None:
+        """`push_to_s3`, when S3 sync is configured (bucket and key are set); failures are logged."""
+        if not (bucket and key):
+            return
+        try:
+            self.push_to_s3(bucket, key)
+        except Exception as e:
+            logger.warning(f"Could not push {self.path} to s3://{bucket}/{key}: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RequestCoalescer:
+    """
+    Collapse concurrent requests for the same key into one computation.
+
+    `claim` hands each key to exactly one owner, which must later `resolve` or `fail` it;
+    every other caller receives the owner's future and waits on it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def claim(self, keys: Iterable[str]) -> Tuple[List[str], Dict[str, Future]]:
+        """Return the keys now owned by the caller and the futures of keys owned by someone else."""
+        owned, waiting = [], {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._in_flight.get(key)
+                if future is None:
+                    self._in_flight[key] = Future()
+                    owned.append(key)
+                else:
+                    waiting[key] = future
+        return owned, waiting
+
+    def resolve(self, results: Dict[str, object]) -> None:
+        with self._lock:
+            futures = [(self._in_flight.pop(key), value) for key, value in results.items()]
+        for future, value in futures:
+            future.set_result(value)
+
+    def fail(self, keys: Iterable[str], error: BaseException) -> None:
+        with self._lock:
+            futures = [self._in_flight.pop(key) for key in keys if key in self._in_flight]
+        for future in futures:
+            future.set_exception(error)
+
+    def run(self, key: str, compute: Callable[[], object]) -> object:
+        """Compute the value of a single key, or wait for the caller already computing it."""
+        owned, waiting = self.claim([key])
+        if not owned:
+            return waiting[key].result()
+        try:
+            value = compute()
+        except BaseException as e:
+            self.fail(owned, e)
+            raise
+        self.resolve({key: value})
+        return value
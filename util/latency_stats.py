@@ -0,0 +1,28 @@
+from typing import List
+import threading
+
+import numpy as np
+
+class LatencyStats:
+    """Thread-safe collection of latency samples, summarized as percentiles."""
+
+    def __init__(self, name: str = "requests") -> None:
+        self.name = name
+        self._samples: List[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, count: int = 1) -> None:
+        """Record `count` operations that each took `seconds`, such as the queries of one batched request."""
+        with self._lock:
+            self._samples.extend([seconds] * count)
+
+    @property
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile_ms(self, percentile: float) -> float:
+        with self._lock:
+            return 1000 * float(np.percentile(self._samples, percentile)) if self._samples else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.count} {self.name}, p50 {self.percentile_ms(50):.1f} ms, p95 {self.percentile_ms(95):.1f} ms"
@@ -0,0 +1,28 @@
+import logging
+
+from config.config import Config
+from constants import ModelInvocationConstants
+from core.dynamodb import DynamoDBOperations
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def task_concurrency(config: Config, service: str, model_id: str) -> int:
+    """
+    Number of concurrent calls one task may make to a model.
+
+    The `limit` of a model in the model invocations table is the number of tasks the
+    state machine runs on it at once, so each task takes its share of the limit among the
+    `invocations` currently holding the model, itself included. Falls back to
+    ModelInvocationConstants when the table is not configured, has no entry or cannot be
+    read.
+    """
+    if config.execution_model_invocations_table:
+        try:
+            model_invocations = DynamoDBOperations(region=config.aws_region, table_name=config.execution_model_invocations_table)
+            item = model_invocations.get_item({"execution_model_id": f"{service}_{model_id}"})
+            if item and int(item.get("limit", 0)) > 0:
+                return max(1, int(item["limit"]) // max(1, int(item.get("invocations", 0))))
+        except Exception as e:
+            logger.warning(f"Could not read the invocation limit of {service}_{model_id}, using the default: {e}")
+    return ModelInvocationConstants.get_limit(service, model_id)
@@ -1,8 +1,15 @@
 import os
 from PyPDF2 import PdfReader
 import logging
-from io import StringIO
-import fitz 
+from io import BytesIO, StringIO
+import fitz
+import multiprocessing
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -12,9 +19,7 @@ def extract_text_from_pdf(file_path: str) -> str:
     try:
         logger.info(f"Extracting text from PDF: {file_path}")
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
+        text = "".join(page.extract_text() or "" for page in reader.pages)
         logger.info("Text extraction from PDF successful.")
         return text
     except Exception as e:
@@ -38,16 +43,192 @@ def extract_text_from_pdf_pymudf(file_path: str) -> str:
     except Exception as e:
         logger.error(f"Failed to extract text from PDF: {e}")
         raise
-    
-def process_pdf_from_folder(file_path: str) -> str:
-    "Extract text from all files in a folder"
+
+# A PDF given either as a local file path or as its content
+PdfSource = Union[str, bytes]
+
+def _open_pymupdf(source: PdfSource) -> "fitz.Document":
+    return fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+
+def _open_pypdf2(source: PdfSource) -> PdfReader:
+    return PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+
+def _extract_pages_pymupdf(source: PdfSource, start_page: int, end_page: Optional[int]) -> str:
+    with _open_pymupdf(source) as doc:
+        end_page = doc.page_count if end_page is None else min(end_page, doc.page_count)
+        return "".join(doc.load_page(i).get_text() or "" for i in range(start_page, end_page))
+
+def _extract_pages_pypdf2(source: PdfSource, start_page: int, end_page: Optional[int]) -> str:
+    pages = _open_pypdf2(source).pages
+    end_page = len(pages) if end_page is None else min(end_page, len(pages))
+    return "".join(pages[i].extract_text() or "" for i in range(start_page, end_page))
+
+def _count_pages_pymupdf(source: PdfSource) -> int:
+    with _open_pymupdf(source) as doc:
+        return doc.page_count
+
+def _count_pages_pypdf2(source: PdfSource) -> int:
+    return len(_open_pypdf2(source).pages)
+
+# Extraction backends: (extract pages [start, end) of a PDF, count the pages of a PDF)
+PDF_BACKENDS: Dict[str, Tuple[Callable[[PdfSource, int, Optional[int]], str], Callable[[PdfSource], int]]] = {
+    "pymupdf": (_extract_pages_pymupdf, _count_pages_pymupdf),
+    "pypdf2": (_extract_pages_pypdf2, _count_pages_pypdf2),
+}
+
+def _extract_task(backend: str, source: PdfSource, start_page: int, end_page: Optional[int]) -> Tuple[str, float]:
+    """Worker entry point: extract a page range and return it with the time spent."""
+    start_time = time.perf_counter()
+    text = PDF_BACKENDS[backend][0](source, start_page, end_page)
+    return text, time.perf_counter() - start_time
+
+def _source_name(source: PdfSource) -> str:
+    return "<memory>" if isinstance(source, bytes) else source
+
+def _spill_to_file(content: bytes) -> str:
+    """Write PDF content to a temporary file and return its path; the caller removes it."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as spill:
+        spill.write(content)
+    return path
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on (the container's vCPUs, not the host's)."""
     try:
-        text_data = []
-        for file in os.listdir(file_path):
-            file_text = extract_text_from_pdf(os.path.join(file_path, file))
-            text_data.append(file_text)
-        logger.info(f"Extracted text from all files. Number of files: {len(text_data)}")
-        return text_data
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+@dataclass
+class PdfExtractionTiming:
+    """Per-file extraction timing breakdown."""
+    file_path: str  # "<memory>" for PDFs given as content
+    pages: int
+    tasks: int
+    wall_seconds: float
+    worker_seconds: float
+
+    def __str__(self) -> str:
+        return (f"{os.path.basename(self.file_path)}: {self.pages or '?'} pages in {self.tasks} tasks, "
+                f"{self.wall_seconds:.2f}s wall, {self.worker_seconds:.2f}s worker time")
+
+
+class ParallelPdfExtractor:
+    """
+    Extract text from many PDFs on a process pool.
+
+    PDFs are given as local file paths or as their content (streamed from S3). Small files are extracted whole by one worker; files over `split_threshold_bytes` are
+    split into page ranges of `pages_per_task` pages spread over the workers. The content
+    of a split file is written to a temporary file first, so each task gets its path
+    rather than a pickled copy of the whole PDF. Results are
+    yielded in input order, with at most `2 * max_workers` tasks in flight so memory stays
+    bounded. With a single worker, or when no process pool can be created (e.g. Lambda has
+    no /dev/shm), files are extracted inline.
+    """
+
+    def __init__(self, backend: str = "pymupdf", max_workers: Optional[int] = None,
+                 pages_per_task: int = 32, split_threshold_bytes: int = 2 * 1024 * 1024) -> None:
+        if backend not in PDF_BACKENDS:
+            raise ValueError(f"Unknown PDF extraction backend: {backend}. Available: {list(PDF_BACKENDS)}")
+        self.backend = backend
+        self.max_workers = max_workers or available_cpus()
+        self.pages_per_task = pages_per_task
+        self.split_threshold_bytes = split_threshold_bytes
+        self.timings: List[PdfExtractionTiming] = []
+
+    def _page_ranges(self, source: PdfSource) -> Tuple[int, List[Tuple[int, Optional[int]]]]:
+        size = len(source) if isinstance(source, bytes) else os.path.getsize(source)
+        if self.max_workers <= 1 or size <= self.split_threshold_bytes:
+            return 0, [(0, None)]
+        pages = PDF_BACKENDS[self.backend][1](source)
+        return pages, [(start, start + self.pages_per_task) for start in range(0, max(pages, 1), self.pages_per_task)]
+
+    def _create_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.max_workers <= 1:
+            return None
+        try:
+            # Spawned workers, since extraction may run next to threads (embedding, S3) that fork would copy mid-lock
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError) as e:
+            logger.warning(f"Process pool unavailable, extracting PDFs inline: {e}")
+            return None
+
+    def iter_extract(self, sources: Iterable[PdfSource]) -> Iterator[Tuple[PdfSource, str]]:
+        """Yield (source, text) for every PDF, in input order."""
+        pool = self._create_pool()
+        if pool is None:
+            for source in sources:
+                start_time = time.perf_counter()
+                text, seconds = _extract_task(self.backend, source, 0, None)
+                self._record(PdfExtractionTiming(_source_name(source), 0, 1, time.perf_counter() - start_time, seconds))
+                yield source, text
+            return
+
+        max_in_flight = 2 * self.max_workers
+        pending: Deque[Tuple[PdfSource, int, float, List[Future], Optional[str]]] = deque()
+        in_flight = 0
+        try:
+            for source in sources:
+                pages, ranges = self._page_ranges(source)
+                task_source, spill_path = source, None
+                if isinstance(source, bytes) and len(ranges) > 1:
+                    task_source = spill_path = _spill_to_file(source)
+                futures = [pool.submit(_extract_task, self.backend, task_source, start, end) for start, end in ranges]
+                pending.append((source, pages, time.perf_counter(), futures, spill_path))
+                in_flight += len(futures)
+                while pending and in_flight > max_in_flight:
+                    in_flight -= len(pending[0][3])
+                    yield self._collect(*pending.popleft())
+            while pending:
+                yield self._collect(*pending.popleft())
+        finally:
+            for _, _, _, futures, _ in pending:
+                for future in futures:
+                    future.cancel()
+            pool.shutdown(wait=True)
+            for _, _, _, _, spill_path in pending:
+                if spill_path is not None:
+                    os.remove(spill_path)
+
+    def _collect(self, source: PdfSource, pages: int, submitted: float, futures: List[Future],
+                 spill_path: Optional[str]) -> Tuple[PdfSource, str]:
+        try:
+            results = [future.result() for future in futures]
+        finally:
+            if spill_path is not None:
+                os.remove(spill_path)
+        self._record(PdfExtractionTiming(
+            _source_name(source), pages, len(futures), time.perf_counter() - submitted, sum(seconds for _, seconds in results)
+        ))
+        return source, "".join(text for text, _ in results)
+
+    def _record(self, timing: PdfExtractionTiming) -> None:
+        self.timings.append(timing)
+        logger.info(f"Extracted {timing}")
+
+    def log_summary(self) -> None:
+        if not self.timings:
+            return
+        worker = sum(timing.worker_seconds for timing in self.timings)
+        slowest = max(self.timings, key=lambda timing: timing.worker_seconds)
+        logger.info(f"Extracted {len(self.timings)} files with {self.backend} on {self.max_workers} workers: "
+                    f"{worker:.2f}s worker time, slowest file {slowest}")
+
+def iter_pdf_text_from_folder(file_path: str, backend: str = "pymupdf", max_workers: Optional[int] = None) -> Iterator[str]:
+    "Lazily extract text from all files in a folder, in parallel but yielded one file at a time"
+    try:
+        extractor = ParallelPdfExtractor(backend=backend, max_workers=max_workers)
+        # Skip bookkeeping files such as the S3 ETag manifest
+        file_paths = [os.path.join(file_path, file) for file in sorted(os.listdir(file_path))
+                      if not file.startswith('.') and os.path.isfile(os.path.join(file_path, file))]
+        for _, text in extractor.iter_extract(file_paths):
+            yield text
+        extractor.log_summary()
+        logger.info(f"Extracted text from all files. Number of files: {len(file_paths)}")
     except Exception as e:
         logger.error(f"Failed to extract text from PDF: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def process_pdf_from_folder(file_path: str, backend: str = "pymupdf", max_workers: Optional[int] = None) -> List[str]:
+    "Extract text from all files in a folder"
+    return list(iter_pdf_text_from_folder(file_path, backend=backend, max_workers=max_workers))
@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+import base64
+import logging
+
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Indexing algorithms whose vectors are quantized client-side, and their quantization mode
+QUANTIZED_ALGORITHMS = {"hnsw_int8": "int8", "hnsw_binary": "binary"}
+
+# Source field holding the int8 copy of a binary quantized vector, used to rescore candidates
+RESCORE_FIELD = "rescore_vector"
+
+# Key of the quantization parameters in the index mapping's _meta
+MAPPING_META_KEY = "quantization"
+
+def _as_matrix(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+class VectorQuantizer(ABC):
+    """
+    Client-side quantization of embeddings for OpenSearch byte and binary vector fields.
+
+    Parameters are fitted once per index on a sample of its vectors and stored in the index
+    mapping's `_meta`, so that queries are quantized exactly like the indexed documents.
+    """
+
+    mode: str = ""
+    # Source fields that `rescore` reads from search hits
+    rescore_fields: List[str] = []
+
+    @classmethod
+    @abstractmethod
+    def fit(cls, sample: np.ndarray) -> "VectorQuantizer":
+        """Fit the quantization parameters on a sample of vectors."""
+        pass
+
+    @abstractmethod
+    def to_meta(self) -> Dict[str, Any]:
+        """JSON-serializable parameters, including `mode`."""
+        pass
+
+    @abstractmethod
+    def quantize(self, vectors) -> np.ndarray:
+        """Quantize a batch of vectors to int8 rows."""
+        pass
+
+    def document_fields(self, vectors) -> List[Dict[str, Any]]:
+        """Source fields of each vector's document other than the vector itself."""
+        return [{} for _ in range(len(vectors))]
+
+    def quantize_query(self, vector: Sequence[float]) -> List[int]:
+        return self.quantize(vector)[0].tolist()
+
+    @property
+    def oversample(self) -> int:
+        """Candidates fetched per requested result, for rescoring."""
+        return 1
+
+    def rescore(self, query_vector: Sequence[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        return results[:k]
+
+
+class Int8Quantizer(VectorQuantizer):
+    """
+    Symmetric scalar quantization to int8 with one scale per index.
+
+    The scale maps the `clip_percentile` of absolute sample values to 127; a single scale
+    keeps inner products proportional, so rankings are preserved up to rounding.
+    """
+
+    mode = "int8"
+
+    def __init__(self, scale: float) -> None:
+        self.scale = scale
+
+    @classmethod
+    def fit(cls, sample: np.ndarray, clip_percentile: float = 99.9) -> "Int8Quantizer":
+        max_abs = float(np.percentile(np.abs(_as_matrix(sample)), clip_percentile))
+        return cls(scale=127.0 / max_abs if max_abs > 0 else 1.0)
+
+    def to_meta(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "scale": self.scale}
+
+    def quantize(self, vectors) -> np.ndarray:
+        return np.clip(np.rint(_as_matrix(vectors) * self.scale), -128, 127).astype(np.int8)
+
+    def dequantize(self, quantized: np.ndarray) -> np.ndarray:
+        return quantized.astype(np.float32) / self.scale
+
+
+class BinaryQuantizer(VectorQuantizer):
+    """
+    One bit per dimension (above or below the sample mean of that dimension), searched by
+    Hamming distance, with rescoring.
+
+    Each document also carries an int8 copy of its vector (base64 in `RESCORE_FIELD`, not
+    indexed); queries fetch `oversample * k` candidates and re-rank them by inner product
+    with the float query vector.
+    """
+
+    mode = "binary"
+    rescore_fields = [RESCORE_FIELD]
+
+    def __init__(self, thresholds: Sequence[float], rescorer: Int8Quantizer, oversample: int = 4) -> None:
+        self.thresholds = np.asarray(thresholds, dtype=np.float32)
+        self.rescorer = rescorer
+        self._oversample = oversample
+
+    @classmethod
+    def fit(cls, sample: np.ndarray, oversample: int = 4) -> "BinaryQuantizer":
+        sample = _as_matrix(sample)
+        if sample.shape[1] % 8:
+            raise ValueError(f"Binary quantization needs a dimension divisible by 8, got {sample.shape[1]}")
+        return cls(thresholds=sample.mean(axis=0), rescorer=Int8Quantizer.fit(sample), oversample=oversample)
+
+    def to_meta(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "thresholds": [round(float(t), 6) for t in self.thresholds],
+                "scale": self.rescorer.scale, "oversample": self._oversample}
+
+    @property
+    def oversample(self) -> int:
+        return self._oversample
+
+    def quantize(self, vectors) -> np.ndarray:
+        # OpenSearch binary vectors are the packed bits as signed bytes
+        return np.packbits(_as_matrix(vectors) > self.thresholds, axis=1).view(np.int8)
+
+    def document_fields(self, vectors) -> List[Dict[str, Any]]:
+        return [{RESCORE_FIELD: base64.b64encode(row.tobytes()).decode("ascii")}
+                for row in self.rescorer.quantize(vectors)]
+
+    def rescore(self, query_vector: Sequence[float], results: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        rescorable = [result for result in results if RESCORE_FIELD in result]
+        if not rescorable:
+            return results[:k]
+        candidates = np.stack([np.frombuffer(base64.b64decode(result[RESCORE_FIELD]), dtype=np.int8)
+                               for result in rescorable])
+        scores = self.rescorer.dequantize(candidates) @ np.asarray(query_vector, dtype=np.float32)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [rescorable[i] for i in order]
+
+
+QUANTIZERS = {quantizer.mode: quantizer for quantizer in (Int8Quantizer, BinaryQuantizer)}
+
+def fit_quantizer(algorithm: str, sample) -> Optional[VectorQuantizer]:
+    """Quantizer of an indexing algorithm fitted on a sample, None for float indexes."""
+    mode = QUANTIZED_ALGORITHMS.get(algorithm)
+    return QUANTIZERS[mode].fit(_as_matrix(sample)) if mode else None
+
+def quantizer_from_meta(meta: Optional[Dict[str, Any]]) -> Optional[VectorQuantizer]:
+    """Rebuild a quantizer from the parameters stored in an index mapping, None if there are none."""
+    if not meta:
+        return None
+    if meta["mode"] == Int8Quantizer.mode:
+        return Int8Quantizer(scale=meta["scale"])
+    if meta["mode"] == BinaryQuantizer.mode:
+        return BinaryQuantizer(thresholds=meta["thresholds"], rescorer=Int8Quantizer(scale=meta["scale"]),
+                               oversample=meta.get("oversample", 4))
+    raise ValueError(f"Unknown quantization mode: {meta['mode']}")
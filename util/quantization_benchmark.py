@@ -0,0 +1,102 @@
+"""
+Recall / latency / payload comparison of the vector quantization modes.
+
+Exact float32 inner product search is the reference; every mode searches the same corpus
+by brute force in its own space (int8 inner product, binary Hamming distance, binary with
+int8 rescoring), so latencies compare the arithmetic, not an OpenSearch cluster. Payload
+is the JSON size of the vector fields of one bulk document.
+
+    python -m util.quantization_benchmark
+    python -m util.quantization_benchmark --vectors embeddings.npy --k 5 10
+"""
+from typing import Callable, Dict, List, Sequence, Tuple
+import argparse
+import json
+import time
+
+import numpy as np
+
+from util.quantization import BinaryQuantizer, Int8Quantizer, VectorQuantizer
+from util.vector_utils import normalize_rows
+
+# Bits set in every byte value, for Hamming distances over packed bits
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def synthetic_vectors(count: int, dimension: int, rank: int = 64, noise: float = 0.1, seed: int = 0) -> np.ndarray:
+    """Normalized vectors near a random rank-`rank` subspace, a rough stand-in for text embeddings."""
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((count, rank)).astype(np.float32)
+    projection = rng.standard_normal((rank, dimension)).astype(np.float32)
+    return normalize_rows(latent @ projection + noise * np.sqrt(rank) * rng.standard_normal((count, dimension)).astype(np.float32))
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-scores, kind="stable")[:k]
+
+def _hamming(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    return POPCOUNT[np.bitwise_xor(codes.view(np.uint8), query_code.view(np.uint8))].sum(axis=1, dtype=np.int32)
+
+def _payload_bytes(document: Dict) -> float:
+    return len(json.dumps(document, separators=(",", ":")))
+
+def _searchers(corpus: np.ndarray, sample: np.ndarray) -> List[Tuple[str, float, Callable[[np.ndarray, int], np.ndarray]]]:
+    """(mode, payload bytes per document, search(query, k) -> ids) for every mode."""
+    int8 = Int8Quantizer.fit(sample)
+    binary = BinaryQuantizer.fit(sample)
+    # int8 values are exact in float32, which numpy multiplies with BLAS
+    int8_corpus = int8.quantize(corpus).astype(np.float32)
+    binary_corpus = binary.quantize(corpus)
+    rescore_corpus = int8.dequantize(binary.rescorer.quantize(corpus))
+
+    def payload(quantizer: VectorQuantizer, rows: np.ndarray, fields: bool) -> float:
+        documents = [{"vectors": quantized.tolist(), **(extra if fields else {})} for quantized, extra
+                     in zip(quantizer.quantize(rows), quantizer.document_fields(rows))]
+        return float(np.mean([_payload_bytes(document) for document in documents]))
+
+    rows = corpus[:256]
+    def binary_rescored(query: np.ndarray, k: int) -> np.ndarray:
+        candidates = _top_k(-_hamming(binary_corpus, binary.quantize(query)[0]), k * binary.oversample)
+        return candidates[_top_k(rescore_corpus[candidates] @ query, k)]
+
+    return [
+        ("float32", float(np.mean([_payload_bytes({"vectors": row.tolist()}) for row in rows])),
+         lambda query, k: _top_k(corpus @ query, k)),
+        ("int8", payload(int8, rows, False),
+         lambda query, k: _top_k(int8_corpus @ int8.quantize(query)[0].astype(np.float32), k)),
+        ("binary", payload(binary, rows, False),
+         lambda query, k: _top_k(-_hamming(binary_corpus, binary.quantize(query)[0]), k)),
+        (f"binary+rescore x{binary.oversample}", payload(binary, rows, True), binary_rescored),
+    ]
+
+def run(corpus: np.ndarray, queries: np.ndarray, ks: Sequence[int], sample_size: int) -> None:
+    sample = corpus[np.random.default_rng(1).choice(len(corpus), min(sample_size, len(corpus)), replace=False)]
+    k_max = max(ks)
+    reference = [_top_k(corpus @ query, k_max) for query in queries]
+    searchers = _searchers(corpus, sample)
+    float_payload = searchers[0][1]
+
+    print(f"{len(corpus)} vectors of dimension {corpus.shape[1]}, {len(queries)} queries, parameters fitted on {len(sample)}")
+    print(f"{'mode':<22}{'payload B':>11}{'shrink':>8}{'query ms':>10}" + "".join(f"{f'recall@{k}':>11}" for k in ks))
+    for mode, payload, search in searchers:
+        start = time.perf_counter()
+        results = [search(query, k_max) for query in queries]
+        latency_ms = 1000 * (time.perf_counter() - start) / len(queries)
+        recalls = [np.mean([len(set(result[:k]) & set(expected[:k])) / k for result, expected in zip(results, reference)])
+                   for k in ks]
+        print(f"{mode:<22}{payload:>11.0f}{float_payload / payload:>7.1f}x{latency_ms:>10.2f}"
+              + "".join(f"{recall:>11.3f}" for recall in recalls))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help=".npy file of embeddings (default: synthetic low-rank vectors)")
+    parser.add_argument("--count", type=int, default=20000, help="synthetic corpus size (default: 20000)")
+    parser.add_argument("--dimension", type=int, default=1024, help="synthetic vector dimension (default: 1024)")
+    parser.add_argument("--queries", type=int, default=200, help="queries, held out of the corpus (default: 200)")
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10], help="recall cut-offs (default: 5 10)")
+    parser.add_argument("--sample-size", type=int, default=5000, help="vectors the parameters are fitted on (default: 5000)")
+    args = parser.parse_args()
+
+    vectors = np.load(args.vectors).astype(np.float32) if args.vectors else synthetic_vectors(args.count + args.queries, args.dimension)
+    run(vectors[args.queries:], vectors[:args.queries], args.k, args.sample_size)
+
+if __name__ == "__main__":
+    main()
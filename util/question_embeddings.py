@@ -0,0 +1,98 @@
+from typing import Any, Dict, Optional, Sequence
+import hashlib
+import json
+import logging
+import os
+
+import boto3
+import numpy as np
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class QuestionEmbeddings:
+    """Embeddings of a set of questions: a float32 matrix, possibly memory-mapped, and the row of each question hash."""
+
+    def __init__(self, rows: Dict[str, int], vectors: np.ndarray) -> None:
+        self.rows = rows
+        self.vectors = vectors
+
+    @staticmethod
+    def question_key(question: str) -> str:
+        return hashlib.sha256(question.encode('utf-8')).hexdigest()
+
+    def get(self, question: str) -> Optional[np.ndarray]:
+        row = self.rows.get(self.question_key(question))
+        return None if row is None else np.asarray(self.vectors[row], dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+class QuestionEmbeddingStore:
+    """
+    S3 store of the embedded ground truth questions, one entry per ground truth file
+    version (its ETag) and embedding parameters: `vectors.npy`, the float32 matrix of the
+    questions, and `index.json`, the row of each question hash, written last so readers
+    never see a partial entry.
+
+    The questions of an execution are embedded once, by its first retrieval task; the
+    others download the matrix and memory-map it instead of embedding each question.
+    """
+
+    STORE_VERSION = 1
+
+    def __init__(self, bucket: str, prefix: str, scratch_dir: str = '/tmp/question_embeddings') -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.scratch_dir = scratch_dir
+        self.s3_client = boto3.client('s3')
+
+    def store_id(self, gt_etag: str, embedding_params: Dict[str, Any]) -> str:
+        """Hash of the ground truth version and the embedding parameters."""
+        content = json.dumps({'version': self.STORE_VERSION, 'gt_etag': gt_etag, 'embedding': embedding_params},
+                             sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _key(self, store_id: str, name: str) -> str:
+        return f"{self.prefix}/{store_id}/{name}"
+
+    def _local_path(self, store_id: str) -> str:
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        return os.path.join(self.scratch_dir, f"{store_id}.npy")
+
+    def load(self, store_id: str) -> Optional[QuestionEmbeddings]:
+        """The stored question embeddings, memory-mapped from a local copy; None when not stored yet."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(store_id, "index.json"))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return None
+            raise
+        index = json.loads(response['Body'].read())
+        if index.get('version') != self.STORE_VERSION:
+            return None
+        vectors_path = self._local_path(store_id)
+        if not os.path.exists(vectors_path):
+            self.s3_client.download_file(self.bucket, self._key(store_id, "vectors.npy"), vectors_path)
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if vectors.shape[0] != index['count']:
+            raise ValueError(f"Question embeddings {store_id} hold {vectors.shape[0]} vectors, its index {index['count']}")
+        logger.info(f"Loaded {len(index['rows'])} question embeddings from s3://{self.bucket}/{self._key(store_id, '')}")
+        return QuestionEmbeddings(index['rows'], vectors)
+
+    def save(self, store_id: str, questions: Sequence[str], vectors: np.ndarray) -> QuestionEmbeddings:
+        """Store the embeddings of `questions`, one row of `vectors` each, and return them."""
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        rows: Dict[str, int] = {}
+        for row, question in enumerate(questions):
+            rows.setdefault(QuestionEmbeddings.question_key(question), row)
+        vectors_path = self._local_path(store_id)
+        np.save(vectors_path, vectors)
+        self.s3_client.upload_file(vectors_path, self.bucket, self._key(store_id, "vectors.npy"))
+        index = {'version': self.STORE_VERSION, 'count': len(vectors), 'rows': rows}
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(store_id, "index.json"),
+                                  Body=json.dumps(index).encode('utf-8'))
+        logger.info(f"Saved {len(questions)} question embeddings to s3://{self.bucket}/{self._key(store_id, '')}")
+        return QuestionEmbeddings(rows, vectors)
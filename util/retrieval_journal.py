@@ -0,0 +1,109 @@
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+
+from util import fast_json
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Namespace of the deterministic ids of question metrics
+QUESTION_ID_NAMESPACE = uuid.UUID("8a4b1f0e-5c7d-4e2a-9b36-2f1d0c9e7a51")
+
+def question_id(experiment_id: str, index: int, question: str) -> str:
+    """Id of the metrics of the `index`-th ground truth question of an experiment, the same on every run."""
+    return str(uuid.uuid5(QUESTION_ID_NAMESPACE, f"{experiment_id}/{index}/{question}"))
+
+
+class RetrievalJournal:
+    """
+    Write-ahead journal of the questions a retrieval task has answered: one JSON line per
+    question, with its DynamoDB metrics item and the tokens spent on it.
+
+    Lines are appended to a local file and the file is uploaded to S3 at most every
+    `upload_seconds`, and on `sync`. A task restarted after a crash loads the journal,
+    replays its items into DynamoDB (their ids are deterministic, so writes are
+    idempotent) and only answers the questions missing from it.
+    """
+
+    def __init__(self, path: str, bucket: Optional[str] = None, s3_key: Optional[str] = None,
+                 upload_seconds: float = 60.0) -> None:
+        self.path = path
+        self.bucket = bucket
+        self.s3_key = s3_key if bucket else None
+        self.upload_seconds = upload_seconds
+        self.s3_client = boto3.client('s3') if self.s3_key else None
+        self._file = None
+        self._last_upload = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Journaled entries by question id, from the local journal or else its S3 copy."""
+        if not os.path.exists(self.path) and self.s3_key:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            try:
+                self.s3_client.download_file(self.bucket, self.s3_key, self.path)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in ('404', 'NoSuchKey', 'NotFound'):
+                    raise
+        entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as journal:
+                data = journal.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                # Drop the last line of a task that crashed while writing it, so appends start on a new line
+                with open(self.path, 'r+b') as journal:
+                    journal.truncate(complete)
+            for line in data[:complete].splitlines():
+                if line:
+                    entry = fast_json.loads(line)
+                    entries[entry['id']] = entry
+        if entries:
+            logger.info(f"Loaded {len(entries)} answered questions from the retrieval journal {self.path}")
+        return entries
+
+    def append(self, question_id: str, item: Dict[str, Any], usage: Dict[str, int]) -> None:
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._file = open(self.path, 'ab')
+            self._file.write(fast_json.dumps({'id': question_id, 'item': item, 'usage': usage}) + b"\n")
+            self._file.flush()
+            if self.s3_key and time.monotonic() - self._last_upload >= self.upload_seconds:
+                self._upload()
+
+    def sync(self) -> None:
+        """Upload the journal to S3, if S3 is configured."""
+        with self._lock:
+            if self.s3_key:
+                self._upload()
+
+    def _upload(self) -> None:
+        self._last_upload = time.monotonic()
+        if not os.path.exists(self.path):
+            return
+        try:
+            self.s3_client.upload_file(self.path, self.bucket, self.s3_key)
+        except Exception as e:
+            logger.warning(f"Could not upload the retrieval journal to S3: {e}")
+
+    def delete(self) -> None:
+        """Remove the journal once the retrieval is complete."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            if self.s3_key:
+                try:
+                    self.s3_client.delete_object(Bucket=self.bucket, Key=self.s3_key)
+                except Exception as e:
+                    logger.warning(f"Could not delete the retrieval journal from S3: {e}")
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional
+import gzip
+import hashlib
+import logging
+
+import boto3
+from botocore.exceptions import ClientError
+
+from util import fast_json
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class RetrievalStore:
+    """
+    S3 store of the search results of the ground truth questions, one object per search
+    target (an index, or a knowledge base): the results of each question, by question hash,
+    searched at the largest k of the experiments sharing the target.
+
+    kNN results of a smaller k are the prefix of that list, so experiments that only differ
+    by knn_num, retrieval model or prompt read their results from the store instead of
+    embedding and searching the questions again. Results are stored before deduplication
+    and reranking, which are applied per experiment as usual.
+    """
+
+    STORE_VERSION = 1
+
+    def __init__(self, bucket: str, prefix: str) -> None:
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.s3_client = boto3.client('s3')
+
+    def _key(self, target_id: str) -> str:
+        return f"{self.prefix}/{target_id}.json.gz"
+
+    @staticmethod
+    def question_key(question: str) -> str:
+        return hashlib.sha256(question.encode('utf-8')).hexdigest()
+
+    def load(self, target_id: str) -> Optional[Dict[str, Any]]:
+        """The stored `{'k': ..., 'results': {question hash: results}}` of a search target, if any."""
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(target_id))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return None
+            raise
+        entry = fast_json.loads(gzip.decompress(response['Body'].read()))
+        return entry if entry.get('version') == self.STORE_VERSION else None
+
+    def save(self, target_id: str, k: int, results: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Save the results of a search target, searched at `k`. Tasks saving the same target
+        concurrently write results of the same searches, so the last write wins.
+        """
+        entry = {'version': self.STORE_VERSION, 'target_id': target_id, 'k': k, 'results': results}
+        self.s3_client.put_object(Bucket=self.bucket, Key=self._key(target_id),
+                                  Body=gzip.compress(fast_json.dumps(entry)), ContentEncoding='gzip')
+        logger.info(f"Saved search results of {len(results)} questions on {target_id} at k={k}")
@@ -0,0 +1,97 @@
+"""
+Bytes and latency per kNN query against a live index, before and after the search path
+caches the index mapping and filters the returned source fields.
+
+"before" resolves the vector field with a get_mapping call per query and returns the
+full `_source` of every hit, embeddings included; "after" is
+`OpenSearchVectorDatabase.search`. Bytes are the response bodies received per query,
+mapping lookups included. Connection settings come from the environment, as for the
+indexing and retrieval tasks.
+
+    python -m util.search_benchmark --index my-index
+    python -m util.search_benchmark --index my-index --queries 200 --k 10
+"""
+from typing import Any, Callable, List, Optional
+import argparse
+import time
+
+import numpy as np
+
+from config.config import get_config
+from core.opensearch_vectorstore import OpenSearchVectorDatabase
+from util.quantization import MAPPING_META_KEY, quantizer_from_meta
+from util.vector_utils import normalize_rows
+
+
+class _CountingDeserializer:
+    """Wraps the client's deserializer to count the response bytes it receives."""
+
+    def __init__(self, deserializer: Any) -> None:
+        self.deserializer = deserializer
+        self.bytes = 0
+
+    def loads(self, s: Any, mimetype: Optional[str] = None) -> Any:
+        self.bytes += len(s.encode("utf-8") if isinstance(s, str) else s)
+        return self.deserializer.loads(s, mimetype)
+
+
+def _search_before(database: OpenSearchVectorDatabase, index_name: str, query_vector: List[float], k: int) -> None:
+    """The search path without mapping cache nor source filtering."""
+    mappings = database.client.indices.get_mapping(index=index_name)[index_name]['mappings']
+    vector_field = next(field for field, props in mappings['properties'].items() if props.get('type') == 'knn_vector')
+    quantizer = quantizer_from_meta(mappings.get('_meta', {}).get(MAPPING_META_KEY))
+    search_vector = quantizer.quantize_query(query_vector) if quantizer else query_vector
+    search_k = k * quantizer.oversample if quantizer else k
+    database.client.search(index=index_name, body={
+        "size": search_k,
+        "query": {"knn": {vector_field: {"vector": search_vector, "k": search_k}}},
+        "_source": True,
+        "fields": ["text", "parent_id"]
+    })
+
+def _measure(counter: _CountingDeserializer, search: Callable[[List[float]], Any], queries: np.ndarray):
+    counter.bytes = 0
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query.tolist())
+        latencies.append(time.perf_counter() - start)
+    return counter.bytes / len(queries), 1000 * np.percentile(latencies, 50), 1000 * np.percentile(latencies, 95)
+
+def run(database: OpenSearchVectorDatabase, index_name: str, query_count: int, k: int) -> None:
+    mappings = database.client.indices.get_mapping(index=index_name)[index_name]['mappings']
+    dimension = next(props['dimension'] for props in mappings['properties'].values() if props.get('type') == 'knn_vector')
+    queries = normalize_rows(np.random.default_rng(0).standard_normal((query_count, dimension)).astype(np.float32))
+
+    counter = _CountingDeserializer(database.client.transport.deserializer)
+    database.client.transport.deserializer = counter
+    # Warm up the connection and the index caches once per path
+    _search_before(database, index_name, queries[0].tolist(), k)
+    database.search(index_name, queries[0].tolist(), k)
+
+    print(f"{query_count} queries of dimension {dimension} on {index_name}, k={k}")
+    print(f"{'path':<10}{'bytes/query':>13}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, search in (("before", lambda query: _search_before(database, index_name, query, k)),
+                         ("after", lambda query: database.search(index_name, query, k))):
+        payload, p50, p95 = _measure(counter, search, queries)
+        print(f"{name:<10}{payload:>13.0f}{p50:>9.2f}{p95:>9.2f}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index", required=True, help="vector index to query")
+    parser.add_argument("--queries", type=int, default=100, help="random query vectors (default: 100)")
+    parser.add_argument("--k", type=int, default=5, help="results per query (default: 5)")
+    args = parser.parse_args()
+
+    config = get_config()
+    database = OpenSearchVectorDatabase(
+        host=config.opensearch_host,
+        is_serverless=config.opensearch_serverless,
+        region=config.aws_region,
+        username=config.opensearch_username,
+        password=config.opensearch_password
+    )
+    run(database, args.index, args.queries, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+CPU time of the embedding serialization paths, per 10k vectors.
+
+Compares building bulk request lines from embeddings held as lists of Python floats and
+serialized with the standard library (the former indexing path) against float32 matrix
+rows serialized with the standard library and with orjson (see `util.fast_json`), and
+parsing embedding responses with each library. Times are process CPU time.
+
+    python -m util.serialization_benchmark
+    python -m util.serialization_benchmark --vectors embeddings.npy --repeat 5
+"""
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import time
+
+import numpy as np
+
+from util import fast_json
+from util.quantization_benchmark import synthetic_vectors
+
+PER_VECTORS = 10000
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=lambda array: array.tolist(), separators=(",", ":")).encode("utf-8")
+
+def _bulk_lines(dumps: Callable[[Any], bytes], rows) -> List[bytes]:
+    action = dumps({"index": {"_index": "benchmark"}})
+    lines = []
+    for row in rows:
+        lines.append(action)
+        lines.append(dumps({"vectors": row, "text": "chunk", "metadata": {"inputTokens": 0}}))
+    return lines
+
+def _cpu_seconds(function: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        function()
+        best = min(best, time.process_time() - start)
+    return best
+
+def run(matrix: np.ndarray, repeat: int) -> None:
+    lists = matrix.astype(np.float64).tolist()
+    response = json.dumps({"embeddings": lists}).encode("utf-8")
+    scale = PER_VECTORS / len(matrix)
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "list[float] + json (before)": lambda: _bulk_lines(_stdlib_dumps, lists),
+        "float32 rows + json": lambda: _bulk_lines(_stdlib_dumps, matrix),
+    }
+    if fast_json.orjson is not None:
+        cases["float32 rows + orjson"] = lambda: _bulk_lines(fast_json.dumps, matrix)
+    payloads = {name: sum(len(line) for line in function()) / len(matrix) for name, function in cases.items()}
+    cases["parse response, json"] = lambda: np.asarray(json.loads(response)["embeddings"], dtype=np.float32)
+    if fast_json.orjson is not None:
+        cases["parse response, orjson"] = lambda: np.asarray(fast_json.loads(response)["embeddings"], dtype=np.float32)
+
+    print(f"{len(matrix)} vectors of dimension {matrix.shape[1]}, best of {repeat}"
+          + ("" if fast_json.orjson is not None else " (orjson not installed)"))
+    print(f"{'path':<30}{'CPU s/10k':>11}{'payload B':>11}")
+    for name, function in cases.items():
+        payload = f"{payloads[name]:>11.0f}" if name in payloads else f"{'-':>11}"
+        print(f"{name:<30}{_cpu_seconds(function, repeat) * scale:>11.3f}{payload}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help=".npy file of embeddings (default: synthetic low-rank vectors)")
+    parser.add_argument("--count", type=int, default=10000, help="synthetic vector count (default: 10000)")
+    parser.add_argument("--dimension", type=int, default=1024, help="synthetic vector dimension (default: 1024)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per path, the fastest is reported (default: 3)")
+    args = parser.parse_args()
+
+    matrix = np.load(args.vectors).astype(np.float32) if args.vectors else synthetic_vectors(args.count, args.dimension)
+    run(np.ascontiguousarray(matrix), args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def iter_text_batches(texts: Sequence[str], max_batch_size: int, max_batch_bytes: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Split a sequence of texts into contiguous (start, end) batches.
+
+    A batch is closed when it reaches `max_batch_size` texts or when adding the next text
+    would push its UTF-8 payload over `max_batch_bytes` (0 disables the byte limit).
+    A single text larger than the byte limit still forms its own batch.
+
+    Args:
+        texts (Sequence[str]): Texts to batch.
+        max_batch_size (int): Maximum number of texts per batch.
+        max_batch_bytes (int): Maximum UTF-8 size of a batch, 0 for no limit.
+
+    Yields:
+        Tuple[int, int]: Start (inclusive) and end (exclusive) offsets of each batch.
+    """
+    max_batch_size = max(1, max_batch_size)
+    start, batch_bytes = 0, 0
+    for idx, text in enumerate(texts):
+        text_bytes = len(text.encode('utf-8')) if max_batch_bytes else 0
+        batch_full = idx - start >= max_batch_size
+        over_bytes = max_batch_bytes and idx > start and batch_bytes + text_bytes > max_batch_bytes
+        if batch_full or over_bytes:
+            yield start, idx
+            start, batch_bytes = idx, 0
+        batch_bytes += text_bytes
+    if start < len(texts):
+        yield start, len(texts)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize every row of a 2D matrix; all-zero rows are left unchanged."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def split_batch_metadata(metadata: Dict[str, Any], texts: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Split the metadata of one batched embedding request into per-text metadata.
+
+    The request's input token count is apportioned by text length (largest remainder), so
+    the per-text counts always add up to the billed total; latency is shared by every text.
+    """
+    total_tokens = int(metadata.get('inputTokens', 0) or 0)
+    lengths = [max(len(text), 1) for text in texts]
+    total_length = sum(lengths)
+
+    shares = [total_tokens * length / total_length for length in lengths]
+    tokens = [int(share) for share in shares]
+    remainders = sorted(range(len(texts)), key=lambda i: shares[i] - tokens[i], reverse=True)
+    for i in remainders[:total_tokens - sum(tokens)]:
+        tokens[i] += 1
+
+    return [{**metadata, 'inputTokens': token_count} for token_count in tokens]